@@ -3,169 +3,263 @@ Análises Estatísticas Avançadas
 Implementa todas as análises estatísticas solicitadas
 """
 
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import statsmodels.api as sm
-from statsmodels.formula.api import ols
+from scipy.stats import norm
+
+from armazenamento import carregar_dados
+from cache_etapas import GrafoEtapas, DIRETORIO_CACHE_ETAPAS
+from motor_estatisticas import tabela_descritiva
+from motor_correlacao import METODOS_CORRELACAO, correlacoes, pares_correlacao
+from motor_regressao import (MODELOS_REGRESSAO, ajustar_modelos, tabela_resultados, tabela_resumo, indice_beta,
+                             regressao_movel, diagnosticos_residuos)
+from motor_estacionariedade import TESTES_ESTACIONARIEDADE, COLUNAS_TESTES, testar_serie, adf_movel
+from reamostragem import intervalos_bootstrap
+from deteccao_outliers import (METODOS_OUTLIERS, CAMINHO_MASCARA_OUTLIERS, detectar_outliers, remover_outliers,
+                               winsorizar, salvar_mascara_outliers, aplicar_mascara_outliers)
 
 
-def carregar_dados_final():
-    """Carrega o DataFrame final processado"""
-    try:
-        df = pd.read_csv('dados_final.csv', index_col=0, parse_dates=True)
-        return df
-    except FileNotFoundError:
+def carregar_dados_final(colunas=None, inicio=None, fim=None):
+    """Carrega o DataFrame final processado (tabela Parquet em dados/final ou dados_final.csv)"""
+    df = carregar_dados('final', colunas=colunas, inicio=inicio, fim=fim)
+    if df is None:
         print("❌ Arquivo dados_final.csv não encontrado!")
         print("Execute primeiro: python coletar_dados.py")
+    return df
+
+
+def carregar_dados_sem_outliers(colunas=None):
+    """
+    DataFrame final sem outliers (ou winsorizado), conforme a máscara gravada por identificar_outliers
+
+    Retorna None se os dados ou a máscara não existirem ou se a máscara estiver desatualizada.
+    """
+    df = carregar_dados_final(colunas)
+    if df is None:
         return None
+    return aplicar_mascara_outliers(df)
 
 
-def estatisticas_descritivas_completas(df):
+def estatisticas_descritivas_completas(df, acumulador=None):
     """
     4.1 Estatísticas Descritivas Completas
+    
+    Com um `acumulador` (AcumuladorMomentos das mesmas colunas, possivelmente a
+    combinação de vários períodos), só as linhas de `df` posteriores à última data
+    já acumulada são incorporadas e a tabela sai do estado acumulado, sem reler
+    o histórico.
     """
     print("\n" + "="*80)
     print("  📊 ESTATÍSTICAS DESCRITIVAS COMPLETAS")
     print("="*80)
     
-    stats_dict = {}
-    
-    for col in df.columns:
-        stats_dict[col] = {
-            'Média': df[col].mean(),
-            'Mediana': df[col].median(),
-            'Desvio Padrão': df[col].std(),
-            'Mínimo': df[col].min(),
-            'Máximo': df[col].max(),
-            'Q1 (25%)': df[col].quantile(0.25),
-            'Q3 (75%)': df[col].quantile(0.75),
-            'IQR': df[col].quantile(0.75) - df[col].quantile(0.25),
-            'Assimetria': df[col].skew(),
-            'Curtose': df[col].kurtosis()
-        }
-    
-    df_stats = pd.DataFrame(stats_dict).T
+    if acumulador is not None:
+        novas = df if acumulador.ultima_data is None else df[df.index > acumulador.ultima_data]
+        df_stats = acumulador.atualizar(novas).tabela_descritiva()
+    else:
+        # Momentos em uma passada e quantis em uma ordenação sobre todas as colunas
+        df_stats = tabela_descritiva(df)
     print(df_stats.round(6))
     
     return df_stats
 
 
-def identificar_outliers(df):
+def identificar_outliers(df, metodos=('iqr',), tratamento='remover'):
     """
-    4.2 Identificação de Outliers usando método IQR
+    4.2 Identificação de Outliers (IQR; opcionalmente MAD e filtro de Hampel)
+    
+    Todos os métodos são avaliados sobre a matriz inteira, gerando uma máscara
+    booleana (linhas x colunas). Com `tratamento='remover'`, as linhas com algum
+    outlier são descartadas numa única seleção; com `tratamento='winsorizar'`,
+    cada outlier é substituído pelo limite ultrapassado e todas as linhas ficam.
     """
+    nomes_metodos = ', '.join(METODOS_OUTLIERS[m] for m in metodos)
     print("\n" + "="*80)
-    print("  🔍 IDENTIFICAÇÃO DE OUTLIERS (Método IQR)")
+    print(f"  🔍 IDENTIFICAÇÃO DE OUTLIERS (Método {nomes_metodos})")
     print("="*80)
     
-    outliers_info = {}
-    df_sem_outliers = df.copy()
+    deteccao = detectar_outliers(df, metodos)
+    mascara = deteccao['mascara']
+    resumo = deteccao['resumo']
     
-    for col in df.columns:
-        Q1 = df[col].quantile(0.25)
-        Q3 = df[col].quantile(0.75)
-        IQR = Q3 - Q1
-        
-        limite_inferior = Q1 - 1.5 * IQR
-        limite_superior = Q3 + 1.5 * IQR
-        
-        # Identificar outliers
-        outliers_mask = (df[col] < limite_inferior) | (df[col] > limite_superior)
-        outliers = df[outliers_mask][col]
-        
-        outliers_info[col] = {
-            'Q1': Q1,
-            'Q3': Q3,
-            'IQR': IQR,
-            'Limite Inferior': limite_inferior,
-            'Limite Superior': limite_superior,
-            'Número de Outliers': len(outliers),
-            'Porcentagem': (len(outliers) / len(df)) * 100,
-            'Outliers': outliers.to_dict()
-        }
+    outliers_info = {}
+    for j, col in enumerate(df.columns):
+        info = {}
+        if 'iqr' in deteccao:
+            info.update({chave: valores[j] for chave, valores in deteccao['iqr'].items()})
+        if len(metodos) > 1:
+            info.update({f'Outliers {METODOS_OUTLIERS[m]}': int(resumo.loc[col, METODOS_OUTLIERS[m]]) for m in metodos})
+        info.update({
+            'Número de Outliers': int(resumo.loc[col, 'Total']),
+            'Porcentagem': resumo.loc[col, 'Porcentagem'],
+            'Outliers': df[col][mascara[col]].to_dict()
+        })
+        outliers_info[col] = info
         
         print(f"\n📊 {col}:")
-        print(f"  • IQR: {IQR:.6f}")
-        print(f"  • Limites: [{limite_inferior:.6f}, {limite_superior:.6f}]")
-        print(f"  • Outliers encontrados: {len(outliers)} ({outliers_info[col]['Porcentagem']:.2f}%)")
-        
-        # Remover outliers do dataset
-        df_sem_outliers = df_sem_outliers[~outliers_mask]
-    
-    print(f"\n✅ Dataset original: {len(df)} observações")
-    print(f"✅ Dataset sem outliers: {len(df_sem_outliers)} observações")
-    print(f"📉 Outliers removidos: {len(df) - len(df_sem_outliers)} ({((len(df) - len(df_sem_outliers)) / len(df)) * 100:.2f}%)")
-    
-    # Salvar dataset sem outliers
-    df_sem_outliers.to_csv('dados_final_sem_outliers.csv')
-    print("\n💾 Dataset sem outliers salvo em: dados_final_sem_outliers.csv")
+        if 'iqr' in deteccao:
+            print(f"  • IQR: {info['IQR']:.6f}")
+            print(f"  • Limites: [{info['Limite Inferior']:.6f}, {info['Limite Superior']:.6f}]")
+        if len(metodos) > 1:
+            print("  • Por método: " + ", ".join(f"{METODOS_OUTLIERS[m]} {info[f'Outliers {METODOS_OUTLIERS[m]}']}" for m in metodos))
+        print(f"  • Outliers encontrados: {info['Número de Outliers']} ({info['Porcentagem']:.2f}%)")
+    
+    if tratamento == 'winsorizar':
+        df_sem_outliers = winsorizar(df, deteccao)
+        print(f"\n✅ Dataset winsorizado: {len(df_sem_outliers)} observações")
+        print(f"📉 Valores substituídos pelos limites: {int(mascara.to_numpy().sum())}")
+    elif tratamento == 'remover':
+        df_sem_outliers = remover_outliers(df, mascara)
+        print(f"\n✅ Dataset original: {len(df)} observações")
+        print(f"✅ Dataset sem outliers: {len(df_sem_outliers)} observações")
+        print(f"📉 Outliers removidos: {len(df) - len(df_sem_outliers)} ({((len(df) - len(df_sem_outliers)) / len(df)) * 100:.2f}%)")
+    else:
+        raise ValueError(f"Tratamento desconhecido: {tratamento} (use 'remover' ou 'winsorizar')")
+    
+    # Salvar apenas a máscara: o dataset filtrado é reconstruído a partir de dados_final ao carregar
+    salvar_mascara_outliers(df, deteccao, tratamento)
+    print(f"\n💾 Máscara de outliers salva em: {CAMINHO_MASCARA_OUTLIERS} "
+          f"({os.path.getsize(CAMINHO_MASCARA_OUTLIERS)} bytes)")
     
     return outliers_info, df_sem_outliers
 
 
-def calcular_erro_amostral(df):
+def calcular_erro_amostral(df, niveis_confianca=(0.95,), metodo_bootstrap='estacionario', n_replicas=2000,
+                           tamanho_bloco=None, semente=42, processos=None):
     """
     4.3 Cálculo de Erro Amostral
+    
+    Além do intervalo pela aproximação normal (no primeiro nível de `niveis_confianca`),
+    calcula o erro padrão bootstrap e os intervalos percentil e BCa da média em cada
+    nível. O bootstrap estacionário (padrão) ou por blocos móveis preserva a
+    autocorrelação dos retornos; 'iid' reproduz o bootstrap clássico.
     """
+    nivel_principal = niveis_confianca[0]
     print("\n" + "="*80)
-    print("  📏 ERRO AMOSTRAL (Confiança 95%)")
+    print(f"  📏 ERRO AMOSTRAL (Confiança {nivel_principal * 100:g}%)")
     print("="*80)
     
     n = len(df)
-    z_score = 1.96  # Para 95% de confiança
-    
-    erro_info = {}
-    
+    z_score = norm.ppf(0.5 + nivel_principal / 2)  # 1.96 para 95% de confiança
+    
+    valores = df.to_numpy(dtype=float)
+    desvios = np.nanstd(valores, axis=0, ddof=1)
+    medias = np.nanmean(valores, axis=0)
+    se = desvios / np.sqrt(n)
+    me = z_score * se
+    
+    df_erro = pd.DataFrame({
+        'Desvio Padrão': desvios,
+        'Erro Padrão (SE)': se,
+        'Margem de Erro (ME)': me,
+        'Intervalo de Confiança Inferior': medias - me,
+        'Intervalo de Confiança Superior': medias + me
+    }, index=df.columns)
+    
+    df_bootstrap = intervalos_bootstrap(df, niveis_confianca, n_replicas, metodo_bootstrap,
+                                        tamanho_bloco, semente, processos=processos)
+    df_erro = df_erro.join(df_bootstrap)
+    
+    rotulo = f'IC {nivel_principal * 100:g}%'
     for col in df.columns:
-        std = df[col].std()
-        se = std / np.sqrt(n)
-        me = z_score * se
-        
-        erro_info[col] = {
-            'Desvio Padrão': std,
-            'Erro Padrão (SE)': se,
-            'Margem de Erro (ME)': me,
-            'Intervalo de Confiança Inferior': df[col].mean() - me,
-            'Intervalo de Confiança Superior': df[col].mean() + me
-        }
-        
+        info = df_erro.loc[col]
         print(f"\n📊 {col}:")
-        print(f"  • Erro Padrão: {se:.6f}")
-        print(f"  • Margem de Erro (95%): ±{me:.6f}")
-        print(f"  • IC 95%: [{erro_info[col]['Intervalo de Confiança Inferior']:.6f}, {erro_info[col]['Intervalo de Confiança Superior']:.6f}]")
+        print(f"  • Erro Padrão: {info['Erro Padrão (SE)']:.6f} (bootstrap {metodo_bootstrap}: {info['Erro Padrão Bootstrap']:.6f})")
+        print(f"  • Margem de Erro ({nivel_principal * 100:g}%): ±{info['Margem de Erro (ME)']:.6f}")
+        print(f"  • {rotulo} normal: [{info['Intervalo de Confiança Inferior']:.6f}, {info['Intervalo de Confiança Superior']:.6f}]")
+        print(f"  • {rotulo} BCa: [{info[f'{rotulo} BCa Inferior']:.6f}, {info[f'{rotulo} BCa Superior']:.6f}]")
     
-    df_erro = pd.DataFrame(erro_info).T
     return df_erro
 
 
-def matriz_correlacao_detalhada(df):
+def matriz_correlacao_detalhada(df, metodo='pearson', limite=0.5, nivel_confianca=0.95):
     """
     4.5 Matriz de Correlação Detalhada
+    
+    Correlação, valores-p e intervalos de Fisher-z de todos os pares calculados de
+    uma vez (motor_correlacao), com valores ausentes tratados por pares completos.
+    Retorna (matriz de correlação, tabela dos pares com |r| > `limite`, da maior para a menor).
     """
+    nomes = {'pearson': 'Pearson', 'spearman': 'Spearman', 'kendall': 'Kendall'}
     print("\n" + "="*80)
-    print("  🔗 MATRIZ DE CORRELAÇÃO (Pearson)")
+    print(f"  🔗 MATRIZ DE CORRELAÇÃO ({nomes.get(metodo, metodo)})")
     print("="*80)
     
     # Calcular correlação
-    corr_matrix = df.corr()
+    resultado = correlacoes(df, metodo=metodo, nivel_confianca=nivel_confianca)
+    corr_matrix = resultado['correlacao']
     
     print("\nMatriz de Correlação:")
     print(corr_matrix.round(4))
     
     # Identificar correlações significativas
-    print("\n📌 Correlações Significativas (|r| > 0.5):")
-    for i in range(len(corr_matrix.columns)):
-        for j in range(i+1, len(corr_matrix.columns)):
-            corr_val = corr_matrix.iloc[i, j]
-            if abs(corr_val) > 0.5:
-                var1 = corr_matrix.columns[i]
-                var2 = corr_matrix.columns[j]
-                print(f"  • {var1} ↔ {var2}: {corr_val:.4f}")
+    pares = pares_correlacao(resultado, limite=limite)
+    print(f"\n📌 Correlações Significativas (|r| > {limite}):")
+    for var1, var2, corr_val, p_valor in pares[['Variável 1', 'Variável 2', 'Correlação', 'Valor-p']].itertuples(index=False):
+        print(f"  • {var1} ↔ {var2}: {corr_val:.4f} (p = {p_valor:.4g})")
+    
+    return corr_matrix, pares
+
+
+def testes_estacionariedade(df, testes=TESTES_ESTACIONARIEDADE, alfa=0.05, janela_adf=252, processos=None):
+    """
+    4.8 Testes de Estacionariedade
+    
+    ADF, KPSS e Phillips-Perron em todas as colunas (motor_estacionariedade), mais o
+    ADF em janelas móveis de `janela_adf` pregões. As colunas são distribuídas num
+    pool de `processos` processos (padrão: um por coluna, até o número de CPUs).
+    Grava teste_adf.csv (valores críticos em colunas numéricas),
+    testes_estacionariedade.csv (uma linha por série e teste) e adf_movel.csv.
+    """
+    print("\n" + "="*80)
+    print(f"  📐 TESTES DE ESTACIONARIEDADE ({', '.join(testes)})")
+    print("="*80)
+    
+    colunas = list(df.columns)
+    series = [df[col] for col in colunas]
+    k = len(colunas)
+    processos = processos or min(os.cpu_count() or 1, k)
+    if processos > 1 and k > 1:
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            linhas = list(executor.map(testar_serie, series, [tuple(testes)] * k, [alfa] * k))
+            moveis = list(executor.map(adf_movel, series, [janela_adf] * k))
+    else:
+        linhas = [testar_serie(serie, testes, alfa) for serie in series]
+        moveis = [adf_movel(serie, janela_adf) for serie in series]
+    
+    df_testes = pd.DataFrame([linha for linhas_coluna in linhas for linha in linhas_coluna],
+                             columns=COLUNAS_TESTES,
+                             index=pd.Index([col for col, linhas_coluna in zip(colunas, linhas)
+                                             for _ in linhas_coluna], name='Variável'))
+    
+    for col in colunas:
+        print(f"\n📊 {col}:")
+        for _, linha in df_testes.loc[[col]].iterrows():
+            print(f"  • {linha['Teste']}: estatística = {linha['Estatística']:.4f}, "
+                  f"p = {linha['Valor-p']:.4f} → {linha['Conclusão']}")
+    
+    # Formato histórico de teste_adf.csv, com um valor crítico por coluna
+    if 'ADF' in testes:
+        df_adf = df_testes[df_testes['Teste'] == 'ADF'].drop(columns=['Teste', 'H0'])
+        df_adf = df_adf.rename(columns={'Estatística': 'Estatística ADF'})
+        df_adf.index.name = None
+        df_adf.to_csv('teste_adf.csv')
+    df_testes.to_csv('testes_estacionariedade.csv')
+    
+    df_movel = pd.concat({col: movel for col, movel in zip(colunas, moveis)}, axis=1)
+    df_movel.columns = [f'{col} | {medida}' for col, medida in df_movel.columns]
+    df_movel.to_csv('adf_movel.csv')
     
-    return corr_matrix
+    print("\n💾 Testes salvos em: teste_adf.csv, testes_estacionariedade.csv e adf_movel.csv")
+    
+    return df_testes, df_movel
 
 
 def criar_boxplots(df, outliers_info):
@@ -234,148 +328,71 @@ def criar_heatmap_correlacao(corr_matrix):
     return fig
 
 
-def regressao_linear_multipla(df):
+def _estrelas(p_valor):
+    return '***' if p_valor < 0.001 else '**' if p_valor < 0.01 else '*' if p_valor < 0.05 else ''
+
+
+def regressao_linear_multipla(df, modelos=None):
     """
     4.6 Regressão Linear Múltipla
     
+    Ajusta os modelos declarados em motor_regressao.MODELOS_REGRESSAO (ou `modelos`):
     Modelo 1: retorno_sp500 = β₀ + β₁*retorno_bigtech + β₂*taxa_juros_10y + ε
     Modelo 2: vix = β₀ + β₁*retorno_bigtech + β₂*taxa_juros_10y + ε
+    Modelos com a mesma matriz de planejamento são resolvidos juntos (motor_regressao).
     """
     print("\n" + "="*80)
     print("  📈 REGRESSÃO LINEAR MÚLTIPLA")
     print("="*80)
     
-    resultados = {}
-    
-    # Modelo 1: Retorno S&P 500
-    print("\n📊 MODELO 1: Retorno S&P 500")
-    print("  Equação: retorno_sp500 = β₀ + β₁*retorno_bigtech + β₂*taxa_juros_10y + ε")
-    
-    modelo1 = ols('retorno_sp500 ~ retorno_bigtech + taxa_juros_10y', data=df).fit()
-    
-    print(f"\n  Coeficientes:")
-    print(f"    β₀ (Intercepto): {modelo1.params['Intercept']:.6f}")
-    print(f"    β₁ (retorno_bigtech): {modelo1.params['retorno_bigtech']:.6f}")
-    print(f"    β₂ (taxa_juros_10y): {modelo1.params['taxa_juros_10y']:.6f}")
-    
-    print(f"\n  Erro Padrão:")
-    print(f"    SE(β₀): {modelo1.bse['Intercept']:.6f}")
-    print(f"    SE(β₁): {modelo1.bse['retorno_bigtech']:.6f}")
-    print(f"    SE(β₂): {modelo1.bse['taxa_juros_10y']:.6f}")
-    
-    print(f"\n  Valor-p:")
-    print(f"    p(β₀): {modelo1.pvalues['Intercept']:.6f}")
-    print(f"    p(β₁): {modelo1.pvalues['retorno_bigtech']:.6f} {'***' if modelo1.pvalues['retorno_bigtech'] < 0.001 else '**' if modelo1.pvalues['retorno_bigtech'] < 0.01 else '*' if modelo1.pvalues['retorno_bigtech'] < 0.05 else ''}")
-    print(f"    p(β₂): {modelo1.pvalues['taxa_juros_10y']:.6f} {'***' if modelo1.pvalues['taxa_juros_10y'] < 0.001 else '**' if modelo1.pvalues['taxa_juros_10y'] < 0.01 else '*' if modelo1.pvalues['taxa_juros_10y'] < 0.05 else ''}")
-    
-    print(f"\n  Qualidade do Modelo:")
-    print(f"    R²: {modelo1.rsquared:.4f}")
-    print(f"    R² Ajustado: {modelo1.rsquared_adj:.4f}")
-    print(f"    F-statistic: {modelo1.fvalue:.4f}")
-    print(f"    Prob(F-statistic): {modelo1.f_pvalue:.6f} {'***' if modelo1.f_pvalue < 0.001 else '**' if modelo1.f_pvalue < 0.01 else '*' if modelo1.f_pvalue < 0.05 else ''}")
-    
-    resultados['modelo1'] = {
-        'modelo': modelo1,
-        'nome': 'Retorno S&P 500',
-        'formula': 'retorno_sp500 ~ retorno_bigtech + taxa_juros_10y',
-        'coeficientes': {
-            'Intercepto': modelo1.params['Intercept'],
-            'retorno_bigtech': modelo1.params['retorno_bigtech'],
-            'taxa_juros_10y': modelo1.params['taxa_juros_10y']
-        },
-        'erro_padrao': {
-            'Intercepto': modelo1.bse['Intercept'],
-            'retorno_bigtech': modelo1.bse['retorno_bigtech'],
-            'taxa_juros_10y': modelo1.bse['taxa_juros_10y']
-        },
-        'pvalores': {
-            'Intercepto': modelo1.pvalues['Intercept'],
-            'retorno_bigtech': modelo1.pvalues['retorno_bigtech'],
-            'taxa_juros_10y': modelo1.pvalues['taxa_juros_10y']
-        },
-        'r2': modelo1.rsquared,
-        'r2_adj': modelo1.rsquared_adj,
-        'f_statistic': modelo1.fvalue,
-        'f_pvalue': modelo1.f_pvalue
-    }
+    resultados = ajustar_modelos(df, modelos)
     
-    # Modelo 2: Volatilidade (VIX)
-    print("\n\n📊 MODELO 2: Volatilidade (VIX)")
-    print("  Equação: vix = β₀ + β₁*retorno_bigtech + β₂*taxa_juros_10y + ε")
-    
-    modelo2 = ols('vix ~ retorno_bigtech + taxa_juros_10y', data=df).fit()
-    
-    print(f"\n  Coeficientes:")
-    print(f"    β₀ (Intercepto): {modelo2.params['Intercept']:.6f}")
-    print(f"    β₁ (retorno_bigtech): {modelo2.params['retorno_bigtech']:.6f}")
-    print(f"    β₂ (taxa_juros_10y): {modelo2.params['taxa_juros_10y']:.6f}")
-    
-    print(f"\n  Erro Padrão:")
-    print(f"    SE(β₀): {modelo2.bse['Intercept']:.6f}")
-    print(f"    SE(β₁): {modelo2.bse['retorno_bigtech']:.6f}")
-    print(f"    SE(β₂): {modelo2.bse['taxa_juros_10y']:.6f}")
-    
-    print(f"\n  Valor-p:")
-    print(f"    p(β₀): {modelo2.pvalues['Intercept']:.6f}")
-    print(f"    p(β₁): {modelo2.pvalues['retorno_bigtech']:.6f} {'***' if modelo2.pvalues['retorno_bigtech'] < 0.001 else '**' if modelo2.pvalues['retorno_bigtech'] < 0.01 else '*' if modelo2.pvalues['retorno_bigtech'] < 0.05 else ''}")
-    print(f"    p(β₂): {modelo2.pvalues['taxa_juros_10y']:.6f} {'***' if modelo2.pvalues['taxa_juros_10y'] < 0.001 else '**' if modelo2.pvalues['taxa_juros_10y'] < 0.01 else '*' if modelo2.pvalues['taxa_juros_10y'] < 0.05 else ''}")
-    
-    print(f"\n  Qualidade do Modelo:")
-    print(f"    R²: {modelo2.rsquared:.4f}")
-    print(f"    R² Ajustado: {modelo2.rsquared_adj:.4f}")
-    print(f"    F-statistic: {modelo2.fvalue:.4f}")
-    print(f"    Prob(F-statistic): {modelo2.f_pvalue:.6f} {'***' if modelo2.f_pvalue < 0.001 else '**' if modelo2.f_pvalue < 0.01 else '*' if modelo2.f_pvalue < 0.05 else ''}")
-    
-    resultados['modelo2'] = {
-        'modelo': modelo2,
-        'nome': 'Volatilidade (VIX)',
-        'formula': 'vix ~ retorno_bigtech + taxa_juros_10y',
-        'coeficientes': {
-            'Intercepto': modelo2.params['Intercept'],
-            'retorno_bigtech': modelo2.params['retorno_bigtech'],
-            'taxa_juros_10y': modelo2.params['taxa_juros_10y']
-        },
-        'erro_padrao': {
-            'Intercepto': modelo2.bse['Intercept'],
-            'retorno_bigtech': modelo2.bse['retorno_bigtech'],
-            'taxa_juros_10y': modelo2.bse['taxa_juros_10y']
-        },
-        'pvalores': {
-            'Intercepto': modelo2.pvalues['Intercept'],
-            'retorno_bigtech': modelo2.pvalues['retorno_bigtech'],
-            'taxa_juros_10y': modelo2.pvalues['taxa_juros_10y']
-        },
-        'r2': modelo2.rsquared,
-        'r2_adj': modelo2.rsquared_adj,
-        'f_statistic': modelo2.fvalue,
-        'f_pvalue': modelo2.f_pvalue
-    }
+    for i, resultado in enumerate(resultados.values(), start=1):
+        modelo = resultado['modelo']
+        termos = resultado['coeficientes'].index
+        equacao = ' + '.join(f"{indice_beta(k)}*{termo}" for k, termo in enumerate(termos) if k > 0)
+        
+        print(f"\n📊 MODELO {i}: {modelo.nome}")
+        print(f"  Equação: {modelo.alvo} = β₀ + {equacao} + ε")
+        if modelo.filtro:
+            print(f"  Amostra: {modelo.filtro} ({resultado['n']} observações)")
+        
+        print(f"\n  Coeficientes:")
+        for k, termo in enumerate(termos):
+            print(f"    {indice_beta(k)} ({termo}): {resultado['coeficientes'][termo]:.6f}")
+        
+        covariancia = '' if modelo.cov_tipo == 'nonrobust' else f" ({resultado['covariancia']})"
+        print(f"\n  Erro Padrão{covariancia}:")
+        for k, termo in enumerate(termos):
+            print(f"    SE({indice_beta(k)}): {resultado['erro_padrao'][termo]:.6f}")
+        
+        print(f"\n  Valor-p:")
+        for k, termo in enumerate(termos):
+            p_valor = resultado['pvalores'][termo]
+            print(f"    p({indice_beta(k)}): {p_valor:.6f} {_estrelas(p_valor) if k > 0 else ''}")
+        
+        robusta = resultado.get('robusta')
+        if robusta:
+            print(f"\n  Erro Padrão e Valor-p ({robusta['covariancia']}):")
+            for k, termo in enumerate(termos):
+                p_valor = robusta['pvalores'][termo]
+                print(f"    SE({indice_beta(k)}): {robusta['erro_padrao'][termo]:.6f}   "
+                      f"p: {p_valor:.6f} {_estrelas(p_valor) if k > 0 else ''}")
+        
+        print(f"\n  Qualidade do Modelo:")
+        print(f"    R²: {resultado['r2']:.4f}")
+        print(f"    R² Ajustado: {resultado['r2_adj']:.4f}")
+        print(f"    F-statistic: {resultado['f_statistic']:.4f}")
+        print(f"    Prob(F-statistic): {resultado['f_pvalue']:.6f} {_estrelas(resultado['f_pvalue'])}")
+        if robusta:
+            print(f"    F-statistic ({modelo.cov_robusta}): {robusta['f_statistic']:.4f}")
+            print(f"    Prob(F-statistic) ({modelo.cov_robusta}): {robusta['f_pvalue']:.6f} "
+                  f"{_estrelas(robusta['f_pvalue'])}")
     
     # Salvar resultados em CSV
-    df_resultados = pd.DataFrame({
-        'Modelo 1 (S&P 500)': [
-            resultados['modelo1']['coeficientes']['Intercepto'],
-            resultados['modelo1']['coeficientes']['retorno_bigtech'],
-            resultados['modelo1']['coeficientes']['taxa_juros_10y'],
-            resultados['modelo1']['r2'],
-            resultados['modelo1']['r2_adj'],
-            resultados['modelo1']['f_statistic'],
-            resultados['modelo1']['f_pvalue']
-        ],
-        'Modelo 2 (VIX)': [
-            resultados['modelo2']['coeficientes']['Intercepto'],
-            resultados['modelo2']['coeficientes']['retorno_bigtech'],
-            resultados['modelo2']['coeficientes']['taxa_juros_10y'],
-            resultados['modelo2']['r2'],
-            resultados['modelo2']['r2_adj'],
-            resultados['modelo2']['f_statistic'],
-            resultados['modelo2']['f_pvalue']
-        ]
-    }, index=['β₀ (Intercepto)', 'β₁ (retorno_bigtech)', 'β₂ (taxa_juros_10y)', 
-              'R²', 'R² Ajustado', 'F-statistic', 'Prob(F)'])
-    
-    df_resultados.to_csv('regressao_multipla.csv')
-    print("\n💾 Resultados da regressão salvos em: regressao_multipla.csv")
+    tabela_resumo(resultados).to_csv('regressao_multipla.csv')
+    tabela_resultados(resultados).to_csv('regressao_resultados.csv', index=False)
+    print("\n💾 Resultados da regressão salvos em: regressao_multipla.csv e regressao_resultados.csv")
     
     return resultados
 
@@ -391,8 +408,6 @@ def criar_graficos_dispersao(df, resultados_regressao):
     # Gráfico 1: Retorno S&P 500 vs Retorno Big Tech
     print("\n📈 Gerando gráfico: Retorno S&P 500 vs Retorno Big Tech...")
     
-    modelo1 = resultados_regressao['modelo1']['modelo']
-    
     fig1 = px.scatter(
         df, 
         x='retorno_bigtech', 
@@ -427,8 +442,6 @@ def criar_graficos_dispersao(df, resultados_regressao):
     # Gráfico 2: VIX vs Retorno Big Tech
     print("\n📈 Gerando gráfico: VIX vs Retorno Big Tech...")
     
-    modelo2 = resultados_regressao['modelo2']['modelo']
-    
     fig2 = px.scatter(
         df, 
         x='retorno_bigtech', 
@@ -495,9 +508,135 @@ def criar_graficos_dispersao(df, resultados_regressao):
     return {'fig1': fig1, 'fig2': fig2, 'fig3': fig3}
 
 
-def gerar_relatorio_completo():
+def regressao_betas_moveis(df, modelo=None, janelas=(60, 120, 252), expansiva=True):
+    """
+    4.9 Betas Móveis
+    
+    Evolução dos coeficientes do modelo (padrão: Modelo 1) em janelas móveis e
+    expansiva (motor_regressao.regressao_movel). Grava betas_moveis.csv com
+    coeficiente, erro padrão e R² de cada janela e betas_moveis.html com β₁ ± 1,96·SE.
+    """
+    modelo = modelo or MODELOS_REGRESSAO[0]
+    print("\n" + "="*80)
+    print(f"  📉 BETAS MÓVEIS: {modelo.formula}")
+    print("="*80)
+    
+    resultados = regressao_movel(df, modelo.alvo, modelo.regressores, janelas, expansiva)
+    
+    colunas = {}
+    for rotulo, resultado in resultados.items():
+        ultimo = resultado['coeficientes'].iloc[-1]
+        valores = ', '.join(f"{indice_beta(k)} = {v:.4f}" for k, v in enumerate(ultimo) if k > 0)
+        print(f"  • {rotulo}: {valores} (R² = {resultado['r2'].iloc[-1]:.4f})")
+        
+        for termo in resultado['coeficientes'].columns:
+            colunas[f'{rotulo} | {termo}'] = resultado['coeficientes'][termo]
+            colunas[f'{rotulo} | SE({termo})'] = resultado['erro_padrao'][termo]
+        colunas[f'{rotulo} | R²'] = resultado['r2']
+        colunas[f'{rotulo} | N'] = resultado['n']
+    df_betas = pd.DataFrame(colunas)
+    df_betas.to_csv('betas_moveis.csv')
+    
+    termo = modelo.regressores[0]
+    fig = go.Figure()
+    for rotulo, resultado in resultados.items():
+        beta = resultado['coeficientes'][termo]
+        margem = 1.96 * resultado['erro_padrao'][termo]
+        fig.add_trace(go.Scatter(x=beta.index, y=beta, name=f'β₁ ({rotulo})', mode='lines'))
+        fig.add_trace(go.Scatter(
+            x=list(beta.index) + list(beta.index[::-1]),
+            y=list(beta + margem) + list((beta - margem)[::-1]),
+            fill='toself', line=dict(width=0), opacity=0.15, showlegend=False, hoverinfo='skip',
+            name=f'IC 95% ({rotulo})'
+        ))
+    fig.update_layout(title=f'β₁ ({termo}) em Janelas Móveis: {modelo.nome}',
+                      xaxis_title='Data', yaxis_title=f'β₁ ({termo})', width=1000, height=600,
+                      hovermode='x unified')
+    fig.write_html('betas_moveis.html')
+    print("\n💾 Betas móveis salvos em: betas_moveis.csv e betas_moveis.html")
+    
+    return resultados
+
+
+def diagnostico_residuos_regressao(df, resultados_regressao, defasagens_ljung_box=(5, 10, 20), defasagens_arch=5):
+    """
+    4.10 Diagnóstico dos Resíduos
+    
+    Jarque-Bera, Ljung-Box, Durbin-Watson, Breusch-Pagan, White, ARCH-LM e VIF de todos
+    os modelos de regressao_linear_multipla, a partir dos resíduos já ajustados
+    (motor_regressao.diagnosticos_residuos). Grava diagnosticos_residuos.csv.
+    """
+    print("\n" + "="*80)
+    print("  🩺 DIAGNÓSTICO DOS RESÍDUOS")
+    print("="*80)
+    
+    df_diagnosticos = diagnosticos_residuos(df, resultados_regressao, defasagens_ljung_box, defasagens_arch)
+    
+    for chave, linhas in df_diagnosticos.groupby('Modelo', sort=False):
+        print(f"\n📊 {linhas['Nome'].iloc[0]} ({chave}):")
+        for _, linha in linhas.iterrows():
+            detalhe = linha['Termo'] or (f"{linha['Defasagens']:.0f} defasagens" if pd.notna(linha['Defasagens']) else '')
+            rotulo = f"{linha['Teste']} ({detalhe})" if detalhe else linha['Teste']
+            if pd.notna(linha['Valor-p']):
+                print(f"  • {rotulo}: {linha['Estatística']:.4f} (p = {linha['Valor-p']:.4f}) {_estrelas(linha['Valor-p'])}")
+            else:
+                print(f"  • {rotulo}: {linha['Estatística']:.4f}")
+    
+    df_diagnosticos.to_csv('diagnosticos_residuos.csv', index=False)
+    print("\n💾 Diagnóstico dos resíduos salvo em: diagnosticos_residuos.csv")
+    
+    return df_diagnosticos
+
+
+def montar_grafo_relatorio(df, usar_cache=True, refazer=(), diretorio_cache=DIRETORIO_CACHE_ETAPAS,
+                           metodos_outliers=('iqr',), tratamento_outliers='remover',
+                           niveis_confianca=(0.95,), metodo_bootstrap='estacionario', processos=None,
+                           metodo_correlacao='pearson', janelas_beta=(60, 120, 252), janela_adf=252):
+    """
+    Declara as análises do relatório como grafo de etapas com cache por conteúdo
+
+    A entrada é o próprio DataFrame final: se os dados não mudarem, nenhuma análise é refeita.
+    """
+    grafo = GrafoEtapas(diretorio_cache, usar_cache=usar_cache, refazer=refazer)
+    grafo.entrada('dados', df)
+    grafo.adicionar('estatisticas_descritivas', estatisticas_descritivas_completas, ['dados'])
+    grafo.adicionar('outliers', identificar_outliers, ['dados'],
+                    {'metodos': tuple(metodos_outliers), 'tratamento': tratamento_outliers},
+                    arquivos=[CAMINHO_MASCARA_OUTLIERS])
+    grafo.adicionar('erro_amostral', calcular_erro_amostral, ['dados'],
+                    {'niveis_confianca': tuple(niveis_confianca), 'metodo_bootstrap': metodo_bootstrap,
+                     'processos': processos})
+    grafo.adicionar('correlacao', matriz_correlacao_detalhada, ['dados'], {'metodo': metodo_correlacao})
+    grafo.adicionar('estacionariedade', testes_estacionariedade, ['dados'],
+                    {'janela_adf': janela_adf, 'processos': processos},
+                    arquivos=['teste_adf.csv', 'testes_estacionariedade.csv', 'adf_movel.csv'])
+    grafo.adicionar('boxplots', criar_boxplots, ['dados', ('outliers', 0)], arquivos=['boxplots_outliers.html'])
+    grafo.adicionar('heatmap', criar_heatmap_correlacao, [('correlacao', 0)], arquivos=['heatmap_correlacao.html'])
+    grafo.adicionar('regressao', regressao_linear_multipla, ['dados'], {'modelos': tuple(MODELOS_REGRESSAO)},
+                    arquivos=['regressao_multipla.csv', 'regressao_resultados.csv'])
+    grafo.adicionar('diagnosticos', diagnostico_residuos_regressao, ['dados', 'regressao'],
+                    arquivos=['diagnosticos_residuos.csv'])
+    grafo.adicionar('dispersao', criar_graficos_dispersao, ['dados', 'regressao'],
+                    arquivos=['scatter_modelo1.html', 'scatter_modelo2.html', 'scatter_vix_juros.html'])
+    grafo.adicionar('betas_moveis', regressao_betas_moveis, ['dados'],
+                    {'modelo': MODELOS_REGRESSAO[0], 'janelas': tuple(janelas_beta)},
+                    arquivos=['betas_moveis.csv', 'betas_moveis.html'])
+    return grafo
+
+
+def gerar_relatorio_completo(usar_cache=True, refazer=(), metodos_outliers=('iqr',), tratamento_outliers='remover',
+                             niveis_confianca=(0.95,), metodo_bootstrap='estacionario', processos=None,
+                             metodo_correlacao='pearson', janelas_beta=(60, 120, 252), janela_adf=252):
     """
     Gera relatório completo com todas as análises
+    
+    Cada análise é uma etapa em cache (diretório cache_etapas/); só as etapas cujas
+    entradas mudaram são refeitas. `refazer` força etapas específicas (ou 'todas').
+    `metodos_outliers` e `tratamento_outliers` são repassados a identificar_outliers;
+    `niveis_confianca`, `metodo_bootstrap` e `processos`, a calcular_erro_amostral
+    (`processos` também distribui os testes de estacionariedade);
+    `metodo_correlacao` (pearson, spearman ou kendall), a matriz_correlacao_detalhada;
+    `janelas_beta`, a regressao_betas_moveis; `janela_adf`, ao ADF móvel.
     """
     print("\n" + "="*80)
     print("  🎯 RELATÓRIO COMPLETO DE ANÁLISES ESTATÍSTICAS")
@@ -512,49 +651,70 @@ def gerar_relatorio_completo():
     print(f"📅 Período: {df.index.min().date()} a {df.index.max().date()}")
     print(f"📋 Variáveis: {list(df.columns)}")
     
+    grafo = montar_grafo_relatorio(df, usar_cache, refazer,
+                                   metodos_outliers=metodos_outliers, tratamento_outliers=tratamento_outliers,
+                                   niveis_confianca=niveis_confianca, metodo_bootstrap=metodo_bootstrap,
+                                   processos=processos, metodo_correlacao=metodo_correlacao,
+                                   janelas_beta=janelas_beta, janela_adf=janela_adf)
+    saidas = grafo.executar()
+    
     # 4.1 Estatísticas Descritivas
-    df_stats = estatisticas_descritivas_completas(df)
+    df_stats = saidas['estatisticas_descritivas']
     df_stats.to_csv('estatisticas_descritivas.csv')
     print("\n💾 Estatísticas salvas em: estatisticas_descritivas.csv")
     
     # 4.2 Identificação de Outliers
-    outliers_info, df_sem_outliers = identificar_outliers(df)
+    outliers_info, df_sem_outliers = saidas['outliers']
     
     # 4.3 Erro Amostral
-    df_erro = calcular_erro_amostral(df)
+    df_erro = saidas['erro_amostral']
     df_erro.to_csv('erro_amostral.csv')
     print("\n💾 Erro amostral salvo em: erro_amostral.csv")
     
     # 4.4 Matriz de Correlação
-    corr_matrix = matriz_correlacao_detalhada(df)
+    corr_matrix, pares_corr = saidas['correlacao']
     corr_matrix.to_csv('matriz_correlacao.csv')
+    pares_corr.to_csv('pares_correlacao.csv', index=False)
     print("\n💾 Matriz de correlação salva em: matriz_correlacao.csv")
+    print("💾 Pares com correlação relevante salvos em: pares_correlacao.csv")
+    
+    # 4.6 Regressão Linear Múltipla e 4.7 Gráficos de Dispersão
+    resultados_regressao = saidas['regressao']
+    graficos = saidas['dispersao']
     
-    # Gerar visualizações
-    criar_boxplots(df, outliers_info)
-    criar_heatmap_correlacao(corr_matrix)
+    # 4.8 Testes de Estacionariedade
+    df_estacionariedade, df_adf_movel = saidas['estacionariedade']
     
-    # 4.6 Regressão Linear Múltipla
-    resultados_regressao = regressao_linear_multipla(df)
+    # 4.9 Betas Móveis
+    betas_moveis = saidas['betas_moveis']
     
-    # 4.7 Gráficos de Dispersão
-    graficos = criar_graficos_dispersao(df, resultados_regressao)
+    # 4.10 Diagnóstico dos Resíduos
+    df_diagnosticos = saidas['diagnosticos']
     
     print("\n" + "="*80)
     print("  ✅ RELATÓRIO COMPLETO GERADO COM SUCESSO!")
+    print(f"  {grafo.resumo()}")
     print("="*80)
     
     print("\n📁 Arquivos gerados:")
     print("  • estatisticas_descritivas.csv")
-    print("  • dados_final_sem_outliers.csv")
+    print(f"  • {CAMINHO_MASCARA_OUTLIERS}")
     print("  • erro_amostral.csv")
     print("  • matriz_correlacao.csv")
+    print("  • pares_correlacao.csv")
+    print("  • teste_adf.csv")
+    print("  • testes_estacionariedade.csv")
+    print("  • adf_movel.csv")
     print("  • regressao_multipla.csv")
+    print("  • regressao_resultados.csv")
+    print("  • betas_moveis.csv")
+    print("  • diagnosticos_residuos.csv")
     print("  • boxplots_outliers.html")
     print("  • heatmap_correlacao.html")
     print("  • scatter_modelo1.html")
     print("  • scatter_modelo2.html")
     print("  • scatter_vix_juros.html")
+    print("  • betas_moveis.html")
     
     return {
         'stats': df_stats,
@@ -562,10 +722,44 @@ def gerar_relatorio_completo():
         'df_sem_outliers': df_sem_outliers,
         'erro': df_erro,
         'correlacao': corr_matrix,
+        'pares_correlacao': pares_corr,
+        'estacionariedade': df_estacionariedade,
+        'adf_movel': df_adf_movel,
         'regressao': resultados_regressao,
-        'graficos': graficos
+        'graficos': graficos,
+        'betas_moveis': betas_moveis,
+        'diagnosticos': df_diagnosticos
     }
 
 
 if __name__ == "__main__":
-    resultados = gerar_relatorio_completo()
+    parser = argparse.ArgumentParser(description="Relatório completo de análises estatísticas")
+    parser.add_argument('--refazer', default='',
+                        help="Etapas a refazer ignorando o cache, separadas por vírgula (ou 'todas')")
+    parser.add_argument('--sem-cache-etapas', dest='usar_cache', action='store_false',
+                        help="Executa todas as análises sem ler nem gravar o cache de etapas")
+    parser.add_argument('--outliers', default='iqr',
+                        help="Métodos de detecção de outliers separados por vírgula (iqr, mad, hampel)")
+    parser.add_argument('--winsorizar', action='store_true',
+                        help="Winsoriza os outliers em vez de remover as linhas")
+    parser.add_argument('--confianca', default='0.95',
+                        help="Níveis de confiança do erro amostral separados por vírgula (ex.: 0.9,0.95,0.99)")
+    parser.add_argument('--bootstrap', choices=['iid', 'bloco', 'estacionario'], default='estacionario',
+                        help="Esquema de reamostragem dos intervalos bootstrap")
+    parser.add_argument('--processos', type=int, default=None,
+                        help="Processos para o bootstrap de universos grandes e os testes de estacionariedade")
+    parser.add_argument('--correlacao', choices=list(METODOS_CORRELACAO), default='pearson',
+                        help="Método da matriz de correlação")
+    parser.add_argument('--janelas-beta', default='60,120,252',
+                        help="Janelas (em pregões) dos betas móveis, separadas por vírgula")
+    parser.add_argument('--janela-adf', type=int, default=252,
+                        help="Janela (em pregões) do teste ADF móvel")
+    args = parser.parse_args()
+    
+    refazer = [e.strip() for e in args.refazer.split(',') if e.strip()]
+    metodos = tuple(m.strip() for m in args.outliers.split(',') if m.strip())
+    tratamento = 'winsorizar' if args.winsorizar else 'remover'
+    niveis = tuple(float(n) for n in args.confianca.split(','))
+    resultados = gerar_relatorio_completo(args.usar_cache, refazer, metodos, tratamento,
+                                          niveis, args.bootstrap, args.processos, args.correlacao,
+                                          tuple(int(j) for j in args.janelas_beta.split(',')), args.janela_adf)
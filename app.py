@@ -8,6 +8,14 @@ import os
 from io import StringIO
 import google.generativeai as genai
 
+from universo import carregar_universo
+from armazenamento import carregar_dados, DIRETORIO_DADOS
+from deteccao_outliers import aplicar_mascara_outliers, CAMINHO_MASCARA_OUTLIERS
+from motor_correlacao import (CAMINHO_CORRELACAO_MOVEL, carregar_matrizes_moveis, matrizes_moveis, matrizes_ewma,
+                              matriz_na_data, serie_par)
+from motor_volatilidade import (CAMINHO_VOLATILIDADE, MODELOS_VOLATILIDADE, carregar_volatilidades,
+                                ajustar_volatilidades, trajetoria_volatilidade)
+
 # Funções de cache para otimização
 @st.cache_data
 def carregar_dados_csv(caminho):
@@ -16,6 +24,63 @@ def carregar_dados_csv(caminho):
         return pd.read_csv(caminho, index_col=0, parse_dates=True)
     return None
 
+@st.cache_data
+def carregar_tabela_app(nome, colunas=None):
+    """Carrega uma tabela do projeto (Parquet em dados/, ou o CSV anterior) com cache"""
+    diretorio_app = os.path.dirname(os.path.abspath(__file__))
+    return carregar_dados(nome, colunas=list(colunas) if colunas else None,
+                          diretorio=os.path.join(diretorio_app, DIRETORIO_DADOS), diretorio_csv=diretorio_app)
+
+@st.cache_data
+def carregar_sem_outliers_app():
+    """Dataset final sem outliers: a máscara gravada pela análise aplicada sobre dados_final"""
+    df_final = carregar_tabela_app('final')
+    if df_final is None:
+        return None
+    diretorio_app = os.path.dirname(os.path.abspath(__file__))
+    return aplicar_mascara_outliers(df_final, os.path.join(diretorio_app, CAMINHO_MASCARA_OUTLIERS))
+
+@st.cache_resource
+def carregar_correlacao_movel_app(janela=60, span=60):
+    """
+    Correlações móveis (janela e EWMA) gravadas por coletar_dados.py em correlacao_movel/
+    
+    As pilhas gravadas são abertas por memória mapeada e compartilhadas entre as
+    sessões (cache_resource, sem cópia); cada gráfico lê só a data ou o par que usa.
+    Se o diretório ainda não existir, as matrizes são calculadas a partir da tabela de retornos.
+    """
+    diretorio_app = os.path.dirname(os.path.abspath(__file__))
+    resultados = carregar_matrizes_moveis(os.path.join(diretorio_app, CAMINHO_CORRELACAO_MOVEL))
+    if resultados is not None:
+        return resultados
+    df_retornos = carregar_tabela_app('retornos')
+    if df_retornos is None:
+        return None
+    universo = carregar_universo_app()
+    colunas = [c for c in [f'Retorno_{nome}' for nome in universo.acoes] + ['Retorno_BigTech_Index']
+               if c in df_retornos.columns]
+    return {
+        'janela': matrizes_moveis(df_retornos, janela, colunas=colunas),
+        'ewma': matrizes_ewma(df_retornos, span=span, colunas=colunas)
+    }
+
+@st.cache_data
+def carregar_volatilidade_app():
+    """
+    Volatilidade condicional (GARCH, GJR, EGARCH) gravada por coletar_dados.py em volatilidade_garch.npz
+    
+    Se o arquivo ainda não existir, ajusta os modelos só para o S&P 500 e o Big Tech Index.
+    """
+    diretorio_app = os.path.dirname(os.path.abspath(__file__))
+    resultado = carregar_volatilidades(os.path.join(diretorio_app, CAMINHO_VOLATILIDADE))
+    if resultado is not None:
+        return resultado
+    df_retornos = carregar_tabela_app('retornos')
+    if df_retornos is None:
+        return None
+    colunas = [c for c in ['Retorno_SP500', 'Retorno_BigTech_Index'] if c in df_retornos.columns]
+    return ajustar_volatilidades(df_retornos, colunas, processos=1)
+
 @st.cache_data
 def carregar_html(caminho):
     """Carrega arquivo HTML com cache"""
@@ -24,6 +89,11 @@ def carregar_html(caminho):
             return f.read()
     return None
 
+@st.cache_resource
+def carregar_universo_app():
+    """Carrega o universo de ativos (universo.json) com cache"""
+    return carregar_universo()
+
 def formatar_numero_br(valor, casas=2):
     """Formata número para padrão brasileiro (vírgula como decimal)"""
     if pd.isna(valor):
@@ -1262,18 +1332,15 @@ elif secao == "🔬 Metodologia":
 elif secao == "📊 Dados Coletados":
     st.markdown('<div class="sub-header">📊 Dados Coletados e Processados</div>', unsafe_allow_html=True)
     
-    # Verificar se os arquivos de dados existem
-    caminho_retornos = os.path.join(os.path.dirname(__file__), 'dados_retornos.csv')
-    caminho_precos = os.path.join(os.path.dirname(__file__), 'dados_precos.csv')
-    caminho_pesos = os.path.join(os.path.dirname(__file__), 'dados_pesos_bigtech.csv')
+    # Carregar dados (tabelas Parquet, ou os CSV do formato anterior)
+    df_retornos = carregar_tabela_app('retornos')
+    df_precos = carregar_tabela_app('precos')
     
-    if os.path.exists(caminho_retornos) and os.path.exists(caminho_precos):
+    if df_retornos is not None and df_precos is not None:
         
         try:
-            # Carregar dados
-            df_retornos = pd.read_csv(caminho_retornos, index_col=0, parse_dates=True)
-            df_precos = pd.read_csv(caminho_precos, index_col=0, parse_dates=True)
-            df_pesos = pd.read_csv(caminho_pesos, index_col=0, parse_dates=True)
+            df_pesos = carregar_tabela_app('pesos_bigtech')
+            universo_app = carregar_universo_app()
             
             st.success(f"✅ Dados carregados com sucesso! Total de {len(df_retornos)} observações diárias")
             
@@ -1314,13 +1381,14 @@ elif secao == "📊 Dados Coletados":
                     'Meta': '#7f7f7f'
                 }
                 
-                for col in ['SP500', 'Apple', 'Microsoft', 'Alphabet', 'Amazon', 'Nvidia', 'Tesla', 'Meta']:
+                paleta = px.colors.qualitative.Dark24
+                for i, col in enumerate(universo_app.acoes):
                     if col in df_precos_norm.columns:
                         fig.add_trace(go.Scatter(
                             x=df_precos_norm.index,
                             y=df_precos_norm[col],
                             name=col,
-                            line=dict(color=cores.get(col, '#000000'), width=2)
+                            line=dict(color=cores.get(col, paleta[i % len(paleta)]), width=2)
                         ))
                 
                 fig.update_layout(
@@ -1474,12 +1542,11 @@ elif secao == "📊 Dados Coletados":
 elif secao == "📈 Análise Estatística":
     st.markdown('<div class="sub-header">📈 Análise Estatística</div>', unsafe_allow_html=True)
     
-    caminho_retornos = os.path.join(os.path.dirname(__file__), 'dados_retornos.csv')
+    colunas_analise = ['Retorno_SP500', 'Retorno_BigTech_Index', 'VIX', 'Taxa_Juros_10Y']
+    df_retornos = carregar_tabela_app('retornos', tuple(colunas_analise))
     
-    if os.path.exists(caminho_retornos):
+    if df_retornos is not None:
         try:
-            df_retornos = pd.read_csv(caminho_retornos, index_col=0, parse_dates=True)
-            colunas_analise = ['Retorno_SP500', 'Retorno_BigTech_Index', 'VIX', 'Taxa_Juros_10Y']
             
             # Criar abas
             tab1, tab2, tab3, tab4, tab5 = st.tabs([
@@ -1609,6 +1676,59 @@ elif secao == "📈 Análise Estatística":
                 if html_heatmap:
                     st.markdown("#### 🎨 Heatmap Interativo Completo")
                     st.components.v1.html(html_heatmap, height=750, scrolling=True)
+                
+                # Correlações móveis (janela deslizante e EWMA)
+                correlacao_movel = carregar_correlacao_movel_app()
+                if correlacao_movel:
+                    st.markdown("---")
+                    st.markdown("#### 📈 Evolução das Correlações")
+                    
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        tipo_movel = st.radio(
+                            "Ponderação",
+                            options=list(correlacao_movel),
+                            format_func=lambda t: {'janela': 'Janela móvel (60 dias)',
+                                                   'ewma': 'Exponencial (EWMA, span 60)'}.get(t, t),
+                            horizontal=True
+                        )
+                    movel = correlacao_movel[tipo_movel]
+                    datas_movel = movel['datas']
+                    with col2:
+                        data_movel = st.select_slider(
+                            "Data da matriz",
+                            options=list(datas_movel.date),
+                            value=datas_movel[-1].date()
+                        )
+                    
+                    # Acoplamento de cada ativo ao mercado ao longo do tempo
+                    mercado = 'Retorno_SP500'
+                    outros = [c for c in movel['colunas'] if c != mercado]
+                    if mercado in movel['colunas']:
+                        df_acoplamento = serie_par(movel, outros, mercado)
+                        df_acoplamento.columns = [c.replace('Retorno_', '') for c in df_acoplamento.columns]
+                        fig_acoplamento = px.line(
+                            df_acoplamento,
+                            title='Correlação com o S&P 500 ao Longo do Tempo',
+                            labels={'value': 'Correlação', 'index': 'Data', 'variable': 'Ativo'}
+                        )
+                        fig_acoplamento.add_vline(x=pd.Timestamp(data_movel), line_dash='dash', line_color='gray')
+                        fig_acoplamento.update_layout(height=500, hovermode='x unified')
+                        st.plotly_chart(fig_acoplamento, use_container_width=True)
+                    
+                    corr_data = matriz_na_data(movel, data_movel)
+                    rotulos = [c.replace('Retorno_', '') for c in corr_data.columns]
+                    fig_corr_data = px.imshow(
+                        corr_data.to_numpy(),
+                        x=rotulos, y=rotulos,
+                        text_auto='.2f',
+                        color_continuous_scale='RdBu_r',
+                        zmin=-1, zmax=1,
+                        aspect='auto',
+                        title=f'Matriz de Correlação em {data_movel}'
+                    )
+                    fig_corr_data.update_layout(height=600)
+                    st.plotly_chart(fig_corr_data, use_container_width=True)
             
             # ABA 3: Volatilidade
             with tab3:
@@ -1687,6 +1807,65 @@ elif secao == "📈 Análise Estatística":
                     hovermode='x unified'
                 )
                 st.plotly_chart(fig_vol, use_container_width=True)
+                
+                # Volatilidade condicional dos modelos GARCH
+                volatilidade = carregar_volatilidade_app()
+                if volatilidade:
+                    st.markdown("---")
+                    st.markdown("#### 🌪️ Volatilidade Condicional (Modelos GARCH)")
+                    
+                    rotulos_series = {c: c.replace('Retorno_', '').replace('_Index', ' Index')
+                                      for c in volatilidade['colunas']}
+                    col1, col2 = st.columns([1, 2])
+                    with col1:
+                        modelo_vol = st.radio(
+                            "Modelo",
+                            options=[m for m in MODELOS_VOLATILIDADE if m in volatilidade['modelos']],
+                            format_func=lambda m: {'GARCH': 'GARCH(1,1)', 'GJR': 'GJR-GARCH',
+                                                   'EGARCH': 'EGARCH'}.get(m, m),
+                            horizontal=True
+                        )
+                    with col2:
+                        series_vol = st.multiselect(
+                            "Séries",
+                            options=volatilidade['colunas'],
+                            default=volatilidade['colunas'][:2],
+                            format_func=lambda c: rotulos_series[c]
+                        )
+                    
+                    if series_vol:
+                        historico, previsao = trajetoria_volatilidade(volatilidade, modelo_vol, series_vol)
+                        fig_garch = go.Figure()
+                        for i, col in enumerate(series_vol):
+                            cor = px.colors.qualitative.Plotly[i % len(px.colors.qualitative.Plotly)]
+                            fig_garch.add_trace(go.Scatter(
+                                x=historico.index, y=historico[col], name=rotulos_series[col],
+                                line=dict(color=cor, width=2)
+                            ))
+                            fig_garch.add_trace(go.Scatter(
+                                x=previsao.index, y=previsao[col], name=f'{rotulos_series[col]} (previsão)',
+                                line=dict(color=cor, width=2, dash='dash')
+                            ))
+                        fig_garch.update_layout(
+                            title=f'Volatilidade Condicional Anualizada: {modelo_vol} '
+                                  f'(previsão de {volatilidade["horizonte"]} dias)',
+                            xaxis_title='Data',
+                            yaxis_title='Volatilidade Anualizada (%)',
+                            height=500,
+                            hovermode='x unified'
+                        )
+                        st.plotly_chart(fig_garch, use_container_width=True)
+                        
+                        tabela_vol = volatilidade['tabela']
+                        tabela_vol = tabela_vol[(tabela_vol['Modelo'] == modelo_vol) &
+                                                (tabela_vol['Série'].isin(series_vol))].dropna(axis=1, how='all')
+                        st.dataframe(
+                            tabela_vol.assign(**{'Série': tabela_vol['Série'].map(rotulos_series)})
+                            .set_index('Série').drop(columns=['Modelo']).round(4),
+                            use_container_width=True
+                        )
+                        st.caption("μ e ω na escala de retornos em %; persistência próxima de 1 indica "
+                                   "choques de volatilidade duradouros.")
             
             # ABA 4: Outliers
             with tab4:
@@ -1767,7 +1946,7 @@ elif secao == "📈 Análise Estatística":
                 with col1:
                     st.markdown("#### 📊 Dados Brutos")
                     
-                    csv_retornos = converter_df_para_csv(df_retornos)
+                    csv_retornos = converter_df_para_csv(carregar_tabela_app('retornos'))
                     st.download_button(
                         label="📥 Retornos Completos",
                         data=csv_retornos,
@@ -1776,9 +1955,8 @@ elif secao == "📈 Análise Estatística":
                         use_container_width=True
                     )
                     
-                    caminho_precos = os.path.join(os.path.dirname(__file__), 'dados_precos.csv')
-                    if os.path.exists(caminho_precos):
-                        df_precos = carregar_dados_csv(caminho_precos)
+                    df_precos = carregar_tabela_app('precos')
+                    if df_precos is not None:
                         csv_precos = converter_df_para_csv(df_precos)
                         st.download_button(
                             label="📥 Preços Históricos",
@@ -1791,9 +1969,8 @@ elif secao == "📈 Análise Estatística":
                 with col2:
                     st.markdown("#### 📈 Dados Processados")
                     
-                    caminho_sem_outliers = os.path.join(os.path.dirname(__file__), 'dados_final_sem_outliers.csv')
-                    if os.path.exists(caminho_sem_outliers):
-                        df_sem_outliers = carregar_dados_csv(caminho_sem_outliers)
+                    df_sem_outliers = carregar_sem_outliers_app()
+                    if df_sem_outliers is not None:
                         csv_sem_outliers = converter_df_para_csv(df_sem_outliers)
                         st.download_button(
                             label="📥 Dados Sem Outliers",
@@ -1803,9 +1980,8 @@ elif secao == "📈 Análise Estatística":
                             use_container_width=True
                         )
                     
-                    caminho_final = os.path.join(os.path.dirname(__file__), 'dados_final.csv')
-                    if os.path.exists(caminho_final):
-                        df_final = carregar_dados_csv(caminho_final)
+                    df_final = carregar_tabela_app('final')
+                    if df_final is not None:
                         csv_final = converter_df_para_csv(df_final)
                         st.download_button(
                             label="📥 Dataset Final",
@@ -1854,13 +2030,12 @@ elif secao == "🔮 Regressão Linear":
     st.markdown('<div class="sub-header">🔮 Regressão Linear Múltipla</div>', unsafe_allow_html=True)
     
     caminho_regressao = os.path.join(os.path.dirname(__file__), 'regressao_multipla.csv')
-    caminho_dados = os.path.join(os.path.dirname(__file__), 'dados_final.csv')
+    df_dados = carregar_tabela_app('final')
     
-    if os.path.exists(caminho_regressao) and os.path.exists(caminho_dados):
+    if os.path.exists(caminho_regressao) and df_dados is not None:
         try:
             # Carregar dados com cache
             df_regressao = carregar_dados_csv(caminho_regressao)
-            df_dados = carregar_dados_csv(caminho_dados)
             
             st.markdown("""
             <div class="highlight-box">
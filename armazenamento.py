@@ -0,0 +1,175 @@
+"""
+Armazenamento Colunar
+Grava e lê as tabelas do projeto como datasets Parquet particionados por ano
+"""
+
+import os
+import shutil
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+DIRETORIO_DADOS = 'dados'
+
+# Tabelas geradas pela coleta -> arquivo CSV equivalente (formato anterior, ainda aceito na leitura)
+TABELAS_CSV = {
+    'precos': 'dados_precos.csv',
+    'retornos': 'dados_retornos.csv',
+    'pesos_bigtech': 'dados_pesos_bigtech.csv',
+    'final': 'dados_final.csv',
+}
+
+_PARTICIONAMENTO = ds.partitioning(pa.schema([('ano', pa.int16())]), flavor='hive')
+
+
+def _caminho_tabela(nome, diretorio=DIRETORIO_DADOS):
+    return os.path.join(diretorio, nome)
+
+
+def existe_tabela(nome, diretorio=DIRETORIO_DADOS):
+    return os.path.isdir(_caminho_tabela(nome, diretorio))
+
+
+def esquema_tabela(df):
+    """
+    Esquema explícito: índice de datas em timestamp[ns] e colunas numéricas em float64
+    """
+    nome_indice = df.index.name or 'Data'
+    campos = [pa.field(nome_indice, pa.timestamp('ns'), nullable=False)]
+    campos += [pa.field(str(coluna), pa.float64()) for coluna in df.columns]
+    return pa.schema(campos, metadata={b'indice': nome_indice.encode()})
+
+
+def _para_arrow(df, particionar):
+    esquema = esquema_tabela(df)
+    nome_indice = esquema.field(0).name
+
+    colunas = [pa.array(pd.DatetimeIndex(df.index).as_unit('ns'), type=pa.timestamp('ns'))]
+    colunas += [pa.array(df[c].to_numpy(dtype='float64'), type=pa.float64()) for c in df.columns]
+    tabela = pa.Table.from_arrays(colunas, schema=esquema)
+
+    if particionar:
+        anos = pa.array(pd.DatetimeIndex(df.index).year.to_numpy(dtype='int16'), type=pa.int16())
+        tabela = tabela.append_column(pa.field('ano', pa.int16()), anos)
+        tabela = tabela.replace_schema_metadata({b'indice': nome_indice.encode()})
+    return tabela
+
+
+def _gravar(df, caminho, compressao, particionar, prefixo):
+    formato = ds.ParquetFileFormat()
+    ds.write_dataset(
+        _para_arrow(df, particionar),
+        caminho,
+        format=formato,
+        partitioning=_PARTICIONAMENTO if particionar else None,
+        file_options=formato.make_write_options(compression=compressao),
+        basename_template=f'{prefixo}-{{i}}.parquet',
+        existing_data_behavior='overwrite_or_ignore'
+    )
+
+
+def salvar_tabela(df, nome, diretorio=DIRETORIO_DADOS, compressao='zstd', particionar=True):
+    """
+    Grava `df` (índice de datas) como dataset Parquet em `diretorio/nome`
+
+    Com `particionar=True`, cada ano fica em `ano=AAAA/`, o que permite ler só os
+    anos pedidos. `compressao` aceita os codecs do Parquet ('zstd', 'snappy', None...).
+    A tabela anterior com o mesmo nome é substituída.
+    """
+    caminho = _caminho_tabela(nome, diretorio)
+    if os.path.exists(caminho):
+        shutil.rmtree(caminho)
+    _gravar(df, caminho, compressao, particionar, 'parte-0')
+    return caminho
+
+
+def anexar_tabela(df, nome, diretorio=DIRETORIO_DADOS, compressao='zstd'):
+    """
+    Anexa linhas a uma tabela existente gravando apenas um novo arquivo na partição do ano
+
+    O custo é proporcional às linhas novas; as colunas seguem o esquema já gravado.
+    """
+    dataset = _dataset(nome, diretorio)
+    nome_indice = _nome_indice(dataset)
+    colunas = [c for c in dataset.schema.names if c not in ('ano', nome_indice)]
+
+    df = df.reindex(columns=colunas)
+    df.index.name = nome_indice
+    caminho = _caminho_tabela(nome, diretorio)
+    _gravar(df, caminho, compressao, particionar=True, prefixo=f'parte-{time.time_ns()}')
+    return caminho
+
+
+def _dataset(nome, diretorio):
+    return ds.dataset(_caminho_tabela(nome, diretorio), format='parquet', partitioning=_PARTICIONAMENTO)
+
+
+def _nome_indice(dataset):
+    metadados = dataset.schema.metadata or {}
+    return metadados.get(b'indice', dataset.schema.names[0].encode()).decode()
+
+
+def carregar_tabela(nome, colunas=None, inicio=None, fim=None, diretorio=DIRETORIO_DADOS):
+    """
+    Lê uma tabela Parquet, opcionalmente só algumas colunas e um intervalo de datas
+
+    `inicio` e `fim` são inclusivos. Os filtros são aplicados na leitura: partições
+    de anos fora do intervalo nem chegam a ser abertas.
+    """
+    dataset = _dataset(nome, diretorio)
+    nome_indice = _nome_indice(dataset)
+
+    filtro = None
+    if inicio is not None:
+        inicio = pd.Timestamp(inicio)
+        filtro = (ds.field('ano') >= inicio.year) & (ds.field(nome_indice) >= pa.scalar(inicio.as_unit('ns')))
+    if fim is not None:
+        fim = pd.Timestamp(fim)
+        condicao = (ds.field('ano') <= fim.year) & (ds.field(nome_indice) <= pa.scalar(fim.as_unit('ns')))
+        filtro = condicao if filtro is None else filtro & condicao
+
+    nomes = [c for c in dataset.schema.names if c not in ('ano', nome_indice)]
+    if colunas is not None:
+        nomes = [c for c in colunas if c in nomes]
+
+    tabela = dataset.to_table(columns=[nome_indice] + nomes, filter=filtro)
+    df = tabela.to_pandas().set_index(nome_indice).sort_index()
+    return df
+
+
+def ler_cauda(nome, n_linhas, diretorio=DIRETORIO_DADOS):
+    """Lê as últimas `n_linhas` da tabela abrindo apenas as partições mais recentes"""
+    caminho = _caminho_tabela(nome, diretorio)
+    anos = sorted(int(p.split('=')[1]) for p in os.listdir(caminho) if p.startswith('ano='))
+
+    partes = []
+    total = 0
+    for ano in reversed(anos):
+        df_ano = carregar_tabela(nome, inicio=f'{ano}-01-01', fim=f'{ano}-12-31', diretorio=diretorio)
+        partes.insert(0, df_ano)
+        total += len(df_ano)
+        if total >= n_linhas:
+            break
+    return pd.concat(partes).iloc[-n_linhas:]
+
+
+def carregar_dados(nome, colunas=None, inicio=None, fim=None, diretorio=DIRETORIO_DADOS, diretorio_csv='.'):
+    """
+    Carrega uma tabela do projeto pelo nome ('precos', 'retornos', 'pesos_bigtech', 'final')
+
+    Usa o dataset Parquet quando existir; caso contrário, recorre ao CSV correspondente
+    (formato anterior), aplicando os mesmos filtros depois da leitura.
+    Retorna None se nenhum dos dois existir.
+    """
+    if existe_tabela(nome, diretorio):
+        return carregar_tabela(nome, colunas, inicio, fim, diretorio)
+
+    caminho_csv = os.path.join(diretorio_csv, TABELAS_CSV.get(nome, f'{nome}.csv'))
+    if not os.path.exists(caminho_csv):
+        return None
+    df = pd.read_csv(caminho_csv, index_col=0, parse_dates=True)
+    if colunas is not None:
+        df = df[[c for c in colunas if c in df.columns]]
+    return df.loc[inicio:fim]
@@ -0,0 +1,328 @@
+"""
+Cache de Etapas
+Executa o pipeline como um grafo de etapas cujas saídas ficam em cache, indexadas
+pelo hash do conteúdo das entradas e dos parâmetros
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import sys
+
+import numpy as np
+import pandas as pd
+
+DIRETORIO_CACHE_ETAPAS = 'cache_etapas'
+
+_NAO_CARREGADO = object()
+
+
+def hash_conteudo(valor, objetos=False):
+    """
+    Hash estável (hex) do conteúdo de `valor`
+
+    Cobre tipos primitivos, arrays NumPy, objetos do pandas e contêineres desses tipos.
+    Com `objetos=True`, outros objetos são descritos pelos atributos públicos (usado
+    para parâmetros como o Universo e as fontes de preços); caso contrário, um tipo
+    desconhecido faz a função retornar None.
+    """
+    h = hashlib.sha256()
+    if not _atualizar_hash(h, valor, objetos):
+        return None
+    return h.hexdigest()[:32]
+
+
+def _atualizar_hash(h, valor, objetos):
+    h.update(type(valor).__name__.encode())
+
+    if valor is None or isinstance(valor, (bool, int, float, complex, str, bytes, np.generic, pd.Timestamp)):
+        h.update(repr(valor).encode())
+    elif isinstance(valor, np.ndarray):
+        if valor.dtype == object:
+            return _atualizar_hash(h, valor.tolist(), objetos)
+        h.update(f'{valor.dtype.str}{valor.shape}'.encode())
+        h.update(np.ascontiguousarray(valor).tobytes())
+    elif isinstance(valor, (pd.DataFrame, pd.Series, pd.Index)):
+        if isinstance(valor, pd.DataFrame):
+            h.update(repr([str(c) for c in valor.columns]).encode())
+            h.update(repr([str(t) for t in valor.dtypes]).encode())
+        else:
+            h.update(repr((valor.name, str(valor.dtype))).encode())
+        if not isinstance(valor, pd.Index):
+            h.update(repr(valor.index.names).encode())
+        try:
+            linhas = pd.util.hash_pandas_object(valor, index=not isinstance(valor, pd.Index))
+        except TypeError:
+            return False
+        h.update(linhas.to_numpy().tobytes())
+    elif isinstance(valor, dict):
+        for chave in sorted(valor, key=repr):
+            h.update(repr(chave).encode())
+            if not _atualizar_hash(h, valor[chave], objetos):
+                return False
+    elif isinstance(valor, (list, tuple)):
+        h.update(str(len(valor)).encode())
+        for item in valor:
+            if not _atualizar_hash(h, item, objetos):
+                return False
+    elif isinstance(valor, (set, frozenset)):
+        return _atualizar_hash(h, sorted(valor, key=repr), objetos)
+    elif objetos and hasattr(valor, '__dict__'):
+        h.update(type(valor).__qualname__.encode())
+        publicos = {k: v for k, v in vars(valor).items() if not k.startswith('_')}
+        return _atualizar_hash(h, publicos, objetos)
+    else:
+        return False
+    return True
+
+
+def _modulos_projeto(modulo):
+    """
+    O módulo e, transitivamente, os módulos do projeto (mesmo diretório) que ele usa
+
+    Um módulo é usado se aparece nos globais do outro, diretamente (import modulo)
+    ou pela origem de algum nome importado (from modulo import funcao).
+    """
+    diretorio = os.path.dirname(os.path.abspath(modulo.__file__))
+    encontrados = {}
+    pendentes = [modulo]
+    while pendentes:
+        atual = pendentes.pop()
+        if atual.__name__ in encontrados:
+            continue
+        encontrados[atual.__name__] = atual
+        for valor in list(vars(atual).values()):
+            usado = valor if inspect.ismodule(valor) else sys.modules.get(getattr(valor, '__module__', None) or '')
+            arquivo = getattr(usado, '__file__', None)
+            if arquivo and os.path.dirname(os.path.abspath(arquivo)) == diretorio and usado.__name__ not in encontrados:
+                pendentes.append(usado)
+    return [encontrados[nome] for nome in sorted(encontrados)]
+
+
+def _assinatura_funcao(funcao):
+    """
+    Hash do código da etapa: o código-fonte do módulo que define a função e de todos
+    os módulos do projeto que ele usa (motores, acumuladores, fontes). Alterar a
+    implementação de qualquer um deles invalida o cache da etapa.
+    """
+    modulo = inspect.getmodule(funcao)
+    h = hashlib.sha256(getattr(funcao, '__qualname__', repr(funcao)).encode())
+    if modulo is None or not getattr(modulo, '__file__', None):
+        try:
+            h.update(inspect.getsource(funcao).encode())
+        except (OSError, TypeError):
+            pass
+        return h.hexdigest()[:16]
+    for usado in _modulos_projeto(modulo):
+        h.update(usado.__name__.encode())
+        try:
+            h.update(inspect.getsource(usado).encode())
+        except (OSError, TypeError):
+            pass
+    return h.hexdigest()[:16]
+
+
+def _impressao_arquivos(arquivos):
+    """
+    Tamanho e data de modificação dos artefatos gravados pela etapa (diretórios são percorridos)
+
+    Retorna None se algum artefato não existir.
+    """
+    impressao = []
+    for caminho in arquivos:
+        if os.path.isdir(caminho):
+            for raiz, _, nomes in os.walk(caminho):
+                for nome in nomes:
+                    estado = os.stat(os.path.join(raiz, nome))
+                    impressao.append([os.path.join(raiz, nome), estado.st_size, estado.st_mtime_ns])
+        elif os.path.exists(caminho):
+            estado = os.stat(caminho)
+            impressao.append([caminho, estado.st_size, estado.st_mtime_ns])
+        else:
+            return None
+    return sorted(impressao)
+
+
+class Etapa:
+    """
+    Uma etapa do pipeline.
+
+    • funcao: chamada com as saídas das dependências e com `parametros` como argumentos nomeados
+    • dependencias: lista (argumentos posicionais) ou dicionário {argumento: dependência};
+      cada dependência é o nome de outra etapa ou (nome, posição) para usar um item
+      de uma saída em tupla
+    • arquivos: artefatos gravados pela etapa; se algum sumir ou for alterado fora
+      do pipeline, a etapa é executada de novo
+    """
+
+    def __init__(self, nome, funcao, dependencias=(), parametros=None, arquivos=(), cache=True):
+        self.nome = nome
+        self.funcao = funcao
+        self.dependencias = dependencias
+        self.parametros = parametros or {}
+        self.arquivos = list(arquivos)
+        self.cache = cache
+
+    def _itens_dependencias(self):
+        if isinstance(self.dependencias, dict):
+            return list(self.dependencias.items())
+        return [(None, dep) for dep in self.dependencias]
+
+    def nomes_dependencias(self):
+        return [dep if isinstance(dep, str) else dep[0] for _, dep in self._itens_dependencias()]
+
+    def chave(self, hashes_dependencias):
+        """Hash do código (função e módulos do projeto que ela usa), dos parâmetros e do conteúdo de cada entrada"""
+        hash_parametros = hash_conteudo(self.parametros, objetos=True)
+        if hash_parametros is None:
+            raise TypeError(f"Parâmetros da etapa '{self.nome}' não podem ser usados como chave de cache")
+        partes = [self.nome, _assinatura_funcao(self.funcao), hash_parametros]
+        for argumento, dep in self._itens_dependencias():
+            posicao = None if isinstance(dep, str) else dep[1]
+            nome_dep = dep if isinstance(dep, str) else dep[0]
+            partes.append(f'{argumento}={hashes_dependencias[nome_dep]}[{posicao}]')
+        return hashlib.sha256('|'.join(partes).encode()).hexdigest()[:32]
+
+    def __repr__(self):
+        return f"Etapa({self.nome!r}, dependencias={self.nomes_dependencias()})"
+
+
+class GrafoEtapas:
+    """
+    Grafo de dependências entre etapas, com saídas persistidas em `diretorio`.
+
+    Cada saída é gravada sob a chave da etapa (hash do código da função e dos
+    módulos do projeto que ela usa, dos parâmetros e do conteúdo das entradas). Ao executar de novo, só rodam as etapas cuja chave mudou;
+    como a chave depende do conteúdo e não da execução, uma etapa refeita que produz
+    o mesmo resultado não invalida as seguintes. Saídas reaproveitadas só são lidas
+    do disco quando alguma etapa posterior precisa delas.
+    """
+
+    def __init__(self, diretorio=DIRETORIO_CACHE_ETAPAS, usar_cache=True, refazer=()):
+        self.diretorio = diretorio
+        self.usar_cache = usar_cache
+        self.refazer = set(refazer)
+        self.etapas = {}
+        self.executadas = []
+        self.reaproveitadas = []
+        self._estado = {}
+
+    def adicionar(self, nome, funcao, dependencias=(), parametros=None, arquivos=(), cache=True):
+        if nome in self.etapas:
+            raise ValueError(f"Etapa '{nome}' já definida")
+        etapa = Etapa(nome, funcao, dependencias, parametros, arquivos, cache)
+        for dep in etapa.nomes_dependencias():
+            if dep not in self.etapas:
+                raise ValueError(f"Etapa '{nome}' depende de '{dep}', que ainda não foi definida")
+        self.etapas[nome] = etapa
+        return etapa
+
+    def entrada(self, nome, valor):
+        """Registra um valor externo (ex.: dados já carregados) como etapa sem dependências"""
+        etapa = self.adicionar(nome, None, cache=False)
+        hash_valor = hash_conteudo(valor) or hashlib.sha256(pickle.dumps(valor)).hexdigest()[:32]
+        self._estado[nome] = {'hash': hash_valor, 'valor': valor}
+        return etapa
+
+    def _ordem(self, alvos):
+        ordem = []
+        visitadas = set()
+
+        def visitar(nome):
+            if nome in visitadas:
+                return
+            visitadas.add(nome)
+            for dep in self.etapas[nome].nomes_dependencias():
+                visitar(dep)
+            ordem.append(nome)
+
+        for alvo in alvos:
+            visitar(alvo)
+        return ordem
+
+    def _caminho(self, nome, chave, extensao):
+        return os.path.join(self.diretorio, nome, f'{chave}.{extensao}')
+
+    def _buscar(self, etapa, chave):
+        """Metadados da saída em cache, ou None se ela não puder ser reaproveitada"""
+        if not (self.usar_cache and etapa.cache) or etapa.nome in self.refazer or 'todas' in self.refazer:
+            return None
+        caminho_meta = self._caminho(etapa.nome, chave, 'json')
+        if not os.path.exists(caminho_meta) or not os.path.exists(self._caminho(etapa.nome, chave, 'pkl')):
+            return None
+        with open(caminho_meta, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if etapa.arquivos and meta.get('arquivos') != _impressao_arquivos(etapa.arquivos):
+            return None
+        return meta
+
+    def _gravar(self, etapa, chave, valor, hash_saida):
+        os.makedirs(os.path.join(self.diretorio, etapa.nome), exist_ok=True)
+        try:
+            with open(self._caminho(etapa.nome, chave, 'pkl'), 'wb') as f:
+                pickle.dump(valor, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError) as erro:
+            print(f"  ⚠️ Saída da etapa '{etapa.nome}' não pôde ser gravada em cache: {erro}")
+            return
+        meta = {
+            'etapa': etapa.nome,
+            'hash_saida': hash_saida,
+            'arquivos': _impressao_arquivos(etapa.arquivos) if etapa.arquivos else None
+        }
+        with open(self._caminho(etapa.nome, chave, 'json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+
+    def _valor(self, nome):
+        estado = self._estado[nome]
+        if estado['valor'] is _NAO_CARREGADO:
+            with open(self._caminho(nome, estado['chave'], 'pkl'), 'rb') as f:
+                estado['valor'] = pickle.load(f)
+        return estado['valor']
+
+    def _argumento(self, dep):
+        if isinstance(dep, str):
+            return self._valor(dep)
+        nome, posicao = dep
+        return self._valor(nome)[posicao]
+
+    def executar(self, alvos=None):
+        """
+        Executa (ou reaproveita) as etapas necessárias para `alvos` (padrão: todas)
+
+        Retorna um dicionário {nome: saída} com as saídas dos alvos.
+        """
+        alvos = list(self.etapas) if alvos is None else list(alvos)
+
+        for nome in self._ordem(alvos):
+            if nome in self._estado:
+                continue
+            etapa = self.etapas[nome]
+            hashes = {dep: self._estado[dep]['hash'] for dep in etapa.nomes_dependencias()}
+            chave = etapa.chave(hashes)
+
+            meta = self._buscar(etapa, chave)
+            if meta is not None:
+                self._estado[nome] = {'chave': chave, 'hash': meta['hash_saida'], 'valor': _NAO_CARREGADO}
+                self.reaproveitadas.append(nome)
+                print(f"♻️ Etapa '{nome}' reaproveitada do cache")
+                continue
+
+            itens = etapa._itens_dependencias()
+            posicionais = [self._argumento(dep) for argumento, dep in itens if argumento is None]
+            nomeados = {argumento: self._argumento(dep) for argumento, dep in itens if argumento is not None}
+            valor = etapa.funcao(*posicionais, **nomeados, **etapa.parametros)
+
+            # Saídas sem hash de conteúdo (ex.: modelos ajustados) são identificadas pela própria chave
+            hash_saida = hash_conteudo(valor) or chave
+            self._estado[nome] = {'chave': chave, 'hash': hash_saida, 'valor': valor}
+            self.executadas.append(nome)
+            if self.usar_cache and etapa.cache:
+                self._gravar(etapa, chave, valor, hash_saida)
+
+        return {nome: self._valor(nome) for nome in alvos}
+
+    def resumo(self):
+        total = len(self.executadas) + len(self.reaproveitadas)
+        return f"{len(self.executadas)} de {total} etapa(s) executada(s), {len(self.reaproveitadas)} reaproveitada(s) do cache"
@@ -1,71 +1,200 @@
-import yfinance as yf
+import argparse
+import io
 import pandas as pd
 import numpy as np
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
-def coletar_dados():
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from fontes_dados import FonteYFinance, FonteReplay, FonteSintetica, nome_arquivo_ticker
+from universo import carregar_universo
+from estatisticas_incrementais import AcumuladorMomentos, CAMINHO_ESTADO_PADRAO
+from motor_correlacao import (CAMINHO_CORRELACAO_MOVEL, matrizes_moveis, matrizes_ewma, matrizes_novas,
+                              salvar_matrizes_moveis, anexar_matrizes_moveis, carregar_matrizes_moveis)
+from motor_regressao import INTERCEPTO, betas_transversais
+from motor_volatilidade import (CAMINHO_VOLATILIDADE, ajustar_volatilidades, estender_volatilidades,
+                                salvar_volatilidades, carregar_volatilidades)
+from cache_etapas import GrafoEtapas, DIRETORIO_CACHE_ETAPAS
+from armazenamento import (DIRETORIO_DADOS, TABELAS_CSV, salvar_tabela, anexar_tabela, existe_tabela,
+                           ler_cauda, carregar_dados)
+
+# Diretório do cache local de preços (um arquivo Parquet por ticker)
+DIRETORIO_CACHE = 'cache_precos'
+
+# Tabela de ações em circulação (formato longo), dentro do diretório de cache
+ARQUIVO_CACHE_ACOES = 'acoes_em_circulacao.parquet'
+
+def _caminho_cache(ticker, diretorio=DIRETORIO_CACHE):
+    """Caminho do arquivo Parquet de cache de um ticker"""
+    return os.path.join(diretorio, f'{nome_arquivo_ticker(ticker)}.parquet')
+
+
+def carregar_cache_ticker(ticker, diretorio=DIRETORIO_CACHE):
+    """
+    Carrega o histórico em cache de um ticker.
+    
+    Retorna (DataFrame, data_inicio_coberta) ou (None, None) se não houver cache.
+    """
+    caminho = _caminho_cache(ticker, diretorio)
+    if not os.path.exists(caminho):
+        return None, None
+    
+    tabela = pq.read_table(caminho)
+    metadados = json.loads((tabela.schema.metadata or {}).get(b'cache_precos', b'{}'))
+    df_cache = tabela.to_pandas()
+    return df_cache, metadados.get('inicio')
+
+
+def salvar_cache_ticker(ticker, df_ticker, data_inicio, diretorio=DIRETORIO_CACHE):
+    """Grava o histórico de um ticker em Parquet, registrando o período coberto nos metadados"""
+    os.makedirs(diretorio, exist_ok=True)
+    
+    metadados_cache = {
+        'ticker': ticker,
+        'inicio': data_inicio,
+        'ultima_data': df_ticker.index.max().strftime('%Y-%m-%d'),
+    }
+    
+    tabela = pa.Table.from_pandas(df_ticker)
+    metadados = dict(tabela.schema.metadata or {})
+    metadados[b'cache_precos'] = json.dumps(metadados_cache).encode()
+    tabela = tabela.replace_schema_metadata(metadados)
+    pq.write_table(tabela, _caminho_cache(ticker, diretorio))
+
+
+def _planejar_downloads(tickers, data_inicio, data_fim, diretorio=DIRETORIO_CACHE):
     """
-    Coleta dados diários do mercado financeiro de 01/01/2022 a 31/12/2024
+    Define, para cada ticker, a partir de que data é preciso baixar dados.
+    
+    Retorna (caches, inicios, coberturas): os históricos já em disco, um dicionário
+    {data_inicio_download: [tickers]} apenas com o que falta buscar e o início
+    coberto por cada histórico reaproveitado.
+    """
+    caches = {}
+    inicios = {}
+    coberturas = {}
+    fim = pd.Timestamp(data_fim)
+    
+    for ticker in tickers:
+        df_cache, inicio_coberto = carregar_cache_ticker(ticker, diretorio)
+        
+        if df_cache is None or df_cache.empty or inicio_coberto is None or inicio_coberto > data_inicio:
+            inicios.setdefault(data_inicio, []).append(ticker)
+            continue
+        
+        caches[ticker] = df_cache
+        coberturas[ticker] = inicio_coberto
+        ultima_data = df_cache.index.max()
+        
+        # Cache já cobre o período solicitado (data_fim é exclusiva no yfinance)
+        if ultima_data + pd.Timedelta(days=1) >= fim:
+            continue
+        
+        # Rebaixa a partir do último dia em cache, que pode ter sido gravado incompleto
+        inicios.setdefault(ultima_data.strftime('%Y-%m-%d'), []).append(ticker)
+    
+    return caches, inicios, coberturas
+
+
+def coletar_dados(fonte=None, universo=None, tamanho_lote=50, max_workers=4, usar_cache=None,
+                  diretorio_cache=DIRETORIO_CACHE):
+    """
+    Coleta dados diários do mercado financeiro no período definido pelo universo
+    (padrão: universo.json, 01/01/2022 a 31/12/2024)
+    
+    Os preços vêm de `fonte` (um FontePrecos; por padrão, FonteYFinance).
+    Os tickers são pedidos em lotes de até `tamanho_lote` papéis,
+    processados em paralelo por no máximo `max_workers` threads.
+    Com cache ativo (padrão para fontes remotas), cada ticker é mantido em um
+    arquivo Parquet em `diretorio_cache` e apenas os dias ainda não armazenados são baixados.
     """
     print("🚀 Iniciando coleta de dados...")
     
+    if fonte is None:
+        fonte = FonteYFinance()
+    if universo is None:
+        universo = carregar_universo()
+    if usar_cache is None:
+        usar_cache = fonte.remota
+    print(f"  🔌 Fonte: {fonte!r}")
+    print(f"  🌐 {universo!r}")
+    
     # Definir período
-    data_inicio = "2022-01-01"
-    data_fim = "2024-12-31"
-    
-    # Tickers a serem coletados
-    tickers_acoes = {
-        'SP500': '^GSPC',
-        'Apple': 'AAPL',
-        'Microsoft': 'MSFT',
-        'Alphabet': 'GOOGL',
-        'Amazon': 'AMZN',
-        'Nvidia': 'NVDA',
-        'Tesla': 'TSLA',
-        'Meta': 'META'
-    }
+    data_inicio = universo.data_inicio
+    data_fim = universo.data_fim
     
-    tickers_indices = {
-        'VIX': '^VIX',
-        'Taxa_Juros_10Y': '^TNX'
-    }
+    # Ações usam o fechamento ajustado; VIX e Taxa de Juros usam o fechamento
+    requisicoes = [(nome, ticker, 'Adj Close') for nome, ticker in universo.acoes.items()]
+    requisicoes += [(nome, ticker, 'Close') for nome, ticker in universo.niveis.items()]
+    tickers = [ticker for _, ticker, _ in requisicoes]
     
-    # Coletar preços de fechamento ajustados
-    print("\n📊 Coletando preços de fechamento ajustados...")
-    dados_precos = {}
+    if usar_cache:
+        caches, inicios, coberturas = _planejar_downloads(tickers, data_inicio, data_fim, diretorio_cache)
+        print(f"\n🗄️ Cache local: {len(caches)} ticker(s) em disco, "
+              f"{sum(len(t) for t in inicios.values())} precisando de atualização")
+    else:
+        caches, inicios, coberturas = {}, {data_inicio: tickers}, {}
+    
+    # Lotes agrupam tickers que compartilham a mesma data inicial de download
+    lotes = []
+    for inicio, tickers_inicio in inicios.items():
+        for i in range(0, len(tickers_inicio), tamanho_lote):
+            lotes.append((inicio, tickers_inicio[i:i + tamanho_lote]))
     
-    for nome, ticker in tickers_acoes.items():
-        print(f"  • {nome} ({ticker})...", end=" ")
-        try:
-            dados = yf.download(ticker, start=data_inicio, end=data_fim, progress=False, auto_adjust=False)
-            if isinstance(dados.columns, pd.MultiIndex):
-                dados_precos[nome] = dados['Adj Close'].iloc[:, 0]
-            else:
-                dados_precos[nome] = dados['Adj Close']
-            print("✓")
-        except Exception as e:
-            print(f"✗ Erro: {e}")
-    
-    # Coletar VIX e Taxa de Juros
-    print("\n📉 Coletando índices adicionais...")
-    for nome, ticker in tickers_indices.items():
-        print(f"  • {nome} ({ticker})...", end=" ")
-        try:
-            dados = yf.download(ticker, start=data_inicio, end=data_fim, progress=False, auto_adjust=False)
-            if isinstance(dados.columns, pd.MultiIndex):
-                dados_precos[nome] = dados['Close'].iloc[:, 0]
-            else:
-                dados_precos[nome] = dados['Close']
-            print("✓")
-        except Exception as e:
-            print(f"✗ Erro: {e}")
+    print(f"\n📊 Coletando {sum(len(l) for _, l in lotes)} tickers em {len(lotes)} lote(s)...")
+    baixados = {}
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futuros = [executor.submit(fonte.baixar, lote, inicio, data_fim) for inicio, lote in lotes]
+        for futuro in as_completed(futuros):
+            baixados.update(futuro.result())
+    
+    # Mesclar o trecho novo ao histórico em cache; o início coberto continua sendo o
+    # mais antigo (uma atualização pede só os dias recentes, mas o cache vem de antes)
+    historicos = dict(caches)
+    for ticker, df_novo in baixados.items():
+        if ticker in caches:
+            df_ticker = pd.concat([caches[ticker], df_novo])
+            df_ticker = df_ticker[~df_ticker.index.duplicated(keep='last')].sort_index()
+            inicio_coberto = min(coberturas[ticker], data_inicio)
+        else:
+            df_ticker = df_novo
+            inicio_coberto = data_inicio
+        historicos[ticker] = df_ticker
+        if usar_cache:
+            salvar_cache_ticker(ticker, df_ticker, inicio_coberto, diretorio_cache)
+    
+    # Manter a ordem original das colunas
+    detalhar = len(requisicoes) <= 20
+    dados_precos = {}
+    faltantes = []
+    for nome, ticker, campo in requisicoes:
+        df_ticker = historicos.get(ticker)
+        if df_ticker is not None and campo in df_ticker.columns:
+            periodo = (df_ticker.index >= data_inicio) & (df_ticker.index < data_fim)
+            dados_precos[nome] = df_ticker.loc[periodo, campo]
+            if detalhar:
+                print(f"  • {nome} ({ticker})... ✓")
+        else:
+            faltantes.append(nome)
+            print(f"  • {nome} ({ticker})... ✗ Erro: dados não obtidos")
+    if not detalhar:
+        print(f"  ✓ {len(dados_precos)} de {len(requisicoes)} tickers obtidos")
     
     # Criar DataFrame consolidado
     df_precos = pd.DataFrame(dados_precos)
     df_precos.index.name = 'Data'
     
-    # Remover linhas com valores ausentes
-    df_precos = df_precos.dropna()
+    # Remover dias sem mercado/níveis. Constituintes listados depois do início do
+    # período (IPOs, spin-offs) ficam com NaN até a estreia em vez de cortar o histórico
+    obrigatorias = [c for c in list(universo.mercado) + list(universo.niveis) if c in df_precos.columns]
+    df_precos = df_precos.dropna(subset=obrigatorias)
+    if len(universo.constituintes) <= 20:
+        df_precos = df_precos.dropna()
     
     print(f"\n✅ Dados coletados: {len(df_precos)} dias de negociação")
     print(f"📅 Período: {df_precos.index.min().date()} a {df_precos.index.max().date()}")
@@ -73,127 +202,312 @@ def coletar_dados():
     return df_precos
 
 
-def calcular_retornos_logaritmicos(df_precos):
+def calcular_retornos_logaritmicos(df_precos, universo=None, horizontes=(1,)):
     """
     Calcula retornos logarítmicos para todas as séries de preços
+    
+    Os retornos são obtidos em uma única passada sobre a matriz de log-preços.
+    `horizontes` aceita janelas de vários dias (ex.: (1, 5, 21)); o horizonte de
+    1 dia gera as colunas `Retorno_<ativo>` e os demais `Retorno_<h>d_<ativo>`.
+    Horizontes menores que 1 levantam ValueError.
     """
+    invalidos = [h for h in horizontes if not isinstance(h, (int, np.integer)) or h < 1]
+    if invalidos:
+        raise ValueError(f"Horizontes devem ser inteiros >= 1: {invalidos}")
+    
     print("\n🔢 Calculando retornos logarítmicos...")
     
-    colunas_acoes = ['SP500', 'Apple', 'Microsoft', 'Alphabet', 'Amazon', 'Nvidia', 'Tesla', 'Meta']
+    if universo is None:
+        universo = carregar_universo()
     
-    df_retornos = pd.DataFrame(index=df_precos.index)
+    colunas_acoes = [c for c in universo.acoes if c in df_precos.columns]
+    colunas_niveis = [c for c in universo.niveis if c in df_precos.columns]
     
-    for coluna in colunas_acoes:
-        if coluna in df_precos.columns:
-            df_retornos[f'Retorno_{coluna}'] = np.log(df_precos[coluna] / df_precos[coluna].shift(1))
-            print(f"  ✓ {coluna}")
+    log_precos = np.log(df_precos[colunas_acoes].to_numpy(dtype=float))
+    
+    blocos = []
+    nomes_colunas = []
+    for h in horizontes:
+        retornos_h = np.full_like(log_precos, np.nan)
+        retornos_h[h:] = log_precos[h:] - log_precos[:-h]
+        blocos.append(retornos_h)
+        prefixo = 'Retorno_' if h == 1 else f'Retorno_{h}d_'
+        nomes_colunas += [f'{prefixo}{c}' for c in colunas_acoes]
+        print(f"  ✓ Horizonte de {h} dia(s): {len(colunas_acoes)} séries")
     
     # Manter VIX e Taxa de Juros como valores absolutos
-    df_retornos['VIX'] = df_precos['VIX']
-    df_retornos['Taxa_Juros_10Y'] = df_precos['Taxa_Juros_10Y']
+    blocos.append(df_precos[colunas_niveis].to_numpy(dtype=float))
+    nomes_colunas += colunas_niveis
+    
+    df_retornos = pd.DataFrame(np.hstack(blocos), index=df_precos.index, columns=nomes_colunas)
     
-    # Remover primeira linha (NaN devido ao shift)
-    df_retornos = df_retornos.dropna()
+    # Remover primeira linha (NaN devido à diferença)
+    df_retornos = df_retornos.iloc[1:]
+    df_retornos = df_retornos.dropna(subset=[f'Retorno_{universo.nome_mercado}'] + colunas_niveis)
     
     print(f"✅ Retornos calculados para {len(df_retornos)} observações")
     
     return df_retornos
 
 
-def coletar_market_cap():
+def _carregar_cache_acoes(diretorio=DIRETORIO_CACHE):
+    """Carrega a tabela longa (Data, Ticker, Acoes) de ações em circulação em cache"""
+    caminho = os.path.join(diretorio, ARQUIVO_CACHE_ACOES)
+    if not os.path.exists(caminho):
+        return pd.DataFrame(columns=['Data', 'Ticker', 'Acoes'])
+    return pd.read_parquet(caminho)
+
+
+def carregar_acoes_em_circulacao(tickers, data_inicio, data_fim, fonte, usar_cache=True,
+                                 diretorio_cache=DIRETORIO_CACHE, validade_dias=120):
+    """
+    Retorna as ações em circulação em formato largo (datas de alteração x tickers)
+    
+    A tabela é mantida em cache num único Parquet. Só são consultados na fonte
+    os tickers ausentes do cache e aqueles cuja última observação tem mais de
+    `validade_dias` em relação a `data_fim` (a partir dessa última observação).
+    """
+    df_cache = _carregar_cache_acoes(diretorio_cache) if usar_cache else pd.DataFrame(columns=['Data', 'Ticker', 'Acoes'])
+    ultimas = df_cache.groupby('Ticker')['Data'].max() if not df_cache.empty else pd.Series(dtype='datetime64[ns]')
+    limite = pd.Timestamp(data_fim) - pd.Timedelta(days=validade_dias)
+    
+    inicios = {}
+    for ticker in tickers:
+        if ticker not in ultimas.index:
+            inicios.setdefault(data_inicio, []).append(ticker)
+        elif ultimas[ticker] < limite:
+            inicios.setdefault(ultimas[ticker].strftime('%Y-%m-%d'), []).append(ticker)
+    
+    novos = []
+    for inicio, tickers_inicio in inicios.items():
+        for ticker, acoes in fonte.acoes_em_circulacao(tickers_inicio, inicio, data_fim).items():
+            novos.append(pd.DataFrame({'Data': acoes.index, 'Ticker': ticker, 'Acoes': acoes.to_numpy(dtype=float)}))
+    
+    if novos:
+        df_cache = pd.concat([df_cache] + novos, ignore_index=True)
+        df_cache = df_cache.drop_duplicates(subset=['Data', 'Ticker'], keep='last').sort_values(['Ticker', 'Data'])
+        if usar_cache:
+            os.makedirs(diretorio_cache, exist_ok=True)
+            df_cache.to_parquet(os.path.join(diretorio_cache, ARQUIVO_CACHE_ACOES), index=False)
+    
+    df_cache = df_cache[df_cache['Ticker'].isin(tickers)]
+    return df_cache.pivot_table(index='Data', columns='Ticker', values='Acoes', aggfunc='last')
+
+
+def coletar_market_cap(df_precos=None, fonte=None, universo=None, usar_cache=None,
+                       diretorio_cache=DIRETORIO_CACHE):
     """
-    Coleta dados de market cap das Magnificent Seven
+    Calcula a capitalização de mercado diária dos constituintes do universo
+    
+    Market Cap = Preço * Ações em circulação. Os preços são os de `df_precos`
+    (já coletados; se omitidos, vêm de coletar_dados com cache) e as ações em
+    circulação vêm de uma tabela em cache, estendida até cada pregão pela
+    última contagem conhecida (junção "as-of" sobre todas as colunas de uma vez).
     """
     print("\n💰 Coletando dados de capitalização de mercado...")
     
-    tickers_mag7 = ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'NVDA', 'TSLA', 'META']
-    nomes_mag7 = ['Apple', 'Microsoft', 'Alphabet', 'Amazon', 'Nvidia', 'Tesla', 'Meta']
+    if fonte is None:
+        fonte = FonteYFinance()
+    if universo is None:
+        universo = carregar_universo()
+    if usar_cache is None:
+        usar_cache = fonte.remota
+    if df_precos is None:
+        df_precos = coletar_dados(fonte, universo, usar_cache=usar_cache, diretorio_cache=diretorio_cache)
+    
+    empresas = [e for e in universo.colunas_constituintes if e in df_precos.columns]
+    tickers = [universo.constituintes[e] for e in empresas]
     
-    data_inicio = "2022-01-01"
-    data_fim = "2024-12-31"
+    df_acoes = carregar_acoes_em_circulacao(tickers, universo.data_inicio, universo.data_fim, fonte,
+                                            usar_cache, diretorio_cache)
+    df_acoes = df_acoes.rename(columns={t: e for e, t in zip(empresas, tickers)}).reindex(columns=empresas)
     
-    market_caps = {}
+    sem_dados = [e for e in empresas if df_acoes[e].isna().all()]
+    for empresa in sem_dados:
+        print(f"  • {empresa} ({universo.constituintes[empresa]})... ✗ Erro: ações em circulação não obtidas")
+    print(f"  ✓ {len(empresas) - len(sem_dados)} de {len(universo.constituintes)} constituintes")
     
-    for nome, ticker in zip(nomes_mag7, tickers_mag7):
-        print(f"  • {nome} ({ticker})...", end=" ")
-        try:
-            dados = yf.download(ticker, start=data_inicio, end=data_fim, progress=False)
-            # Market Cap = Preço * Shares Outstanding
-            # Vamos usar o preço de fechamento ajustado como proxy
-            market_caps[nome] = dados['Adj Close'] * dados['Volume']
-            print("✓")
-        except Exception as e:
-            print(f"✗ Erro: {e}")
+    if len(sem_dados) == len(empresas):
+        print("⚠️ Nenhuma série de ações em circulação disponível")
+        return None
     
-    df_market_cap = pd.DataFrame(market_caps)
-    df_market_cap = df_market_cap.dropna()
+    # Última contagem conhecida em cada pregão; antes da primeira, usa-se a primeira
+    datas = df_acoes.index.union(df_precos.index)
+    df_acoes = df_acoes.reindex(datas).ffill().bfill().reindex(df_precos.index)
     
-    print(f"✅ Market caps coletados para {len(df_market_cap)} dias")
+    df_market_cap = df_precos[empresas] * df_acoes
+    df_market_cap = df_market_cap.dropna(how='all')
+    
+    print(f"✅ Market caps calculados para {len(df_market_cap)} dias")
     
     return df_market_cap
 
 
-def construir_big_tech_index(df_precos, df_retornos):
+def _normalizar_linhas(matriz):
+    """Normaliza cada linha para soma 1, tratando NaN como peso zero"""
+    matriz = np.where(np.isfinite(matriz) & (matriz > 0), matriz, 0.0)
+    soma = matriz.sum(axis=1, keepdims=True)
+    return np.divide(matriz, soma, out=np.zeros_like(matriz), where=soma > 0)
+
+
+def _limitar_pesos(pesos, limite, max_iteracoes=100):
+    """
+    Aplica um teto a pesos já normalizados, redistribuindo o excedente
+    proporcionalmente entre os ativos abaixo do teto (todas as datas de uma vez).
+    
+    Quando o teto é inviável (limite * nº de ativos < 1), usa-se 1 / nº de ativos.
+    """
+    n_validos = (pesos > 0).sum(axis=1, keepdims=True)
+    teto = np.maximum(limite, np.divide(1.0, n_validos, out=np.ones_like(pesos[:, :1]), where=n_validos > 0))
+    
+    w = pesos.copy()
+    for _ in range(max_iteracoes):
+        excesso = np.clip(w - teto, 0, None).sum(axis=1, keepdims=True)
+        if not (excesso > 1e-12).any():
+            break
+        w = np.minimum(w, teto)
+        livres = np.where(w < teto - 1e-12, w, 0.0)
+        soma_livres = livres.sum(axis=1, keepdims=True)
+        w = w + np.divide(livres * excesso, soma_livres, out=np.zeros_like(w), where=soma_livres > 0)
+    return w
+
+
+# Esquemas de ponderação do Big Tech Index -> sufixo da coluna de retorno
+ESQUEMAS_PONDERACAO = {
+    'preco': 'Preco',
+    'igual': 'Igual',
+    'cap': 'Cap',
+    'cap_limitado': 'CapLimitado'
+}
+
+
+def calcular_pesos(df_precos, empresas, esquemas=tuple(ESQUEMAS_PONDERACAO), df_market_cap=None, limite=0.25):
+    """
+    Calcula as matrizes de pesos diários (datas x empresas) de cada esquema
+    
+    • preco: proporcional ao preço (proxy original do trabalho)
+    • igual: 1/N entre as empresas com cotação no dia
+    • cap: proporcional à capitalização de mercado (`df_market_cap`)
+    • cap_limitado: como `cap`, com teto de `limite` por empresa
+    Esquemas de capitalização são ignorados quando `df_market_cap` não é informado.
+    """
+    precos = df_precos[empresas].to_numpy(dtype=float)
+    
+    caps = None
+    if df_market_cap is not None:
+        caps = df_market_cap.reindex(index=df_precos.index, columns=empresas).to_numpy(dtype=float)
+    
+    pesos = {}
+    for esquema in esquemas:
+        if esquema == 'preco':
+            pesos[esquema] = _normalizar_linhas(precos)
+        elif esquema == 'igual':
+            pesos[esquema] = _normalizar_linhas(np.isfinite(precos).astype(float))
+        elif esquema in ('cap', 'cap_limitado'):
+            if caps is None:
+                print(f"  ℹ️ Esquema '{esquema}' ignorado: capitalização de mercado não informada")
+                continue
+            pesos_cap = pesos.get('cap')
+            if pesos_cap is None:
+                pesos_cap = _normalizar_linhas(caps)
+            pesos[esquema] = pesos_cap if esquema == 'cap' else _limitar_pesos(pesos_cap, limite)
+        else:
+            raise ValueError(f"Esquema de ponderação desconhecido: {esquema}")
+    
+    return pesos
+
+
+def calcular_pesos_indice(df_precos, df_market_cap=None, universo=None,
+                          esquemas=tuple(ESQUEMAS_PONDERACAO), limite=0.25):
+    """Pesos de todos os esquemas para os constituintes do universo presentes em df_precos"""
+    if universo is None:
+        universo = carregar_universo()
+    empresas = [e for e in universo.colunas_constituintes if e in df_precos.columns]
+    return calcular_pesos(df_precos, empresas, esquemas, df_market_cap, limite)
+
+
+def construir_big_tech_index(df_precos, df_retornos, universo=None, df_market_cap=None,
+                             esquemas=tuple(ESQUEMAS_PONDERACAO), esquema_principal=None, limite=0.25,
+                             pesos=None):
     """
     Constrói o Big Tech Index ponderado por capitalização de mercado
+    
+    Todos os esquemas de `esquemas` são calculados em uma única passada:
+    os pesos formam um tensor (esquemas x datas x empresas) e o retorno de cada
+    esquema é o produto escalar linha a linha com a matriz de retornos.
+    Cada esquema gera a coluna `Retorno_BigTech_<Esquema>`; o `esquema_principal`
+    também é gravado em `Retorno_BigTech_Index` e define os pesos retornados.
+    Por padrão, é 'cap' quando há capitalização de mercado e 'preco' caso contrário.
+    `pesos` aceita as matrizes já calculadas por `calcular_pesos_indice`.
     """
     print("\n🏗️ Construindo Big Tech Index...")
     
-    mag7_empresas = ['Apple', 'Microsoft', 'Alphabet', 'Amazon', 'Nvidia', 'Tesla', 'Meta']
-    
-    # Método simplificado: usar preços como proxy para market cap
-    # Em produção, seria necessário dados de shares outstanding
-    print("  ℹ️ Usando preços como proxy para capitalização de mercado")
+    if universo is None:
+        universo = carregar_universo()
     
-    # Calcular pesos diários baseados nos preços
-    df_pesos = pd.DataFrame(index=df_precos.index)
+    empresas = [e for e in universo.colunas_constituintes
+                if e in df_precos.columns and f'Retorno_{e}' in df_retornos.columns]
     
-    for empresa in mag7_empresas:
-        if empresa in df_precos.columns:
-            df_pesos[empresa] = df_precos[empresa]
+    if df_market_cap is None:
+        # Método simplificado: usar preços como proxy para market cap
+        print("  ℹ️ Usando preços como proxy para capitalização de mercado")
+    else:
+        print("  ℹ️ Ponderando por capitalização de mercado (preço x ações em circulação)")
     
-    # Normalizar pesos (soma = 1 para cada dia)
-    df_pesos = df_pesos.div(df_pesos.sum(axis=1), axis=0)
+    if esquema_principal is None:
+        esquema_principal = 'cap' if df_market_cap is not None else 'preco'
     
-    # Calcular retorno ponderado do Big Tech Index
-    retornos_mag7 = []
-    for empresa in mag7_empresas:
-        col_retorno = f'Retorno_{empresa}'
-        if col_retorno in df_retornos.columns:
-            retornos_mag7.append(col_retorno)
+    # Calcular pesos diários de todos os esquemas
+    if pesos is None:
+        pesos = calcular_pesos(df_precos, empresas, esquemas, df_market_cap, limite)
+    if esquema_principal not in pesos:
+        raise ValueError(f"Esquema principal '{esquema_principal}' não disponível")
+    nomes_esquemas = list(pesos)
     
     # Alinhar índices
-    df_pesos_alinhado = df_pesos.loc[df_retornos.index]
+    posicoes = df_precos.index.get_indexer(df_retornos.index)
+    if (posicoes < 0).any():
+        # -1 leria em silêncio a última linha da matriz de pesos
+        ausentes = df_retornos.index[posicoes < 0]
+        raise ValueError(f"{len(ausentes)} data(s) de retorno sem preço para os pesos do índice "
+                         f"(primeira: {ausentes[0].date()})")
+    tensor_pesos = np.stack([pesos[e] for e in nomes_esquemas])[:, posicoes]
     
-    # Calcular retorno ponderado
-    retorno_bigtech = pd.Series(0.0, index=df_retornos.index)
+    # Constituintes sem cotação no dia contribuem com zero
+    retornos = np.nan_to_num(df_retornos[[f'Retorno_{e}' for e in empresas]].to_numpy(dtype=float))
+    retornos_indice = np.einsum('sdn,dn->ds', tensor_pesos, retornos)
     
-    for i, empresa in enumerate(mag7_empresas):
-        col_retorno = f'Retorno_{empresa}'
-        if col_retorno in df_retornos.columns and empresa in df_pesos_alinhado.columns:
-            retorno_bigtech += df_pesos_alinhado[empresa] * df_retornos[col_retorno]
+    indice_principal = nomes_esquemas.index(esquema_principal)
+    retornos_indice = np.column_stack([retornos_indice[:, indice_principal], retornos_indice])
+    colunas_indice = ['Retorno_BigTech_Index'] + [f'Retorno_BigTech_{ESQUEMAS_PONDERACAO[e]}' for e in nomes_esquemas]
+    df_indices = pd.DataFrame(retornos_indice, index=df_retornos.index, columns=colunas_indice)
     
-    df_retornos['Retorno_BigTech_Index'] = retorno_bigtech
+    df_retornos = pd.concat([df_retornos.drop(columns=colunas_indice, errors='ignore'), df_indices], axis=1)
     
-    print(f"✅ Big Tech Index construído com sucesso")
+    df_pesos = pd.DataFrame(pesos[esquema_principal], index=df_precos.index, columns=empresas)
+    
+    retorno_bigtech = df_retornos['Retorno_BigTech_Index']
+    print(f"✅ Big Tech Index construído com sucesso ({len(nomes_esquemas)} esquema(s): {', '.join(nomes_esquemas)})")
     print(f"  📊 Retorno médio diário: {retorno_bigtech.mean():.6f}")
     print(f"  📊 Volatilidade: {retorno_bigtech.std():.6f}")
     
     return df_retornos, df_pesos
 
 
-def preparar_dataframe_final(df_retornos):
+def preparar_dataframe_final(df_retornos, universo=None):
     """
     Prepara DataFrame final com nomenclatura padronizada
     """
     print("\n📋 Preparando DataFrame Final...")
     
+    if universo is None:
+        universo = carregar_universo()
+    
     df_final = pd.DataFrame({
         'data': df_retornos.index,
-        'retorno_sp500': df_retornos['Retorno_SP500'],
+        'retorno_sp500': df_retornos[f'Retorno_{universo.nome_mercado}'],
         'retorno_bigtech': df_retornos['Retorno_BigTech_Index'],
-        'vix': df_retornos['VIX'],
-        'taxa_juros_10y': df_retornos['Taxa_Juros_10Y']
+        **{nome.lower(): df_retornos[nome] for nome in universo.niveis}
     })
     
     df_final.set_index('data', inplace=True)
@@ -204,16 +518,27 @@ def preparar_dataframe_final(df_retornos):
     return df_final
 
 
-def gerar_estatisticas_descritivas(df_retornos):
+def _colunas_principais(universo):
+    return [f'Retorno_{universo.nome_mercado}', 'Retorno_BigTech_Index'] + list(universo.niveis)
+
+
+def gerar_estatisticas_descritivas(df_retornos, universo=None, caminho_estado=CAMINHO_ESTADO_PADRAO):
     """
     Gera estatísticas descritivas dos dados
+    
+    O resumo sai do acumulador de momentos e quantis, gravado em `caminho_estado`
+    para o modo de atualização incremental (`--update`).
     """
     print("\n📈 Estatísticas Descritivas:")
     print("="*80)
     
-    colunas_principais = ['Retorno_SP500', 'Retorno_BigTech_Index', 'VIX', 'Taxa_Juros_10Y']
+    if universo is None:
+        universo = carregar_universo()
     
-    stats = df_retornos[colunas_principais].describe()
+    colunas_principais = _colunas_principais(universo)
+    
+    acumulador = AcumuladorMomentos(colunas_principais).atualizar(df_retornos)
+    stats = acumulador.resumo()
     print(stats)
     
     print("\n📊 Correlações:")
@@ -221,62 +546,515 @@ def gerar_estatisticas_descritivas(df_retornos):
     corr = df_retornos[colunas_principais].corr()
     print(corr)
     
+    if caminho_estado:
+        acumulador.salvar(caminho_estado)
+    
     return stats, corr
 
 
-def salvar_dados(df_precos, df_retornos, df_pesos, df_final):
+def atualizar_estatisticas_descritivas(df_retornos_novos, universo=None, caminho_estado=CAMINHO_ESTADO_PADRAO,
+                                       ultima_data_gravada=None):
     """
-    Salva os dados processados em arquivos CSV
+    Atualiza as estatísticas descritivas apenas com as linhas novas
+    
+    O estado salvo (contagem, momentos, co-momentos, extremos e sketch de quantis)
+    é combinado com o das novas linhas, sem reler o histórico. Se o estado ainda não
+    existir, ele é construído uma única vez a partir da tabela de retornos gravada.
+    Linhas até a última data já absorvida pelo estado são ignoradas; se o estado
+    estiver atrás de `ultima_data_gravada` (última data das tabelas), as linhas que
+    faltam são lidas das tabelas antes das novas.
+    
+    O estado não é gravado aqui: retorna (stats, corr, acumulador) e quem chama salva
+    o acumulador depois de anexar as linhas às tabelas.
     """
-    print("\n💾 Salvando dados processados...")
+    print("\n📈 Estatísticas Descritivas (atualização incremental):")
+    print("="*80)
+    
+    if universo is None:
+        universo = carregar_universo()
+    
+    colunas_principais = _colunas_principais(universo)
     
-    df_precos.to_csv('dados_precos.csv')
-    print("  ✓ dados_precos.csv")
+    acumulador = AcumuladorMomentos.carregar(caminho_estado)
+    if acumulador is None or acumulador.colunas != colunas_principais:
+        print("  ℹ️ Estado das estatísticas não encontrado, reconstruindo a partir do histórico...")
+        df_historico = carregar_dados('retornos', colunas=colunas_principais)
+        acumulador = AcumuladorMomentos(colunas_principais).atualizar(df_historico)
+    elif (ultima_data_gravada is not None and acumulador.ultima_data is not None
+          and acumulador.ultima_data < ultima_data_gravada):
+        print(f"  ℹ️ Estado das estatísticas em {acumulador.ultima_data.date()}, "
+              f"incorporando as linhas gravadas até {ultima_data_gravada.date()}...")
+        df_pendente = carregar_dados('retornos', colunas=colunas_principais,
+                                     inicio=acumulador.ultima_data + pd.Timedelta(days=1),
+                                     fim=ultima_data_gravada)
+        acumulador.atualizar(df_pendente)
     
-    df_retornos.to_csv('dados_retornos.csv')
-    print("  ✓ dados_retornos.csv")
+    if acumulador.ultima_data is not None:
+        df_retornos_novos = df_retornos_novos[df_retornos_novos.index > acumulador.ultima_data]
+    acumulador.atualizar(df_retornos_novos)
     
-    df_pesos.to_csv('dados_pesos_bigtech.csv')
-    print("  ✓ dados_pesos_bigtech.csv")
+    stats = acumulador.resumo()
+    print(stats)
     
-    df_final.to_csv('dados_final.csv')
-    print("  ✓ dados_final.csv")
+    print("\n📊 Correlações:")
+    print("="*80)
+    corr = acumulador.correlacao()
+    print(corr)
+    
+    return stats, corr, acumulador
+
+
+def _colunas_correlacao_movel(df_retornos, universo):
+    colunas = [f'Retorno_{nome}' for nome in universo.acoes] + ['Retorno_BigTech_Index']
+    return [c for c in colunas if c in df_retornos.columns]
+
+
+def gerar_correlacao_movel(df_retornos, universo=None, janela=60, span=60, caminho=CAMINHO_CORRELACAO_MOVEL):
+    """
+    Gera as matrizes de correlação móveis (janela e EWMA) dos retornos diários
+    
+    Mercado, constituintes e Big Tech Index; as pilhas (datas x ativos x ativos)
+    são gravadas no diretório `caminho` para o dashboard fatiar por data. Retorna o
+    caminho: as pilhas não passam pelo cache de etapas.
+    """
+    print("\n🔗 Calculando correlações móveis...")
+    
+    if universo is None:
+        universo = carregar_universo()
+    
+    colunas = _colunas_correlacao_movel(df_retornos, universo)
+    resultados = {
+        'janela': matrizes_moveis(df_retornos, janela, colunas=colunas),
+        'ewma': matrizes_ewma(df_retornos, span=span, colunas=colunas)
+    }
+    salvar_matrizes_moveis(resultados, caminho)
+    
+    print(f"  ✓ Janela de {janela} dias e EWMA (span {span}): {len(df_retornos)} datas x {len(colunas)} ativos")
+    print(f"✅ Correlações móveis salvas em: {caminho}/")
+    return caminho
+
+
+def atualizar_correlacao_movel(df_retornos_novos, universo=None, caminho=CAMINHO_CORRELACAO_MOVEL):
+    """
+    Estende as matrizes móveis gravadas apenas com as datas novas
+    
+    A janela continua a partir das últimas linhas guardadas no estado e o EWMA a
+    partir das somas ponderadas; as correlações novas são anexadas ao final das
+    pilhas gravadas. Sem arquivos compatíveis, tudo é recalculado do histórico.
+    """
+    if universo is None:
+        universo = carregar_universo()
+    
+    resultados = carregar_matrizes_moveis(caminho)
+    colunas = _colunas_correlacao_movel(df_retornos_novos, universo)
+    if not resultados or any(r['colunas'] != colunas for r in resultados.values()):
+        print("  ℹ️ Correlações móveis não encontradas, recalculando a partir do histórico...")
+        return gerar_correlacao_movel(carregar_dados('retornos'), universo, caminho=caminho)
+    
+    extensoes = {nome: matrizes_novas(r, df_retornos_novos) for nome, r in resultados.items()}
+    anexar_matrizes_moveis(resultados, extensoes, caminho)
+    print(f"✅ Correlações móveis estendidas até {df_retornos_novos.index.max().date()}: {caminho}/")
+    return caminho
+
+
+def gerar_betas_constituintes(df_retornos, universo=None, caminho='betas_constituintes.csv'):
+    """
+    Beta de cada constituinte em relação ao mercado e ao Big Tech Index
+    
+    Para cada fator, todos os constituintes são resolvidos de uma vez contra a
+    mesma matriz de planejamento (motor_regressao.betas_transversais).
+    """
+    print("\n📐 Calculando betas dos constituintes...")
+    
+    if universo is None:
+        universo = carregar_universo()
+    
+    ativos = [c for c in universo.colunas_retorno_constituintes if c in df_retornos.columns]
+    fatores = {universo.nome_mercado: f'Retorno_{universo.nome_mercado}', 'BigTech': 'Retorno_BigTech_Index'}
+    
+    partes = {}
+    for rotulo, fator in fatores.items():
+        if fator not in df_retornos.columns:
+            continue
+        resultado = betas_transversais(df_retornos, ativos, fator)
+        partes[f'Alfa ({rotulo})'] = resultado['coeficientes'][INTERCEPTO]
+        partes[f'Beta ({rotulo})'] = resultado['coeficientes'][fator]
+        partes[f'Erro Padrão ({rotulo})'] = resultado['erro_padrao'][fator]
+        partes[f'Estatística t ({rotulo})'] = resultado['estatistica_t'][fator]
+        partes[f'Valor-p ({rotulo})'] = resultado['pvalores'][fator]
+        partes[f'R² ({rotulo})'] = resultado['r2']
+    
+    df_betas = pd.DataFrame(partes)
+    df_betas.index = [c.replace('Retorno_', '', 1) for c in ativos]
+    df_betas.index.name = 'Ativo'
+    print(df_betas[[c for c in df_betas.columns if c.startswith(('Beta', 'R²'))]].round(4))
+    
+    if caminho:
+        df_betas.to_csv(caminho)
+        print(f"✅ Betas salvos em: {caminho}")
+    return df_betas
+
+
+def gerar_volatilidade_garch(df_retornos, universo=None, horizonte=22, processos=None,
+                             caminho=CAMINHO_VOLATILIDADE, caminho_tabela='parametros_garch.csv'):
+    """
+    Volatilidade condicional GARCH(1,1), GJR-GARCH e EGARCH do mercado, do Big Tech Index e de cada constituinte
+    
+    As séries são ajustadas em paralelo (motor_volatilidade.ajustar_volatilidades);
+    trajetórias e previsões de `horizonte` dias são gravadas em `caminho` para o
+    dashboard e os parâmetros em `caminho_tabela`.
+    """
+    print("\n🌪️ Ajustando modelos de volatilidade (GARCH, GJR, EGARCH)...")
+    
+    if universo is None:
+        universo = carregar_universo()
+    
+    colunas = [f'Retorno_{universo.nome_mercado}', 'Retorno_BigTech_Index']
+    colunas += list(universo.colunas_retorno_constituintes)
+    colunas = [c for c in colunas if c in df_retornos.columns]
+    resultado = ajustar_volatilidades(df_retornos, colunas, horizonte=horizonte, processos=processos)
+    
+    tabela = resultado['tabela']
+    print(tabela.pivot(index='Série', columns='Modelo', values='Volatilidade Atual (% a.a.)')
+          .reindex(colunas).round(2))
+    if not tabela['Convergiu'].all():
+        falhas = tabela.loc[~tabela['Convergiu'], ['Série', 'Modelo']].itertuples(index=False)
+        print(f"  ⚠️ Otimização sem convergência: {', '.join(f'{s} ({m})' for s, m in falhas)}")
+    
+    salvar_volatilidades(resultado, caminho)
+    if caminho_tabela:
+        tabela.to_csv(caminho_tabela, index=False)
+    print(f"✅ Volatilidade condicional salva em: {caminho} e {caminho_tabela}")
+    return resultado
+
+
+def atualizar_volatilidade_garch(df_retornos_novos, universo=None, caminho=CAMINHO_VOLATILIDADE,
+                                 caminho_tabela='parametros_garch.csv'):
+    """
+    Estende a volatilidade condicional gravada apenas com as datas novas
+    
+    Os parâmetros do último ajuste completo são mantidos e a recursão de cada modelo
+    continua a partir do estado salvo (motor_volatilidade.estender_volatilidades);
+    a reestimação fica para o pipeline completo. Sem arquivo compatível, os modelos
+    são ajustados sobre o histórico.
+    """
+    if universo is None:
+        universo = carregar_universo()
+    
+    resultado = carregar_volatilidades(caminho)
+    if resultado is None or resultado['estado'] is None:
+        print("  ℹ️ Volatilidade condicional não encontrada, ajustando a partir do histórico...")
+        return gerar_volatilidade_garch(carregar_dados('retornos'), universo, caminho=caminho,
+                                        caminho_tabela=caminho_tabela)
+    
+    resultado = estender_volatilidades(resultado, df_retornos_novos)
+    salvar_volatilidades(resultado, caminho)
+    if caminho_tabela:
+        resultado['tabela'].to_csv(caminho_tabela, index=False)
+    print(f"✅ Volatilidade condicional estendida até {resultado['datas'][-1].date()} "
+          f"(parâmetros do último ajuste completo): {caminho}")
+    return resultado
+
+
+def salvar_dados(df_precos, df_retornos, df_pesos, df_final, compressao='zstd', exportar_csv=False):
+    """
+    Salva os dados processados como tabelas Parquet particionadas por ano (diretório dados/)
+    
+    Com `exportar_csv=True`, também grava os CSV no formato anterior.
+    """
+    print("\n💾 Salvando dados processados...")
+    
+    for df, nome in [(df_precos, 'precos'), (df_retornos, 'retornos'),
+                     (df_pesos, 'pesos_bigtech'), (df_final, 'final')]:
+        caminho = salvar_tabela(df, nome, compressao=compressao)
+        print(f"  ✓ {caminho}/")
+        if exportar_csv:
+            df.to_csv(TABELAS_CSV[nome])
+            print(f"  ✓ {TABELAS_CSV[nome]}")
     
     print("\n✅ Todos os dados foram salvos com sucesso!")
 
 
-def main():
+def _ler_cauda_csv(caminho, n_linhas):
     """
-    Função principal para executar todo o pipeline de coleta e processamento
+    Lê o cabeçalho e apenas as últimas `n_linhas` de um CSV, sem percorrer o arquivo inteiro
+    """
+    with open(caminho, 'rb') as f:
+        cabecalho = f.readline()
+        f.seek(0, os.SEEK_END)
+        tamanho = f.tell()
+        bloco = 1 << 16
+        posicao = tamanho
+        dados = b''
+        while posicao > len(cabecalho) and dados.count(b'\n') <= n_linhas:
+            leitura = min(bloco, posicao - len(cabecalho))
+            posicao -= leitura
+            f.seek(posicao)
+            dados = f.read(leitura) + dados
+    
+    linhas = dados.splitlines()[-n_linhas:]
+    conteudo = b'\n'.join([cabecalho.rstrip(b'\r\n')] + [l for l in linhas if l.strip()])
+    return pd.read_csv(io.BytesIO(conteudo), index_col=0, parse_dates=True)
+
+
+def _anexar_csv(df, caminho):
+    """Anexa linhas ao final de um CSV existente, na ordem de colunas do cabeçalho gravado"""
+    colunas = pd.read_csv(caminho, index_col=0, nrows=0).columns
+    df.reindex(columns=colunas).to_csv(caminho, mode='a', header=False)
+
+
+def _ler_cauda_precos(n_linhas):
+    """Últimas linhas de preços gravadas (Parquet, ou o CSV do formato anterior)"""
+    if existe_tabela('precos'):
+        return ler_cauda('precos', n_linhas)
+    if os.path.exists(TABELAS_CSV['precos']):
+        return _ler_cauda_csv(TABELAS_CSV['precos'], n_linhas)
+    return None
+
+
+def anexar_dados(df_precos, df_retornos, df_pesos, df_final, exportar_csv=False):
+    """
+    Anexa apenas as linhas novas às tabelas já existentes
+    
+    Cada tabela Parquet recebe um novo arquivo na partição do ano; com
+    `exportar_csv=True` (ou se ainda não houver tabela Parquet), os CSV também são estendidos.
+    """
+    print("\n💾 Anexando novos dados...")
+    
+    for df, nome in [(df_precos, 'precos'), (df_retornos, 'retornos'),
+                     (df_pesos, 'pesos_bigtech'), (df_final, 'final')]:
+        if existe_tabela(nome):
+            anexar_tabela(df, nome)
+            print(f"  ✓ {DIRETORIO_DADOS}/{nome}/ (+{len(df)} linhas)")
+        if (exportar_csv or not existe_tabela(nome)) and os.path.exists(TABELAS_CSV[nome]):
+            _anexar_csv(df, TABELAS_CSV[nome])
+            print(f"  ✓ {TABELAS_CSV[nome]} (+{len(df)} linhas)")
+    
+    print("\n✅ Dados atualizados com sucesso!")
+
+
+def atualizar_pipeline(fonte=None, universo=None, horizontes=(1,), data_fim=None, exportar_csv=False):
+    """
+    Modo incremental: processa apenas os pregões posteriores ao último já gravado
+    
+    Lê só a cauda da tabela de preços (o necessário para os retornos de todos os
+    horizontes), coleta os dias novos, calcula retornos, pesos e índice para essas
+    linhas, atualiza as estatísticas pelo acumulador de momentos e anexa o resultado
+    aos arquivos existentes. `data_fim` (exclusiva) padrão: amanhã.
     """
     print("="*80)
-    print("  COLETA E PROCESSAMENTO DE DADOS - MAGNIFICENT SEVEN")
+    print("  ATUALIZAÇÃO INCREMENTAL - MAGNIFICENT SEVEN")
+    print("="*80)
+    
+    if universo is None:
+        universo = carregar_universo()
+    if data_fim is None:
+        data_fim = (pd.Timestamp.today().normalize() + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+    
+    # Contexto mínimo do histórico: o último dia gravado e os anteriores exigidos pelo maior horizonte
+    cauda_precos = _ler_cauda_precos(max(horizontes) + 1)
+    if cauda_precos is None:
+        print("ℹ️ Nenhum dado gravado ainda; executando o pipeline completo.")
+        return main(fonte, universo, horizontes, exportar_csv)
+    ultima_data = cauda_precos.index.max()
+    print(f"\n📅 Último pregão gravado: {ultima_data.date()}")
+    
+    if ultima_data + pd.Timedelta(days=1) >= pd.Timestamp(data_fim):
+        print("✅ Nada a atualizar.")
+        return None
+    
+    # Passo 1: Coletar somente a partir do último dia gravado
+    universo_novo = universo.com_periodo(ultima_data.strftime('%Y-%m-%d'), data_fim)
+    df_precos_coletados = coletar_dados(fonte, universo_novo)
+    df_precos_novos = df_precos_coletados[df_precos_coletados.index > ultima_data]
+    df_precos_novos = df_precos_novos.reindex(columns=cauda_precos.columns)
+    
+    if df_precos_novos.empty:
+        print("✅ Nenhum pregão novo disponível.")
+        return None
+    
+    df_precos_contexto = pd.concat([cauda_precos, df_precos_novos])
+    
+    # Passos 2 a 5 apenas sobre as linhas novas (com o contexto necessário)
+    df_retornos = calcular_retornos_logaritmicos(df_precos_contexto, universo, horizontes)
+    df_market_cap = coletar_market_cap(df_precos_contexto, fonte, universo)
+    df_retornos, df_pesos = construir_big_tech_index(df_precos_contexto, df_retornos, universo, df_market_cap)
+    
+    novas_datas = df_precos_novos.index
+    df_retornos = df_retornos.loc[df_retornos.index.isin(novas_datas)]
+    df_pesos = df_pesos.loc[df_pesos.index.isin(novas_datas)]
+    df_final = preparar_dataframe_final(df_retornos, universo)
+    
+    # Passo 6: Estatísticas pelo acumulador incremental
+    stats, corr, acumulador = atualizar_estatisticas_descritivas(df_retornos, universo,
+                                                                 ultima_data_gravada=ultima_data)
+    
+    # Passo 7: Anexar aos arquivos; o estado só é gravado depois, para que uma falha
+    # entre as duas gravações não conte as mesmas linhas duas vezes na próxima execução
+    anexar_dados(df_precos_novos, df_retornos, df_pesos, df_final, exportar_csv)
+    acumulador.salvar(CAMINHO_ESTADO_PADRAO)
+    
+    # Passo 8: Estender as correlações móveis com as novas datas
+    atualizar_correlacao_movel(df_retornos, universo)
+    
+    # Passo 9: Volatilidade condicional filtrada nas novas datas com os parâmetros já estimados
+    atualizar_volatilidade_garch(df_retornos, universo)
+    
+    # Os betas dos constituintes usam a amostra inteira: são reestimados só no pipeline completo
+    print("\nℹ️ Betas dos constituintes (betas_constituintes.csv) não são refeitos na atualização; "
+          "execute o pipeline completo para reestimá-los.")
+    
+    print("\n" + "="*80)
+    print(f"  ✅ ATUALIZAÇÃO CONCLUÍDA: {len(df_precos_novos)} pregão(ões) novo(s)")
     print("="*80)
     
-    # Passo 1: Coletar dados
-    df_precos = coletar_dados()
+    return df_precos_novos, df_retornos, df_pesos, df_final, stats, corr
+
+
+def criar_fonte(nome='yfinance', arquivo=None, semente=42, universo=None):
+    """
+    Cria a fonte de preços a partir do nome usado na linha de comando
     
-    # Passo 2: Calcular retornos logarítmicos
-    df_retornos = calcular_retornos_logaritmicos(df_precos)
+    • yfinance: Yahoo Finance (online)
+    • replay: preços gravados em `arquivo` (padrão: dados_precos.csv) ou num diretório de cache
+    • sintetica: gerador determinístico, sem acesso à rede
+    """
+    if nome == 'yfinance':
+        return FonteYFinance()
+    if nome == 'replay':
+        universo = universo or carregar_universo()
+        return FonteReplay(arquivo or 'dados_precos.csv', mapa_colunas=universo.mapa_colunas())
+    if nome == 'sintetica':
+        return FonteSintetica(semente=semente)
+    raise ValueError(f"Fonte desconhecida: {nome}")
+
+
+def _periodo_com_dados_gravados(universo):
+    """
+    Estende o fim (exclusivo) do período até o último pregão já gravado
+
+    Depois de um --update os dados vão além de `universo.data_fim`; sem isso o
+    pipeline completo regravaria as tabelas e as estatísticas no período mais curto.
+    """
+    cauda_precos = _ler_cauda_precos(1)
+    if cauda_precos is None or cauda_precos.empty:
+        return universo
+    fim_gravado = cauda_precos.index.max() + pd.Timedelta(days=1)
+    if fim_gravado <= pd.Timestamp(universo.data_fim):
+        return universo
+    print(f"ℹ️ Dados gravados até {cauda_precos.index.max().date()}: período estendido além de {universo.data_fim}")
+    return universo.com_periodo(universo.data_inicio, fim_gravado.strftime('%Y-%m-%d'))
+
+
+def montar_grafo_coleta(fonte=None, universo=None, horizontes=(1,), exportar_csv=False,
+                        usar_cache=True, refazer=(), diretorio_cache=DIRETORIO_CACHE_ETAPAS):
+    """
+    Declara o pipeline de coleta como grafo de etapas com cache por conteúdo
+
+    coleta → retornos, market_cap → pesos → indice → final, estatisticas, correlacao_movel, betas,
+    volatilidade → salvar
+
+    O período vai até o último pregão gravado se este for posterior a `universo.data_fim`
+    (dados estendidos por --update).
+    """
+    if universo is None:
+        universo = carregar_universo()
+    universo = _periodo_com_dados_gravados(universo)
+    if fonte is None:
+        fonte = FonteYFinance()
+    
+    grafo = GrafoEtapas(diretorio_cache, usar_cache=usar_cache, refazer=refazer)
+    # As fontes não são determinísticas (novos pregões, CSV de replay reescrito): as etapas
+    # de coleta sempre executam, e o hash do conteúdo coletado invalida as dependentes
+    grafo.adicionar('coleta', coletar_dados, parametros={'fonte': fonte, 'universo': universo}, cache=False)
+    grafo.adicionar('retornos', calcular_retornos_logaritmicos, ['coleta'],
+                    {'universo': universo, 'horizontes': tuple(horizontes)})
+    grafo.adicionar('market_cap', coletar_market_cap, ['coleta'], {'fonte': fonte, 'universo': universo},
+                    cache=False)
+    grafo.adicionar('pesos', calcular_pesos_indice, ['coleta', 'market_cap'], {'universo': universo})
+    grafo.adicionar('indice', construir_big_tech_index,
+                    {'df_precos': 'coleta', 'df_retornos': 'retornos',
+                     'df_market_cap': 'market_cap', 'pesos': 'pesos'},
+                    {'universo': universo})
+    grafo.adicionar('final', preparar_dataframe_final, [('indice', 0)], {'universo': universo})
+    grafo.adicionar('estatisticas', gerar_estatisticas_descritivas, [('indice', 0)], {'universo': universo},
+                    arquivos=[CAMINHO_ESTADO_PADRAO])
+    grafo.adicionar('correlacao_movel', gerar_correlacao_movel, [('indice', 0)], {'universo': universo},
+                    arquivos=[CAMINHO_CORRELACAO_MOVEL])
+    grafo.adicionar('betas', gerar_betas_constituintes, [('indice', 0)], {'universo': universo},
+                    arquivos=['betas_constituintes.csv'])
+    grafo.adicionar('volatilidade', gerar_volatilidade_garch, [('indice', 0)], {'universo': universo},
+                    arquivos=[CAMINHO_VOLATILIDADE, 'parametros_garch.csv'])
     
-    # Passo 3: Construir Big Tech Index
-    df_retornos, df_pesos = construir_big_tech_index(df_precos, df_retornos)
+    artefatos = [os.path.join(DIRETORIO_DADOS, nome) for nome in TABELAS_CSV]
+    if exportar_csv:
+        artefatos += list(TABELAS_CSV.values())
+    grafo.adicionar('salvar', salvar_dados,
+                    {'df_precos': 'coleta', 'df_retornos': ('indice', 0),
+                     'df_pesos': ('indice', 1), 'df_final': 'final'},
+                    {'exportar_csv': exportar_csv}, arquivos=artefatos)
+    return grafo
+
+
+def main(fonte=None, universo=None, horizontes=(1,), exportar_csv=False, usar_cache=True, refazer=()):
+    """
+    Função principal para executar todo o pipeline de coleta e processamento
     
-    # Passo 4: Preparar DataFrame final
-    df_final = preparar_dataframe_final(df_retornos)
+    As etapas ficam em cache (diretório cache_etapas/): uma nova execução só refaz
+    as etapas cujas entradas ou parâmetros mudaram. `refazer` força etapas
+    específicas (ou 'todas'); `usar_cache=False` ignora o cache.
+    """
+    print("="*80)
+    print("  COLETA E PROCESSAMENTO DE DADOS - MAGNIFICENT SEVEN")
+    print("="*80)
     
-    # Passo 5: Gerar estatísticas descritivas
-    stats, corr = gerar_estatisticas_descritivas(df_retornos)
+    grafo = montar_grafo_coleta(fonte, universo, horizontes, exportar_csv, usar_cache, refazer)
+    saidas = grafo.executar()
     
-    # Passo 6: Salvar dados
-    salvar_dados(df_precos, df_retornos, df_pesos, df_final)
+    df_precos = saidas['coleta']
+    df_retornos, df_pesos = saidas['indice']
+    df_final = saidas['final']
+    stats, corr = saidas['estatisticas']
     
     print("\n" + "="*80)
     print("  ✅ PROCESSAMENTO CONCLUÍDO COM SUCESSO!")
+    print(f"  {grafo.resumo()}")
     print("="*80)
     
     return df_precos, df_retornos, df_pesos, df_final, stats, corr
 
 
 if __name__ == "__main__":
-    df_precos, df_retornos, df_pesos, df_final, stats, corr = main()
+    parser = argparse.ArgumentParser(description="Coleta e processamento de dados - Magnificent Seven")
+    parser.add_argument('--fonte', choices=['yfinance', 'replay', 'sintetica'], default='yfinance',
+                        help="Fonte dos preços (replay e sintetica funcionam sem rede)")
+    parser.add_argument('--arquivo', default=None,
+                        help="Arquivo CSV/Parquet ou diretório de cache usado pela fonte replay")
+    parser.add_argument('--semente', type=int, default=42, help="Semente da fonte sintetica")
+    parser.add_argument('--universo', default=None,
+                        help="Arquivo JSON do universo de ativos (padrão: universo.json)")
+    parser.add_argument('--tickers', default=None,
+                        help="Lista de constituintes separados por vírgula, substituindo os do universo")
+    parser.add_argument('--horizontes', default='1',
+                        help="Horizontes dos retornos em dias, separados por vírgula (ex.: 1,5,21)")
+    parser.add_argument('--update', '--atualizar', dest='atualizar', action='store_true',
+                        help="Processa apenas os pregões novos e anexa aos arquivos existentes")
+    parser.add_argument('--ate', default=None,
+                        help="Data final (exclusiva) do modo --update; padrão: amanhã")
+    parser.add_argument('--csv', dest='exportar_csv', action='store_true',
+                        help="Também grava/estende os arquivos CSV além das tabelas Parquet")
+    parser.add_argument('--refazer', default='',
+                        help="Etapas a refazer ignorando o cache, separadas por vírgula (ou 'todas')")
+    parser.add_argument('--sem-cache-etapas', dest='usar_cache', action='store_false',
+                        help="Executa todas as etapas sem ler nem gravar o cache de etapas")
+    args = parser.parse_args()
+    
+    horizontes = tuple(int(h) for h in args.horizontes.split(','))
+    refazer = [e.strip() for e in args.refazer.split(',') if e.strip()]
+    universo = carregar_universo(args.universo, args.tickers)
+    fonte = criar_fonte(args.fonte, args.arquivo, args.semente, universo)
+    if args.atualizar:
+        resultado = atualizar_pipeline(fonte, universo, horizontes, args.ate, args.exportar_csv)
+    else:
+        df_precos, df_retornos, df_pesos, df_final, stats, corr = main(
+            fonte, universo, horizontes, args.exportar_csv, args.usar_cache, refazer)
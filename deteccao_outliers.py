@@ -0,0 +1,209 @@
+"""
+Detecção de Outliers
+Métodos IQR, MAD (z-score robusto) e filtro de Hampel avaliados sobre todas as colunas de uma vez
+"""
+
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from motor_estatisticas import calcular_quantis
+
+METODOS_OUTLIERS = {
+    'iqr': 'IQR',
+    'mad': 'MAD',
+    'hampel': 'Hampel'
+}
+
+# Converte o MAD em estimativa do desvio padrão sob normalidade
+FATOR_MAD = 1.4826
+
+CAMINHO_MASCARA_OUTLIERS = 'mascara_outliers.npz'
+
+
+def limites_iqr(valores, limite=1.5):
+    """Limites Q1 − limite·IQR e Q3 + limite·IQR de cada coluna; retorna (inferior, superior, q1, q3)"""
+    q1, q3 = calcular_quantis(valores, (0.25, 0.75))
+    iqr = q3 - q1
+    return q1 - limite * iqr, q3 + limite * iqr, q1, q3
+
+
+def limites_mad(valores, limite=3.5):
+    """Limites mediana ± limite·1,4826·MAD de cada coluna (|z robusto| > limite)"""
+    mediana = calcular_quantis(valores, (0.5,))[0]
+    mad = calcular_quantis(np.abs(valores - mediana), (0.5,))[0]
+    escala = limite * FATOR_MAD * mad
+    return mediana - escala, mediana + escala
+
+
+def limites_hampel(valores, janela=21, limite=3.0, max_elementos=2 ** 22):
+    """
+    Limites do filtro de Hampel: mediana móvel centrada ± limite·1,4826·MAD móvel
+
+    A janela é centrada (janela//2 observações de cada lado). Retorna matrizes
+    (linhas x colunas); as primeiras e últimas janela//2 linhas, sem janela
+    completa, ficam com limites NaN e nunca são marcadas.
+    """
+    n, k = valores.shape
+    meia = janela // 2
+    janela = 2 * meia + 1
+    inferior = np.full((n, k), np.nan)
+    superior = np.full((n, k), np.nan)
+    if n < janela:
+        return inferior, superior
+
+    # Colunas contíguas em memória: cada janela é um trecho contínuo que a
+    # ordenação vetorizada processa de uma vez (bem mais rápido que np.median por janela)
+    janelas = sliding_window_view(np.ascontiguousarray(valores.T), janela, axis=1)
+    linhas_por_bloco = max(1, max_elementos // (k * janela))
+    for inicio in range(0, janelas.shape[1], linhas_por_bloco):
+        bloco = np.sort(janelas[:, inicio:inicio + linhas_por_bloco], axis=-1)
+        mediana = bloco[..., meia]
+        desvios = np.abs(bloco - mediana[..., None])
+        desvios.sort(axis=-1)
+        escala = limite * FATOR_MAD * desvios[..., meia]
+        # Ordenados, os NaN ficam no fim: janelas com valor ausente não geram limite
+        escala[np.isnan(bloco[..., -1])] = np.nan
+
+        linhas = slice(inicio + meia, inicio + meia + bloco.shape[1])
+        inferior[linhas] = (mediana - escala).T
+        superior[linhas] = (mediana + escala).T
+    return inferior, superior
+
+
+def detectar_outliers(df, metodos=('iqr',), limite_iqr=1.5, limite_z=3.5, janela_hampel=21, limite_hampel=3.0):
+    """
+    Marca outliers em todas as colunas de `df` pelos métodos escolhidos
+
+    • iqr: fora de [Q1 − 1,5·IQR, Q3 + 1,5·IQR]
+    • mad: z-score robusto |x − mediana| / (1,4826·MAD) acima de `limite_z`
+    • hampel: desvio da mediana móvel centrada acima de `limite_hampel` MADs móveis
+
+    Retorna um dicionário com:
+      • mascara: DataFrame booleano (True = outlier por algum método)
+      • mascaras: {metodo: DataFrame booleano}
+      • inferior / superior: limites combinados (o mais restritivo de cada célula),
+        usados para winsorizar
+      • resumo: contagem de outliers por coluna e método, total e porcentagem
+      • iqr: quartis e limites do método IQR, quando calculado
+    """
+    desconhecidos = [m for m in metodos if m not in METODOS_OUTLIERS]
+    if desconhecidos:
+        raise ValueError(f"Método(s) de outlier desconhecido(s): {desconhecidos}")
+
+    valores = df.to_numpy(dtype=float)
+    inferior = np.full(valores.shape, -np.inf)
+    superior = np.full(valores.shape, np.inf)
+    mascaras = {}
+    resultado = {}
+
+    for metodo in metodos:
+        if metodo == 'iqr':
+            inf_m, sup_m, q1, q3 = limites_iqr(valores, limite_iqr)
+            resultado['iqr'] = {'Q1': q1, 'Q3': q3, 'IQR': q3 - q1,
+                                'Limite Inferior': inf_m, 'Limite Superior': sup_m}
+        elif metodo == 'mad':
+            inf_m, sup_m = limites_mad(valores, limite_z)
+        else:
+            inf_m, sup_m = limites_hampel(valores, janela_hampel, limite_hampel)
+
+        # Comparações com limites NaN resultam em False: a célula não é marcada
+        mascaras[metodo] = (valores < inf_m) | (valores > sup_m)
+        inferior = np.fmax(inferior, inf_m)
+        superior = np.fmin(superior, sup_m)
+
+    mascara = np.logical_or.reduce(list(mascaras.values())) if mascaras else np.zeros(valores.shape, dtype=bool)
+
+    resumo = pd.DataFrame({METODOS_OUTLIERS[m]: mascaras[m].sum(axis=0) for m in mascaras}, index=df.columns)
+    resumo['Total'] = mascara.sum(axis=0)
+    resumo['Porcentagem'] = resumo['Total'] / len(df) * 100 if len(df) else 0.0
+
+    resultado.update({
+        'mascara': pd.DataFrame(mascara, index=df.index, columns=df.columns),
+        'mascaras': {m: pd.DataFrame(mascaras[m], index=df.index, columns=df.columns) for m in mascaras},
+        'inferior': inferior,
+        'superior': superior,
+        'resumo': resumo
+    })
+    return resultado
+
+
+def remover_outliers(df, mascara):
+    """Remove, numa única seleção, as linhas com outlier em qualquer coluna"""
+    return df.loc[~np.asarray(mascara).any(axis=1)]
+
+
+def winsorizar(df, deteccao):
+    """Substitui cada outlier pelo limite ultrapassado, mantendo todas as linhas"""
+    valores = np.clip(df.to_numpy(dtype=float), deteccao['inferior'], deteccao['superior'])
+    return pd.DataFrame(valores, index=df.index, columns=df.columns)
+
+
+def impressao_indice(indice):
+    """Hash das datas do índice, usado para garantir que a máscara corresponde aos dados"""
+    datas = pd.DatetimeIndex(indice).as_unit('ns').asi8
+    return hashlib.sha256(datas.tobytes()).hexdigest()[:32]
+
+
+def salvar_mascara_outliers(df, deteccao, tratamento='remover', caminho=CAMINHO_MASCARA_OUTLIERS):
+    """
+    Grava o resultado da detecção como máscara compacta, sem duplicar o dataset
+
+    • remover: um bit por linha (linha mantida ou não)
+    • winsorizar: um bit por célula e apenas os valores substituídos
+    O hash do índice de `df` acompanha a máscara; ela só é aplicada ao mesmo conjunto de datas.
+    """
+    mascara = np.asarray(deteccao['mascara'])
+    campos = {
+        'tratamento': np.array(tratamento),
+        'indice': np.array(impressao_indice(df.index)),
+        'n_linhas': np.array(len(df)),
+        'colunas': np.array([str(c) for c in df.columns])
+    }
+    if tratamento == 'winsorizar':
+        valores = np.clip(df.to_numpy(dtype=float), deteccao['inferior'], deteccao['superior'])
+        campos['celulas'] = np.packbits(mascara.ravel())
+        campos['valores'] = valores[mascara]
+    else:
+        campos['linhas'] = np.packbits(~mascara.any(axis=1))
+
+    np.savez_compressed(caminho, **campos)
+    return caminho
+
+
+def aplicar_mascara_outliers(df, caminho=CAMINHO_MASCARA_OUTLIERS):
+    """
+    Aplica a máscara gravada ao DataFrame final recém-carregado
+
+    Retorna o dataset sem outliers (ou winsorizado), ou None se a máscara não
+    existir ou tiver sido gerada para outro conjunto de datas.
+    """
+    if not os.path.exists(caminho):
+        return None
+    with np.load(caminho) as arquivo:
+        campos = {chave: arquivo[chave] for chave in arquivo.files}
+
+    n = int(campos['n_linhas'])
+    if len(df) != n or impressao_indice(df.index) != str(campos['indice']):
+        print(f"⚠️ Máscara de outliers desatualizada em relação aos dados: {caminho}")
+        return None
+
+    if str(campos['tratamento']) != 'winsorizar':
+        manter = np.unpackbits(campos['linhas'], count=n).astype(bool)
+        return df.loc[manter]
+
+    colunas = [str(c) for c in campos['colunas']]
+    celulas = np.unpackbits(campos['celulas'], count=n * len(colunas)).astype(bool).reshape(n, len(colunas))
+    completos = np.full(celulas.shape, np.nan)
+    completos[celulas] = campos['valores']
+
+    df = df.copy()
+    for j, coluna in enumerate(colunas):
+        if coluna in df.columns and celulas[:, j].any():
+            valores = df[coluna].to_numpy(dtype=float, copy=True)
+            valores[celulas[:, j]] = completos[celulas[:, j], j]
+            df[coluna] = valores
+    return df
@@ -0,0 +1,271 @@
+"""
+Estatísticas Incrementais
+Acumulador de momentos e quantis que é atualizado linha a linha e combinado entre partições
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from motor_estatisticas import (momentos_vazios, calcular_momentos, combinar_momentos,
+                                estatisticas_momentos, PROBABILIDADES_DESCRITIVAS)
+
+CAMINHO_ESTADO_PADRAO = 'estado_estatisticas.json'
+
+# Versão do formato gravado em disco; estados de versões anteriores são reconstruídos
+VERSAO_ESTADO = 2
+
+
+class SketchQuantis:
+    """
+    Resumo de quantis no estilo t-digest (centróides com média e peso).
+
+    Enquanto houver até `limite_exato` centróides, cada valor é guardado como um
+    centróide de peso 1 e os quantis são exatos (mesma interpolação linear do pandas).
+    Acima disso, centróides vizinhos são fundidos segundo a função de escala
+    k1 = δ/2π · asin(2q − 1), que mantém grupos pequenos nas caudas; `compressao` (δ)
+    controla o número de centróides restantes (cerca de δ/2). Dois sketches são
+    combinados juntando os centróides e comprimindo de novo.
+    """
+
+    def __init__(self, compressao=400, limite_exato=4096):
+        self.compressao = compressao
+        self.limite_exato = limite_exato
+        self.medias = np.empty(0)
+        self.pesos = np.empty(0)
+        self.minimo = np.inf
+        self.maximo = -np.inf
+
+    @property
+    def n(self):
+        return float(self.pesos.sum())
+
+    def _incorporar(self, medias, pesos, minimo, maximo):
+        medias = np.concatenate([self.medias, medias])
+        pesos = np.concatenate([self.pesos, pesos])
+        ordem = np.argsort(medias, kind='stable')
+        self.medias, self.pesos = medias[ordem], pesos[ordem]
+        self.minimo = min(self.minimo, minimo)
+        self.maximo = max(self.maximo, maximo)
+        if len(self.medias) > self.limite_exato:
+            self._comprimir()
+
+    def _comprimir(self):
+        acumulado = np.cumsum(self.pesos)
+        q = (acumulado - self.pesos / 2) / acumulado[-1]
+        escala = self.compressao / (2 * np.pi) * np.arcsin(2 * q - 1)
+        grupos = np.floor(escala + self.compressao / 4)
+
+        inicios = np.concatenate([[0], np.flatnonzero(np.diff(grupos)) + 1])
+        pesos = np.add.reduceat(self.pesos, inicios)
+        self.medias = np.add.reduceat(self.medias * self.pesos, inicios) / pesos
+        self.pesos = pesos
+
+    def adicionar(self, valores):
+        valores = np.asarray(valores, dtype=float)
+        valores = valores[~np.isnan(valores)]
+        if len(valores):
+            self._incorporar(valores, np.ones(len(valores)), valores.min(), valores.max())
+        return self
+
+    def combinar(self, outro):
+        if len(outro.medias):
+            self._incorporar(outro.medias, outro.pesos, outro.minimo, outro.maximo)
+        return self
+
+    def quantis(self, probabilidades=PROBABILIDADES_DESCRITIVAS):
+        """Quantis por interpolação linear entre os centros dos centróides"""
+        probabilidades = np.asarray(probabilidades, dtype=float)
+        n = self.n
+        if n == 0:
+            return np.full(len(probabilidades), np.nan)
+
+        # Centro (em posições 0.5, 1.5, ...) de cada centróide; extremos ancorados no mínimo e no máximo
+        centros = np.cumsum(self.pesos) - self.pesos / 2
+        posicoes = np.concatenate([[0.5], centros, [n - 0.5]])
+        valores = np.concatenate([[self.minimo], self.medias, [self.maximo]])
+        return np.interp(probabilidades * (n - 1) + 0.5, posicoes, valores)
+
+    def para_dict(self):
+        return {
+            'compressao': self.compressao,
+            'limite_exato': self.limite_exato,
+            'medias': self.medias.tolist(),
+            'pesos': self.pesos.tolist(),
+            'minimo': self.minimo if np.isfinite(self.minimo) else None,
+            'maximo': self.maximo if np.isfinite(self.maximo) else None
+        }
+
+    @classmethod
+    def de_dict(cls, estado):
+        sketch = cls(estado['compressao'], estado['limite_exato'])
+        sketch.medias = np.asarray(estado['medias'], dtype=float)
+        sketch.pesos = np.asarray(estado['pesos'], dtype=float)
+        sketch.minimo = estado['minimo'] if estado['minimo'] is not None else np.inf
+        sketch.maximo = estado['maximo'] if estado['maximo'] is not None else -np.inf
+        return sketch
+
+
+class AcumuladorMomentos:
+    """
+    Contagem, média, momentos centrais de 2ª a 4ª ordem, mínimo, máximo e quantis
+    de um conjunto de colunas, além dos co-momentos usados nas correlações.
+
+    Novos lotes de linhas são incorporados pelas fórmulas de combinação de Chan/Pébay,
+    de modo que anexar um pregão custa O(novas linhas) e dois acumuladores de
+    partições distintas (ex.: um por ano) podem ser somados sem reler os dados.
+    Os momentos de cada coluna ignoram apenas os seus próprios valores ausentes;
+    os co-momentos usam as linhas completas. Os quantis vêm de um SketchQuantis
+    por coluna.
+    """
+
+    def __init__(self, colunas, compressao=400, limite_exato=4096):
+        self.colunas = list(colunas)
+        k = len(self.colunas)
+        self.momentos = momentos_vazios(k)
+        self.sketches = [SketchQuantis(compressao, limite_exato) for _ in self.colunas]
+        self.n = 0
+        self.media = np.zeros(k)
+        self.comomentos = np.zeros((k, k))
+        self.ultima_data = None
+
+    @property
+    def minimo(self):
+        return self.momentos['minimo']
+
+    @property
+    def maximo(self):
+        return self.momentos['maximo']
+
+    def atualizar(self, df):
+        """Incorpora as linhas de `df` (DataFrame com as colunas acompanhadas)"""
+        df = df[self.colunas].dropna(how='all')
+        if df.empty:
+            return self
+
+        x = df.to_numpy(dtype=float)
+        self.momentos = combinar_momentos(self.momentos, calcular_momentos(x))
+        for sketch, coluna in zip(self.sketches, x.T):
+            sketch.adicionar(coluna)
+
+        completas = x[~np.isnan(x).any(axis=1)]
+        if len(completas):
+            media_b = completas.mean(axis=0)
+            centrado = completas - media_b
+            self._combinar_comomentos(len(completas), media_b, centrado.T @ centrado)
+
+        if isinstance(df.index, pd.DatetimeIndex):
+            ultima = df.index.max()
+            self.ultima_data = ultima if self.ultima_data is None else max(self.ultima_data, ultima)
+        return self
+
+    def _combinar_comomentos(self, n_b, media_b, comomentos_b):
+        n_a = self.n
+        n = n_a + n_b
+        delta = media_b - self.media
+
+        self.media = self.media + delta * (n_b / n)
+        self.comomentos = self.comomentos + comomentos_b + np.outer(delta, delta) * (n_a * n_b / n)
+        self.n = n
+
+    def combinar(self, outro):
+        """Combina, no próprio acumulador, o estado de outra partição com as mesmas colunas"""
+        if outro.colunas != self.colunas:
+            raise ValueError("Acumuladores com colunas diferentes não podem ser combinados")
+
+        self.momentos = combinar_momentos(self.momentos, outro.momentos)
+        for sketch, sketch_outro in zip(self.sketches, outro.sketches):
+            sketch.combinar(sketch_outro)
+        if outro.n > 0:
+            self._combinar_comomentos(outro.n, outro.media, outro.comomentos)
+
+        if outro.ultima_data is not None:
+            self.ultima_data = outro.ultima_data if self.ultima_data is None else max(self.ultima_data, outro.ultima_data)
+        return self
+
+    def variancia(self, ddof=1):
+        n = self.momentos['n']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(n > ddof, self.momentos['m2'] / (n - ddof), np.nan)
+
+    def quantis(self, probabilidades=PROBABILIDADES_DESCRITIVAS):
+        """Array (len(probabilidades), colunas) com os quantis de cada coluna"""
+        return np.column_stack([sketch.quantis(probabilidades) for sketch in self.sketches])
+
+    def resumo(self):
+        """Tabela no formato de DataFrame.describe()"""
+        estatisticas = estatisticas_momentos(self.momentos)
+        q1, mediana, q3 = self.quantis((0.25, 0.5, 0.75))
+        return pd.DataFrame({
+            'count': self.momentos['n'],
+            'mean': estatisticas['media'],
+            'std': estatisticas['desvio'],
+            'min': estatisticas['minimo'],
+            '25%': q1,
+            '50%': mediana,
+            '75%': q3,
+            'max': estatisticas['maximo']
+        }, index=self.colunas).T
+
+    def tabela_descritiva(self):
+        """Tabela no formato de estatisticas_descritivas_completas (uma linha por coluna)"""
+        estatisticas = estatisticas_momentos(self.momentos)
+        q1, mediana, q3 = self.quantis((0.25, 0.5, 0.75))
+        return pd.DataFrame({
+            'Média': estatisticas['media'],
+            'Mediana': mediana,
+            'Desvio Padrão': estatisticas['desvio'],
+            'Mínimo': estatisticas['minimo'],
+            'Máximo': estatisticas['maximo'],
+            'Q1 (25%)': q1,
+            'Q3 (75%)': q3,
+            'IQR': q3 - q1,
+            'Assimetria': estatisticas['assimetria'],
+            'Curtose': estatisticas['curtose']
+        }, index=self.colunas)
+
+    def correlacao(self):
+        desvios = np.sqrt(np.diag(self.comomentos))
+        corr = self.comomentos / np.outer(desvios, desvios)
+        return pd.DataFrame(corr, index=self.colunas, columns=self.colunas)
+
+    def para_dict(self):
+        return {
+            'versao': VERSAO_ESTADO,
+            'colunas': self.colunas,
+            'momentos': {chave: valor.tolist() for chave, valor in self.momentos.items()},
+            'sketches': [sketch.para_dict() for sketch in self.sketches],
+            'n': int(self.n),
+            'media': self.media.tolist(),
+            'comomentos': self.comomentos.tolist(),
+            'ultima_data': self.ultima_data.strftime('%Y-%m-%d') if self.ultima_data is not None else None
+        }
+
+    @classmethod
+    def de_dict(cls, estado):
+        acumulador = cls(estado['colunas'])
+        acumulador.momentos = {chave: np.asarray(valor, dtype=float) for chave, valor in estado['momentos'].items()}
+        acumulador.sketches = [SketchQuantis.de_dict(s) for s in estado['sketches']]
+        acumulador.n = estado['n']
+        acumulador.media = np.asarray(estado['media'], dtype=float)
+        acumulador.comomentos = np.asarray(estado['comomentos'], dtype=float)
+        if estado.get('ultima_data'):
+            acumulador.ultima_data = pd.Timestamp(estado['ultima_data'])
+        return acumulador
+
+    def salvar(self, caminho=CAMINHO_ESTADO_PADRAO):
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump(self.para_dict(), f)
+
+    @classmethod
+    def carregar(cls, caminho=CAMINHO_ESTADO_PADRAO):
+        """Carrega o estado salvo, ou None se o arquivo não existir ou for de uma versão anterior"""
+        if not os.path.exists(caminho):
+            return None
+        with open(caminho, 'r', encoding='utf-8') as f:
+            estado = json.load(f)
+        if estado.get('versao') != VERSAO_ESTADO:
+            return None
+        return cls.de_dict(estado)
@@ -0,0 +1,292 @@
+"""
+Fontes de Preços
+Abstração das fontes de dados usadas pela coleta (yfinance, replay local e gerador sintético)
+"""
+
+import os
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import numpy as np
+import yfinance as yf
+
+CAMPOS_PRECO = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+
+
+def nome_arquivo_ticker(ticker):
+    """Nome de arquivo seguro para um ticker (ex.: '^GSPC' -> '_GSPC')"""
+    return ticker.replace('^', '_').replace('/', '_')
+
+
+def _filtrar_periodo(df, data_inicio, data_fim):
+    """Recorta o intervalo [data_inicio, data_fim), mesma convenção do yfinance"""
+    periodo = (df.index >= pd.Timestamp(data_inicio)) & (df.index < pd.Timestamp(data_fim))
+    return df.loc[periodo]
+
+
+class FontePrecos:
+    """
+    Interface comum das fontes de preços.
+
+    `baixar` recebe uma lista de tickers e o período [data_inicio, data_fim) e
+    retorna um dicionário {ticker: DataFrame} com as colunas de CAMPOS_PRECO,
+    apenas para os tickers efetivamente obtidos.
+    """
+
+    # Fontes remotas alimentam o cache local em disco; fontes offline não
+    remota = False
+
+    def baixar(self, tickers, data_inicio, data_fim):
+        raise NotImplementedError
+
+    def acoes_em_circulacao(self, tickers, data_inicio, data_fim):
+        """
+        Séries de ações em circulação, na mesma base de desdobramentos dos preços.
+
+        Retorna {ticker: Series} com observações esparsas (apenas datas em que o
+        número mudou). A implementação padrão não oferece esse dado.
+        """
+        return {}
+
+    def __repr__(self):
+        return f"{type(self).__name__}()"
+
+
+class FonteYFinance(FontePrecos):
+    """Fonte online via Yahoo Finance, com requisições multi-ticker e retentativa com backoff"""
+
+    remota = True
+
+    def __init__(self, tentativas=3, espera_base=1.0):
+        self.tentativas = tentativas
+        self.espera_base = espera_base
+
+    @staticmethod
+    def _extrair_ticker(dados, ticker):
+        """Extrai o DataFrame de campos (Open, Close, Adj Close, ...) de um ticker do retorno do yf.download"""
+        if dados is None or dados.empty:
+            return None
+        if isinstance(dados.columns, pd.MultiIndex):
+            if ticker not in dados.columns.get_level_values(1):
+                return None
+            df_ticker = dados.xs(ticker, axis=1, level=1)
+        else:
+            df_ticker = dados
+        df_ticker = df_ticker[[c for c in CAMPOS_PRECO if c in df_ticker.columns]].dropna(how='all')
+        return df_ticker if not df_ticker.empty else None
+
+    def _download(self, tickers, data_inicio, data_fim):
+        return yf.download(list(tickers), start=data_inicio, end=data_fim, progress=False,
+                           auto_adjust=False, group_by='column', threads=False)
+
+    def baixar(self, tickers, data_inicio, data_fim):
+        """
+        Baixa um lote de tickers numa única requisição multi-ticker.
+
+        Tickers que voltarem vazios são baixados novamente de forma individual,
+        com backoff exponencial entre tentativas.
+        """
+        dados = None
+        for tentativa in range(self.tentativas):
+            try:
+                dados = self._download(tickers, data_inicio, data_fim)
+                break
+            except Exception:
+                if tentativa < self.tentativas - 1:
+                    time.sleep(self.espera_base * 2 ** tentativa)
+
+        resultado = {}
+        pendentes = []
+        for ticker in tickers:
+            df_ticker = self._extrair_ticker(dados, ticker)
+            if df_ticker is not None:
+                resultado[ticker] = df_ticker
+            else:
+                pendentes.append(ticker)
+
+        # Retentativa individual para os tickers que falharam no lote
+        for ticker in pendentes:
+            for tentativa in range(self.tentativas):
+                if tentativa > 0:
+                    time.sleep(self.espera_base * 2 ** (tentativa - 1))
+                try:
+                    dados_ticker = self._download([ticker], data_inicio, data_fim)
+                except Exception:
+                    continue
+                df_ticker = self._extrair_ticker(dados_ticker, ticker)
+                if df_ticker is not None:
+                    resultado[ticker] = df_ticker
+                    break
+
+        return resultado
+
+    def _acoes_ticker(self, ticker, data_inicio, data_fim):
+        ativo = yf.Ticker(ticker)
+        acoes = ativo.get_shares_full(start=data_inicio, end=data_fim)
+        if acoes is None or len(acoes) == 0:
+            return None
+        acoes = acoes[~acoes.index.duplicated(keep='last')].sort_index()
+        acoes.index = pd.DatetimeIndex(acoes.index).tz_localize(None).normalize()
+        acoes = acoes[~acoes.index.duplicated(keep='last')].astype(float)
+
+        # O Yahoo informa a contagem histórica sem ajuste; os preços vêm ajustados
+        # por desdobramentos, então a contagem anterior a cada split é multiplicada pelo fator
+        splits = ativo.splits
+        if splits is not None and len(splits) > 0:
+            splits.index = pd.DatetimeIndex(splits.index).tz_localize(None).normalize()
+            for data_split, fator in splits.items():
+                acoes[acoes.index < data_split] *= fator
+
+        return acoes
+
+    def acoes_em_circulacao(self, tickers, data_inicio, data_fim):
+        resultado = {}
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futuros = {executor.submit(self._acoes_ticker, t, data_inicio, data_fim): t for t in tickers}
+            for futuro, ticker in futuros.items():
+                try:
+                    acoes = futuro.result()
+                except Exception:
+                    continue
+                if acoes is not None:
+                    resultado[ticker] = acoes
+        return resultado
+
+    def __repr__(self):
+        return f"FonteYFinance(tentativas={self.tentativas})"
+
+
+class FonteReplay(FontePrecos):
+    """
+    Fonte offline que reproduz preços gravados localmente.
+
+    `caminho` pode ser:
+      • um arquivo CSV/Parquet "largo" (uma coluna por ativo, como `dados_precos.csv`);
+        `mapa_colunas` traduz ticker -> nome da coluna (ex.: {'AAPL': 'Apple'});
+      • um diretório com um Parquet por ticker no formato do cache da coleta.
+    Num arquivo largo só há um preço por dia, usado como Close e Adj Close.
+    `caminho_acoes` aponta opcionalmente para um arquivo largo de ações em circulação.
+    """
+
+    def __init__(self, caminho='dados_precos.csv', mapa_colunas=None, caminho_acoes=None):
+        self.caminho = caminho
+        self.mapa_colunas = mapa_colunas or {}
+        self.caminho_acoes = caminho_acoes
+        self._df_largo = None
+
+    def _carregar_largo(self):
+        if self._df_largo is None:
+            if self.caminho.endswith('.parquet'):
+                self._df_largo = pd.read_parquet(self.caminho)
+            else:
+                self._df_largo = pd.read_csv(self.caminho, index_col=0, parse_dates=True)
+        return self._df_largo
+
+    def _ler_ticker(self, ticker):
+        if os.path.isdir(self.caminho):
+            caminho_ticker = os.path.join(self.caminho, f'{nome_arquivo_ticker(ticker)}.parquet')
+            if not os.path.exists(caminho_ticker):
+                return None
+            return pd.read_parquet(caminho_ticker)
+
+        df_largo = self._carregar_largo()
+        coluna = self.mapa_colunas.get(ticker, ticker)
+        if coluna not in df_largo.columns:
+            return None
+        preco = df_largo[coluna]
+        return pd.DataFrame({'Close': preco, 'Adj Close': preco, 'Volume': np.nan})
+
+    def baixar(self, tickers, data_inicio, data_fim):
+        resultado = {}
+        for ticker in tickers:
+            df_ticker = self._ler_ticker(ticker)
+            if df_ticker is None:
+                continue
+            df_ticker = _filtrar_periodo(df_ticker, data_inicio, data_fim).dropna(how='all')
+            if not df_ticker.empty:
+                resultado[ticker] = df_ticker
+        return resultado
+
+    def acoes_em_circulacao(self, tickers, data_inicio, data_fim):
+        if not self.caminho_acoes or not os.path.exists(self.caminho_acoes):
+            return {}
+        if self.caminho_acoes.endswith('.parquet'):
+            df_acoes = pd.read_parquet(self.caminho_acoes)
+        else:
+            df_acoes = pd.read_csv(self.caminho_acoes, index_col=0, parse_dates=True)
+
+        resultado = {}
+        for ticker in tickers:
+            coluna = ticker if ticker in df_acoes.columns else self.mapa_colunas.get(ticker)
+            if coluna in df_acoes.columns:
+                acoes = df_acoes[coluna].dropna()
+                if not acoes.empty:
+                    resultado[ticker] = acoes
+        return resultado
+
+    def __repr__(self):
+        return f"FonteReplay(caminho={self.caminho!r})"
+
+
+class FonteSintetica(FontePrecos):
+    """
+    Gerador sintético determinístico de preços (movimento browniano geométrico).
+
+    Cada ticker recebe uma semente derivada do próprio nome, de modo que a mesma
+    série é produzida em qualquer execução e independe da ordem dos lotes.
+    """
+
+    def __init__(self, semente=42, preco_inicial=100.0, retorno_anual=0.08, volatilidade_anual=0.30):
+        self.semente = semente
+        self.preco_inicial = preco_inicial
+        self.retorno_anual = retorno_anual
+        self.volatilidade_anual = volatilidade_anual
+
+    def _rng(self, ticker, campo):
+        # Um gerador independente por campo mantém cada série estável para qualquer tamanho de amostra
+        return np.random.default_rng([self.semente, zlib.crc32(ticker.encode()), campo])
+
+    def _gerar(self, ticker, datas):
+        n = len(datas)
+        mu = self.retorno_anual / 252
+        sigma = self.volatilidade_anual / np.sqrt(252)
+
+        log_retornos = self._rng(ticker, 0).normal(mu - sigma ** 2 / 2, sigma, n)
+        fechamento = self.preco_inicial * np.exp(np.cumsum(log_retornos))
+        abertura = fechamento * np.exp(self._rng(ticker, 1).normal(0, sigma / 4, n))
+
+        return pd.DataFrame({
+            'Open': abertura,
+            'High': np.maximum(abertura, fechamento) * (1 + np.abs(self._rng(ticker, 2).normal(0, sigma / 4, n))),
+            'Low': np.minimum(abertura, fechamento) * (1 - np.abs(self._rng(ticker, 3).normal(0, sigma / 4, n))),
+            'Close': fechamento,
+            'Adj Close': fechamento,
+            'Volume': self._rng(ticker, 4).integers(1_000_000, 50_000_000, n).astype(float)
+        }, index=pd.DatetimeIndex(datas, name='Date'))
+
+    def baixar(self, tickers, data_inicio, data_fim):
+        # Gera sempre a partir de uma data base fixa para que recortes diferentes
+        # do mesmo ticker sejam consistentes entre si
+        datas = pd.bdate_range('2000-01-03', data_fim, inclusive='left')
+        resultado = {}
+        for ticker in tickers:
+            df_ticker = _filtrar_periodo(self._gerar(ticker, datas), data_inicio, data_fim)
+            if not df_ticker.empty:
+                resultado[ticker] = df_ticker
+        return resultado
+
+    def acoes_em_circulacao(self, tickers, data_inicio, data_fim):
+        # Contagem trimestral com recompras/emissões pequenas em torno de um nível fixo por ticker
+        datas = pd.date_range('2000-01-01', data_fim, freq='QS')
+        resultado = {}
+        for ticker in tickers:
+            nivel = self._rng(ticker, 5).uniform(1e9, 2e10)
+            variacao = np.cumsum(self._rng(ticker, 6).normal(0, 0.005, len(datas)))
+            acoes = pd.Series(nivel * np.exp(variacao), index=datas)
+            resultado[ticker] = acoes[acoes.index < pd.Timestamp(data_fim)]
+        return resultado
+
+    def __repr__(self):
+        return f"FonteSintetica(semente={self.semente})"
@@ -30,7 +30,10 @@ def executar_comando(comando, descricao):
         return False
 
 def verificar_arquivos_dados():
-    """Verifica se os arquivos de dados existem"""
+    """Verifica se os dados existem (tabelas Parquet em dados/ ou os arquivos CSV)"""
+    tabelas = [os.path.join('dados', nome) for nome in ['precos', 'retornos', 'pesos_bigtech']]
+    if all(os.path.isdir(tabela) for tabela in tabelas):
+        return True
     arquivos = ['dados_precos.csv', 'dados_retornos.csv', 'dados_pesos_bigtech.csv']
     existem = all(os.path.exists(arquivo) for arquivo in arquivos)
     return existem
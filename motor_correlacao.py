@@ -0,0 +1,581 @@
+"""
+Motor de Correlação
+Matrizes de correlação (Pearson, Spearman, Kendall), valores-p, intervalos de Fisher-z
+e tabela de pares significativos, calculados como operações matriciais
+"""
+
+import io
+import os
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm, rankdata, t as dist_t
+
+METODOS_CORRELACAO = ('pearson', 'spearman', 'kendall')
+
+# Variância aproximada de atanh(r) (Fieller, Hartley e Pearson, 1957)
+_VARIANCIA_FISHER = {'pearson': 1.0, 'spearman': 1.06, 'kendall': 0.437}
+_GRAUS_FISHER = {'pearson': 3, 'spearman': 3, 'kendall': 4}
+
+
+def pearson_pares_completos(valores):
+    """
+    Correlação de Pearson usando, para cada par de colunas, as linhas em que ambas existem
+
+    Todas as somas por par (contagens, somas, somas de quadrados e produtos cruzados)
+    saem de produtos matriciais entre os valores e a máscara de valores válidos.
+    Retorna (correlação, número de observações por par).
+    """
+    validos = ~np.isnan(valores)
+    centrados = valores - np.nanmean(valores, axis=0)  # reduz o cancelamento numérico
+    x = np.where(validos, centrados, 0.0)
+    m = validos.astype(float)
+
+    n = m.T @ m
+    soma = x.T @ m                 # soma[i, j]: soma de x_i nas linhas válidas para i e j
+    soma_quadrados = (x * x).T @ m
+    produtos = x.T @ x
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        covariancia = produtos - soma * soma.T / n
+        variancia = soma_quadrados - soma * soma / n
+        corr = covariancia / np.sqrt(variancia * variancia.T)
+    corr = np.clip(corr, -1.0, 1.0)
+    corr[n < 2] = np.nan
+    return corr, n
+
+
+def _postos(valores):
+    """Postos por coluna (média nos empates), mantendo os valores ausentes"""
+    return rankdata(valores, axis=0, nan_policy='omit')
+
+
+def spearman_pares_completos(valores):
+    """
+    Correlação de Spearman com tratamento por pares completos
+
+    Colunas sem valores ausentes são ranqueadas uma única vez. Para cada coluna
+    com ausências, as demais são re-ranqueadas só nas linhas em que ela existe;
+    pares de duas colunas com ausências usam a interseção das linhas do par.
+    """
+    validos = ~np.isnan(valores)
+    corr, n = pearson_pares_completos(_postos(valores))
+
+    com_ausencia = np.flatnonzero(~validos.all(axis=0))
+    completas = np.flatnonzero(validos.all(axis=0))
+    for j in com_ausencia:
+        linhas = validos[:, j]
+        if completas.size:
+            sub = _postos(valores[linhas][:, np.r_[j, completas]])
+            corr_sub, _ = pearson_pares_completos(sub)
+            corr[j, completas] = corr[completas, j] = corr_sub[0, 1:]
+        for i in com_ausencia[com_ausencia > j]:
+            par = linhas & validos[:, i]
+            if par.sum() >= 2:
+                corr_par, _ = pearson_pares_completos(_postos(valores[par][:, [j, i]]))
+                corr[j, i] = corr[i, j] = corr_par[0, 1]
+    return corr, n
+
+
+def kendall_pares_completos(valores, max_elementos=2 ** 23):
+    """
+    Tau-b de Kendall de todas as colunas com tratamento por pares completos
+
+    Para cada par de linhas (a, b), sign(x_b − x_a) de todas as colunas forma uma
+    linha da matriz S; concordâncias menos discordâncias de todos os pares de
+    colunas saem de S.T @ S, e os termos de empate do tau-b de produtos análogos
+    com as máscaras de pares válidos. Os pares de linhas são processados em lotes.
+    """
+    n_linhas, k = valores.shape
+    validos = ~np.isnan(valores)
+    x = np.where(validos, valores, 0.0)
+
+    concordancia = np.zeros((k, k))
+    nao_empatados = np.zeros((k, k))   # [i, j]: pares válidos para i e j sem empate em i
+
+    por_lote = max(1, max_elementos // max(n_linhas * k, 1))
+    for inicio in range(0, n_linhas - 1, por_lote):
+        a = np.arange(inicio, min(inicio + por_lote, n_linhas - 1))
+        # Pares (a, b) com b > a
+        b_idx = np.arange(n_linhas)
+        superior = b_idx[None, :] > a[:, None]
+        a_rep = np.broadcast_to(a[:, None], superior.shape)[superior]
+        b_rep = np.broadcast_to(b_idx[None, :], superior.shape)[superior]
+
+        valido_par = (validos[a_rep] & validos[b_rep]).astype(np.float32)
+        sinal = np.sign(x[b_rep] - x[a_rep]).astype(np.float32) * valido_par
+
+        concordancia += sinal.T @ sinal
+        nao_empatados += np.abs(sinal).T @ valido_par
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tau = concordancia / np.sqrt(nao_empatados * nao_empatados.T)
+    m = validos.astype(float)
+    return np.clip(tau, -1.0, 1.0), m.T @ m
+
+
+def _valores_p(corr, n, metodo):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if metodo == 'kendall':
+            # Aproximação normal da estatística de Kendall (sem correção de empates)
+            z = 3 * corr * np.sqrt(n * (n - 1)) / np.sqrt(2 * (2 * n + 5))
+            p = 2 * norm.sf(np.abs(z))
+        else:
+            graus = n - 2
+            estatistica_t = corr * np.sqrt(graus / ((1 - corr) * (1 + corr)))
+            p = 2 * dist_t.sf(np.abs(estatistica_t), graus)
+    p = np.where(np.abs(corr) >= 1, 0.0, p)
+    return np.where(np.isnan(corr), np.nan, p)
+
+
+def _intervalos_fisher(corr, n, metodo, nivel_confianca):
+    z_critico = norm.ppf(0.5 + nivel_confianca / 2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        erro = np.sqrt(_VARIANCIA_FISHER[metodo] / (n - _GRAUS_FISHER[metodo]))
+        z = np.arctanh(np.clip(corr, -1 + 1e-15, 1 - 1e-15))
+    return np.tanh(z - z_critico * erro), np.tanh(z + z_critico * erro)
+
+
+def correlacoes(df, metodo='pearson', nivel_confianca=0.95):
+    """
+    Matriz de correlação com valores-p, intervalos de Fisher-z e contagens por par
+
+    Valores ausentes são tratados por pares completos. Retorna um dicionário de
+    DataFrames (colunas x colunas): correlacao, pvalores, ic_inferior, ic_superior, n.
+    """
+    valores = df.to_numpy(dtype=float)
+    if metodo == 'pearson':
+        corr, n = pearson_pares_completos(valores)
+    elif metodo == 'spearman':
+        corr, n = spearman_pares_completos(valores)
+    elif metodo == 'kendall':
+        corr, n = kendall_pares_completos(valores)
+    else:
+        raise ValueError(f"Método de correlação desconhecido: {metodo} (use {', '.join(METODOS_CORRELACAO)})")
+    np.fill_diagonal(corr, 1.0)
+
+    inferior, superior = _intervalos_fisher(corr, n, metodo, nivel_confianca)
+    rotulos = dict(index=df.columns, columns=df.columns)
+    return {
+        'metodo': metodo,
+        'nivel_confianca': nivel_confianca,
+        'correlacao': pd.DataFrame(corr, **rotulos),
+        'pvalores': pd.DataFrame(_valores_p(corr, n, metodo), **rotulos),
+        'ic_inferior': pd.DataFrame(inferior, **rotulos),
+        'ic_superior': pd.DataFrame(superior, **rotulos),
+        'n': pd.DataFrame(n, **rotulos)
+    }
+
+
+def pares_correlacao(resultado, limite=0.5, alfa=None):
+    """
+    Tabela dos pares (triângulo superior) com |r| > `limite` e, se informado, valor-p < `alfa`
+
+    Ordenada pela correlação absoluta, da maior para a menor.
+    """
+    corr = resultado['correlacao']
+    valores = corr.to_numpy()
+    pvalores = resultado['pvalores'].to_numpy()
+
+    selecionados = np.triu(np.abs(valores) > limite, k=1)
+    if alfa is not None:
+        selecionados &= pvalores < alfa
+    i, j = np.nonzero(selecionados)
+
+    nivel = f"{resultado['nivel_confianca'] * 100:g}%"
+    tabela = pd.DataFrame({
+        'Variável 1': corr.index[i],
+        'Variável 2': corr.columns[j],
+        'Correlação': valores[i, j],
+        'Valor-p': pvalores[i, j],
+        f'IC {nivel} Inferior': resultado['ic_inferior'].to_numpy()[i, j],
+        f'IC {nivel} Superior': resultado['ic_superior'].to_numpy()[i, j],
+        'N': resultado['n'].to_numpy()[i, j].astype(int)
+    })
+    ordem = np.argsort(-np.abs(tabela['Correlação'].to_numpy()), kind='stable')
+    return tabela.iloc[ordem].reset_index(drop=True)
+
+
+# Matrizes móveis (janela deslizante e EWMA) ----------------------------------------------
+
+CAMINHO_CORRELACAO_MOVEL = 'correlacao_movel'
+
+# Somas por par mantidas pelas janelas: n (linhas válidas para i e j), Σx_i, Σx_i² e Σx_i·x_j
+_SOMAS = ('n', 'soma', 'soma_quadrados', 'produtos')
+
+
+def _somas_linhas(x, m, completo=False):
+    """
+    Contribuição de cada linha às somas por par (linhas x colunas x colunas)
+
+    Sem valores ausentes (`completo`), contagens e somas não dependem do par e
+    são mantidas com eixos de tamanho 1, que se expandem por broadcasting.
+    """
+    if completo:
+        return {
+            'n': np.ones((len(x), 1, 1)),
+            'soma': x[:, :, None],
+            'soma_quadrados': (x * x)[:, :, None],
+            'produtos': np.einsum('ti,tj->tij', x, x)
+        }
+    return {
+        'n': np.einsum('ti,tj->tij', m, m),
+        'soma': np.einsum('ti,tj->tij', x, m),
+        'soma_quadrados': np.einsum('ti,tj->tij', x * x, m),
+        'produtos': np.einsum('ti,tj->tij', x, x)
+    }
+
+
+def _somas_janela(x, m, completo=False):
+    """Somas por par de um bloco de linhas inteiro, por produtos matriciais"""
+    if completo:
+        return {'n': np.full((1, 1), float(len(x))), 'soma': x.sum(axis=0)[:, None],
+                'soma_quadrados': (x * x).sum(axis=0)[:, None], 'produtos': x.T @ x}
+    return {'n': m.T @ m, 'soma': x.T @ m, 'soma_quadrados': (x * x).T @ m, 'produtos': x.T @ x}
+
+
+def _matrizes_das_somas(somas, min_periodos, pesos_quadrados=None):
+    """
+    Covariância e correlação (por pares completos) a partir das somas acumuladas
+
+    Aceita somas de uma matriz (colunas x colunas) ou de uma pilha (tempo x colunas x colunas).
+    Com `pesos_quadrados` (Σw² das somas ponderadas), aplica a correção de viés da média
+    ponderada, como o pandas em ewm(...).cov().
+    """
+    # Nas somas ponderadas, o "tamanho" de cada par é a soma dos pesos
+    n = somas.get('peso', somas['n'])
+    soma, produtos = somas['soma'], somas['produtos']
+    transposta = np.swapaxes(soma, -1, -2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        desvios = produtos - soma * transposta / n
+        variancia = somas['soma_quadrados'] - soma * soma / n
+        correlacao = np.clip(desvios / np.sqrt(variancia * np.swapaxes(variancia, -1, -2)), -1.0, 1.0)
+        if pesos_quadrados is None:
+            covariancia = desvios / (n - 1)
+        else:
+            covariancia = desvios / (n - pesos_quadrados / n)
+    insuficiente = np.broadcast_to(somas['n'] < max(min_periodos, 2), covariancia.shape)
+    covariancia[insuficiente] = np.nan
+    correlacao[insuficiente] = np.nan
+    return covariancia, correlacao
+
+
+def _preparar(df, colunas):
+    colunas = list(df.columns) if colunas is None else list(colunas)
+    valores = df[colunas].to_numpy(dtype=float)
+    validos = ~np.isnan(valores)
+    return colunas, valores, validos
+
+
+def _linhas_por_bloco(k, max_elementos):
+    return max(1, max_elementos // max(k * k, 1))
+
+
+def matrizes_moveis(df, janela=60, min_periodos=None, colunas=None, dtype=np.float32,
+                    contexto=None, max_elementos=2 ** 22):
+    """
+    Covariância e correlação em janela deslizante de `janela` linhas para todos os pares de colunas
+
+    As somas por par são atualizadas incrementalmente (entra a linha nova, sai a mais
+    antiga), por blocos de linhas: o início de cada bloco é somado diretamente, o
+    que limita o acúmulo de erro de arredondamento, e as linhas seguintes saem de
+    somas acumuladas das diferenças. Valores ausentes são tratados por pares completos.
+    `contexto` (linhas anteriores, com as mesmas colunas) permite estender um resultado
+    já calculado sem refazer o histórico (ver matrizes_novas).
+
+    Retorna um dicionário com as matrizes empilhadas (tempo x colunas x colunas) em `dtype`.
+    """
+    colunas, novos, _ = _preparar(df, colunas)
+    min_periodos = janela if min_periodos is None else min_periodos
+    contexto = np.empty((0, len(colunas))) if contexto is None else np.asarray(contexto, dtype=float)
+    valores = np.vstack([contexto, novos])
+    validos = ~np.isnan(valores)
+
+    # Centrar pela média reduz o cancelamento nas somas; as matrizes não dependem do centro
+    centro = np.nan_to_num(np.nanmean(valores, axis=0)) if validos.any() else 0.0
+    x = np.where(validos, valores - centro, 0.0)
+    m = validos.astype(float)
+    completo = bool(validos.all())
+
+    n_total, k = valores.shape
+    inicio_saida = len(contexto)
+    covariancia = np.full((len(novos), k, k), np.nan, dtype=dtype)
+    correlacao = np.full((len(novos), k, k), np.nan, dtype=dtype)
+
+    por_bloco = _linhas_por_bloco(k, max_elementos)
+    for t0 in range(inicio_saida, n_total, por_bloco):
+        t1 = min(t0 + por_bloco, n_total)
+        primeira = max(t0 - janela + 1, 0)
+        base = _somas_janela(x[primeira:t0 + 1], m[primeira:t0 + 1], completo)
+
+        # Linhas que entram (t0+1 .. t1-1) e que saem (t-janela) da janela em cada passo
+        entram = np.arange(t0 + 1, t1)
+        saem = entram - janela
+        fora = saem < 0
+        saem = np.where(fora, 0, saem)
+        x_sai = np.where(fora[:, None], 0.0, x[saem])
+        m_sai = np.where(fora[:, None], 0.0, m[saem])
+
+        entrada = _somas_linhas(x[entram], m[entram], completo)
+        saida = _somas_linhas(x_sai, m_sai, completo)
+        if completo:
+            # Linhas anteriores ao início da série não saem de janela alguma
+            saida['n'] = m_sai[:, :1, None]
+        somas = {}
+        for chave in _SOMAS:
+            passos = np.cumsum(entrada[chave] - saida[chave], axis=0)
+            somas[chave] = np.concatenate([base[chave][None], base[chave] + passos])
+
+        cov, corr = _matrizes_das_somas(somas, min_periodos)
+        covariancia[t0 - inicio_saida:t1 - inicio_saida] = cov
+        correlacao[t0 - inicio_saida:t1 - inicio_saida] = corr
+
+    return {
+        'tipo': 'janela',
+        'parametro': float(janela),
+        'min_periodos': int(min_periodos),
+        'datas': pd.DatetimeIndex(df.index),
+        'colunas': colunas,
+        'covariancia': covariancia,
+        'correlacao': correlacao,
+        'estado': {'cauda': valores[max(n_total - janela + 1, 0):]}
+    }
+
+
+def _decaimento(span=None, meia_vida=None, alfa=None):
+    """Fator de decaimento (1 − α) a partir de span, meia-vida ou α, como em pandas.ewm"""
+    if alfa is None:
+        if span is not None:
+            alfa = 2 / (span + 1)
+        elif meia_vida is not None:
+            alfa = 1 - np.exp(-np.log(2) / meia_vida)
+        else:
+            raise ValueError("Informe span, meia_vida ou alfa")
+    return 1 - alfa
+
+
+def matrizes_ewma(df, span=None, meia_vida=None, alfa=None, min_periodos=0, colunas=None,
+                  dtype=np.float32, estado=None, max_elementos=2 ** 22):
+    """
+    Covariância e correlação com pesos exponenciais (EWMA) para todos os pares de colunas
+
+    Mesmas convenções de pandas.ewm(adjust=True, ignore_na=False): o peso de cada
+    linha decai com a distância em linhas e a covariância tem correção de viés.
+    As somas ponderadas seguem a recursão S_t = (1 − α)·S_{t−1} + termo_t, resolvida
+    por blocos com uma soma acumulada reescalonada. `estado` (de um resultado anterior)
+    continua a recursão a partir das linhas já processadas.
+
+    Retorna um dicionário com as matrizes empilhadas (tempo x colunas x colunas) em `dtype`.
+    """
+    colunas, valores, validos = _preparar(df, colunas)
+    decaimento = _decaimento(span, meia_vida, alfa)
+    n_linhas, k = valores.shape
+    completo = bool(validos.all())
+
+    if estado is None:
+        centro = np.nan_to_num(np.nanmean(valores, axis=0)) if validos.any() else np.zeros(k)
+        por_par = (1, 1) if completo else (k, k)
+        por_coluna = (k, 1) if completo else (k, k)
+        acumulado = {'n': np.zeros(por_par), 'peso': np.zeros(por_par), 'peso_quadrado': np.zeros(por_par),
+                     'soma': np.zeros(por_coluna), 'soma_quadrados': np.zeros(por_coluna),
+                     'produtos': np.zeros((k, k))}
+    else:
+        centro = estado['centro']
+        acumulado = {chave: estado[chave] for chave in ('n', 'peso', 'peso_quadrado', 'soma',
+                                                        'soma_quadrados', 'produtos')}
+    x = np.where(validos, valores - centro, 0.0)
+    m = validos.astype(float)
+
+    covariancia = np.full((n_linhas, k, k), np.nan, dtype=dtype)
+    correlacao = np.full((n_linhas, k, k), np.nan, dtype=dtype)
+
+    # Blocos curtos o bastante para que (1 − α)^−b não perca precisão
+    limite_bloco = int(np.log(1e6) / -np.log(decaimento)) if decaimento < 1 else n_linhas
+    por_bloco = max(1, min(_linhas_por_bloco(k, max_elementos), limite_bloco))
+    for t0 in range(0, n_linhas, por_bloco):
+        t1 = min(t0 + por_bloco, n_linhas)
+        termos = _somas_linhas(x[t0:t1], m[t0:t1], completo)
+        j = np.arange(t1 - t0)[:, None, None]
+        potencias = decaimento ** (j + 1)
+        potencias_quadrado = decaimento ** (2 * (j + 1))
+
+        somas = {'n': acumulado['n'] + np.cumsum(termos['n'], axis=0)}
+        # S_{t0+j} = d^{j+1}·S_{t0−1} + d^j·Σ_{s≤j} d^{−s}·termo_s
+        for chave, termo in (('peso', termos['n']), ('soma', termos['soma']),
+                             ('soma_quadrados', termos['soma_quadrados']), ('produtos', termos['produtos'])):
+            somas[chave] = (potencias * acumulado[chave]
+                            + decaimento ** j * np.cumsum(termo / decaimento ** j, axis=0))
+        somas['peso_quadrado'] = (potencias_quadrado * acumulado['peso_quadrado']
+                                  + decaimento ** (2 * j) * np.cumsum(termos['n'] / decaimento ** (2 * j), axis=0))
+
+        cov, corr = _matrizes_das_somas(somas, min_periodos, somas['peso_quadrado'])
+        covariancia[t0:t1] = cov
+        correlacao[t0:t1] = corr
+        acumulado = {chave: valor[-1] for chave, valor in somas.items()}
+
+    return {
+        'tipo': 'ewma',
+        'parametro': float(1 - decaimento),
+        'min_periodos': int(min_periodos),
+        'datas': pd.DatetimeIndex(df.index),
+        'colunas': colunas,
+        'covariancia': covariancia,
+        'correlacao': correlacao,
+        'estado': dict(acumulado, centro=centro)
+    }
+
+
+def matrizes_novas(resultado, df_novos):
+    """
+    Matrizes apenas das linhas de `df_novos` posteriores às datas de `resultado`
+
+    A janela continua a partir da cauda guardada e o EWMA a partir das somas
+    ponderadas do estado, sem recalcular o histórico. Retorna um resultado só com as
+    datas novas (e o estado atualizado), ou None se não houver linhas novas.
+    """
+    novos = df_novos.loc[df_novos.index > resultado['datas'].max()] if len(resultado['datas']) else df_novos
+    if novos.empty:
+        return None
+
+    if resultado['tipo'] == 'janela':
+        return matrizes_moveis(novos, int(resultado['parametro']), resultado['min_periodos'],
+                               resultado['colunas'], resultado['correlacao'].dtype,
+                               contexto=resultado['estado']['cauda'])
+    return matrizes_ewma(novos, alfa=resultado['parametro'], min_periodos=resultado['min_periodos'],
+                         colunas=resultado['colunas'], dtype=resultado['correlacao'].dtype,
+                         estado=resultado['estado'])
+
+
+def _arquivos_movel(caminho, nome):
+    return os.path.join(caminho, f'{nome}.npz'), os.path.join(caminho, f'{nome}.correlacao.npy')
+
+
+def _salvar_metadados(arquivo, resultado, datas):
+    campos = {
+        'tipo': np.array(resultado['tipo']),
+        'parametro': np.array(resultado['parametro']),
+        'min_periodos': np.array(resultado['min_periodos']),
+        'datas': datas.as_unit('ns').asi8,
+        'colunas': np.array([str(c) for c in resultado['colunas']])
+    }
+    for chave, valor in resultado['estado'].items():
+        campos[f'estado.{chave}'] = valor
+    np.savez(arquivo, **campos)
+
+
+def _anexar_npy(arquivo, linhas, posicao):
+    """
+    Grava `linhas` a partir da linha `posicao` de uma pilha .npy e ajusta o cabeçalho
+
+    O numpy reserva espaço no cabeçalho para o primeiro eixo crescer, então só as
+    linhas novas são escritas; se o cabeçalho mudar de tamanho, o arquivo é regravado.
+    """
+    linhas = np.ascontiguousarray(linhas)
+    with open(arquivo, 'r+b') as f:
+        versao = np.lib.format.read_magic(f)
+        leitor = np.lib.format.read_array_header_1_0 if versao == (1, 0) else np.lib.format.read_array_header_2_0
+        forma, fortran, dtype = leitor(f)
+        inicio = f.tell()
+        if fortran or dtype != linhas.dtype or forma[1:] != linhas.shape[1:]:
+            raise ValueError(f"Pilha incompatível em {arquivo}: {forma} {dtype}")
+
+        cabecalho = io.BytesIO()
+        escritor = np.lib.format.write_array_header_1_0 if versao == (1, 0) else np.lib.format.write_array_header_2_0
+        escritor(cabecalho, {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False,
+                             'shape': (posicao + len(linhas),) + forma[1:]})
+        if len(cabecalho.getvalue()) == inicio:
+            f.seek(inicio + posicao * linhas[0].nbytes)
+            f.write(linhas.tobytes())
+            f.truncate()
+            f.seek(0)
+            f.write(cabecalho.getvalue())
+            return
+
+    anteriores = np.load(arquivo, mmap_mode='r')[:posicao]
+    temporario = arquivo + '.tmp.npy'
+    np.save(temporario, np.concatenate([anteriores, linhas]))
+    del anteriores
+    os.replace(temporario, arquivo)
+
+
+def salvar_matrizes_moveis(resultados, caminho=CAMINHO_CORRELACAO_MOVEL):
+    """
+    Grava vários resultados ({nome: resultado}) no diretório `caminho`
+
+    Só as correlações são persistidas, numa pilha .npy por resultado que
+    carregar_matrizes_moveis abre por memória mapeada; datas, colunas e o estado
+    para estender as matrizes ficam num .npz pequeno ao lado.
+    """
+    os.makedirs(caminho, exist_ok=True)
+    for nome, resultado in resultados.items():
+        metadados, pilha = _arquivos_movel(caminho, nome)
+        np.save(pilha, np.ascontiguousarray(resultado['correlacao']))
+        _salvar_metadados(metadados, resultado, resultado['datas'])
+    return caminho
+
+
+def anexar_matrizes_moveis(resultados, extensoes, caminho=CAMINHO_CORRELACAO_MOVEL):
+    """
+    Acrescenta ao diretório as matrizes das datas novas ({nome: resultado de matrizes_novas})
+
+    As correlações novas são escritas ao final de cada pilha (sem reler o histórico) e
+    os metadados recebem as datas novas e o estado atualizado.
+    """
+    for nome, extensao in extensoes.items():
+        if extensao is None:
+            continue
+        metadados, pilha = _arquivos_movel(caminho, nome)
+        _anexar_npy(pilha, extensao['correlacao'], len(resultados[nome]['datas']))
+        _salvar_metadados(metadados, extensao, resultados[nome]['datas'].append(extensao['datas']))
+    return caminho
+
+
+def carregar_matrizes_moveis(caminho=CAMINHO_CORRELACAO_MOVEL):
+    """
+    Lê os resultados gravados por salvar_matrizes_moveis ({nome: resultado}), ou None
+
+    As correlações vêm como memória mapeada (somente leitura): fatiar uma data ou um
+    par lê do disco apenas as linhas usadas.
+    """
+    if not os.path.isdir(caminho):
+        return None
+    resultados = {}
+    for nome in sorted(arquivo[:-len('.npz')] for arquivo in os.listdir(caminho) if arquivo.endswith('.npz')):
+        metadados, pilha = _arquivos_movel(caminho, nome)
+        if not os.path.exists(pilha):
+            continue
+        resultado = {'estado': {}}
+        with np.load(metadados) as arquivo:
+            for chave in arquivo.files:
+                if chave.startswith('estado.'):
+                    resultado['estado'][chave.split('.', 1)[1]] = arquivo[chave]
+                else:
+                    resultado[chave] = arquivo[chave]
+        resultado['tipo'] = str(resultado['tipo'])
+        resultado['parametro'] = float(resultado['parametro'])
+        resultado['min_periodos'] = int(resultado['min_periodos'])
+        resultado['datas'] = pd.DatetimeIndex(pd.to_datetime(resultado['datas']))
+        resultado['colunas'] = [str(c) for c in resultado['colunas']]
+        # Linhas além das datas registradas (gravação interrompida) são ignoradas
+        resultado['correlacao'] = np.load(pilha, mmap_mode='r')[:len(resultado['datas'])]
+        resultados[nome] = resultado
+    return resultados or None
+
+
+def matriz_na_data(resultado, data, medida='correlacao'):
+    """Matriz (DataFrame) da última data até `data`, inclusive"""
+    posicao = resultado['datas'].searchsorted(pd.Timestamp(data), side='right') - 1
+    if posicao < 0:
+        raise KeyError(f"Sem matrizes até {data}")
+    return pd.DataFrame(resultado[medida][posicao], index=resultado['colunas'], columns=resultado['colunas'])
+
+
+def serie_par(resultado, coluna_a, coluna_b, medida='correlacao'):
+    """Evolução no tempo de um par (ou de várias colunas contra `coluna_b`, se `coluna_a` for lista)"""
+    posicoes = {c: i for i, c in enumerate(resultado['colunas'])}
+    j = posicoes[coluna_b]
+    if isinstance(coluna_a, (list, tuple)):
+        i = [posicoes[c] for c in coluna_a]
+        return pd.DataFrame(resultado[medida][:, i, j], index=resultado['datas'], columns=list(coluna_a))
+    return pd.Series(resultado[medida][:, posicoes[coluna_a], j], index=resultado['datas'],
+                     name=f'{coluna_a} x {coluna_b}')
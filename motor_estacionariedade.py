@@ -0,0 +1,140 @@
+"""
+Motor de Estacionariedade
+Testes ADF, KPSS e Phillips-Perron por série e ADF em janelas móveis
+"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.stattools import adfuller, kpss
+from statsmodels.tsa.adfvalues import mackinnonp, mackinnoncrit
+from statsmodels.tools.sm_exceptions import InterpolationWarning
+
+from motor_regressao import mqo_lote, regressao_movel
+
+TESTES_ESTACIONARIEDADE = ('ADF', 'KPSS', 'PP')
+
+NIVEIS_CRITICOS = ('1%', '5%', '10%')
+
+# Colunas de cada linha (série x teste); valores críticos em colunas numéricas
+COLUNAS_TESTES = ['Teste', 'Estatística', 'Valor-p', 'Defasagens', 'N'] + \
+                 [f'Valor Crítico {nivel}' for nivel in NIVEIS_CRITICOS] + ['H0', 'Estacionária', 'Conclusão']
+
+HIPOTESES_NULAS = {'ADF': 'raiz unitária', 'KPSS': 'estacionária', 'PP': 'raiz unitária'}
+
+
+def phillips_perron(serie, defasagens=None):
+    """
+    Teste de Phillips-Perron (Z_τ, com constante)
+
+    Regride y_t em (1, y_{t−1}) e corrige a estatística t de ρ − 1 pela variância
+    de longo prazo dos resíduos (Newey-West, pesos de Bartlett), em vez de
+    acrescentar defasagens como no ADF. `defasagens` padrão: ⌈12·(n/100)^(1/4)⌉.
+    A distribuição assintótica é a mesma do ADF (valores de MacKinnon).
+
+    Retorna (estatística, valor-p, defasagens, n, {nível: valor crítico}).
+    """
+    y = np.asarray(serie, dtype=float)
+    defasagens = int(np.ceil(12 * (len(y) / 100) ** (1 / 4))) if defasagens is None else defasagens
+
+    X = np.column_stack([y[:-1], np.ones(len(y) - 1)])
+    saida = mqo_lote(X, y[1:])
+    residuos = saida['resid'][:, 0]
+    n, k = X.shape
+
+    # Variância de longo prazo dos resíduos: γ₀ + 2Σ w_j γ_j
+    gama = np.array([residuos[j:] @ residuos[:n - j] for j in range(defasagens + 1)]) / n
+    pesos = 1 - np.arange(1, defasagens + 1) / (defasagens + 1)
+    lambda2 = gama[0] + 2 * (pesos * gama[1:]).sum()
+
+    s2 = residuos @ residuos / (n - k)
+    gama0 = s2 * (n - k) / n
+    sigma = saida['bse'][0, 0]
+    rho = saida['params'][0, 0]
+    estatistica = (np.sqrt(gama0 / lambda2) * (rho - 1) / sigma
+                   - 0.5 * (lambda2 - gama0) / np.sqrt(lambda2) * n * sigma / np.sqrt(s2))
+
+    criticos = dict(zip(NIVEIS_CRITICOS, mackinnoncrit(N=1, regression='c', nobs=n)))
+    return estatistica, mackinnonp(estatistica, regression='c', N=1), defasagens, n, criticos
+
+
+def _adf(y, **opcoes):
+    """adfuller sem o aviso de mudança do tipo de retorno nas versões novas do statsmodels"""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', FutureWarning)
+        return adfuller(y, **opcoes)
+
+
+def _linha(teste, estatistica, valor_p, defasagens, n, criticos, alfa):
+    # ADF e PP rejeitam a raiz unitária; o KPSS rejeita a estacionariedade
+    rejeita = valor_p < alfa
+    estacionaria = (not rejeita) if teste == 'KPSS' else rejeita
+    if teste == 'KPSS':
+        conclusao = 'Rejeita H0 (série não-estacionária)' if rejeita else 'Não rejeita H0 (série estacionária)'
+    else:
+        conclusao = 'Rejeita H0 (série estacionária)' if rejeita else 'Não rejeita H0 (série não-estacionária)'
+    return [teste, float(estatistica), float(valor_p), int(defasagens), int(n)] + \
+           [float(criticos[nivel]) for nivel in NIVEIS_CRITICOS] + \
+           [HIPOTESES_NULAS[teste], 'Sim' if estacionaria else 'Não', conclusao]
+
+
+def testar_serie(serie, testes=TESTES_ESTACIONARIEDADE, alfa=0.05):
+    """
+    Aplica os testes de estacionariedade a uma série (valores ausentes descartados)
+
+    ADF com defasagens escolhidas por AIC, KPSS (constante, defasagens automáticas;
+    valor-p interpolado na tabela, limitado a [0,01; 0,1]) e Phillips-Perron.
+    Retorna uma lista de linhas no formato de COLUNAS_TESTES.
+    """
+    y = pd.Series(serie).dropna().to_numpy(dtype=float)
+    linhas = []
+    for teste in testes:
+        if teste == 'ADF':
+            estatistica, valor_p, defasagens, n, criticos, _ = _adf(y, autolag='AIC')
+        elif teste == 'KPSS':
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', InterpolationWarning)
+                warnings.simplefilter('ignore', FutureWarning)
+                estatistica, valor_p, defasagens, criticos = kpss(y, regression='c', nlags='auto')
+            n = len(y)
+        elif teste == 'PP':
+            estatistica, valor_p, defasagens, n, criticos = phillips_perron(y)
+        else:
+            raise ValueError(f"Teste desconhecido: {teste} (use {', '.join(TESTES_ESTACIONARIEDADE)})")
+        linhas.append(_linha(teste, estatistica, valor_p, defasagens, n, criticos, alfa))
+    return linhas
+
+
+def adf_movel(serie, janela=252, defasagens=None):
+    """
+    Estatística ADF (com constante) em janelas móveis de `janela` observações
+
+    Com defasagens fixas, a regressão do ADF (Δy_t em 1, y_{t−1}, Δy_{t−1}..Δy_{t−p})
+    é a mesma em todas as janelas: as estatísticas t saem de regressao_movel, por
+    diferenças de somas acumuladas, sem reajustar cada janela. `defasagens` padrão:
+    as escolhidas por AIC na série completa. Valores críticos de MacKinnon para o
+    tamanho da janela.
+
+    Retorna um DataFrame (datas x ['Estatística ADF', 'Valor-p', 'Valor Crítico 5%']).
+    """
+    serie = pd.Series(serie, dtype=float)
+    if defasagens is None:
+        defasagens = _adf(serie.dropna().to_numpy(), autolag='AIC')[2]
+
+    diferenca = serie.diff()
+    desenho = pd.DataFrame({'dy': diferenca, 'y_1': serie.shift(1)})
+    for i in range(1, defasagens + 1):
+        desenho[f'dy_{i}'] = diferenca.shift(i)
+    regressores = [c for c in desenho.columns if c != 'dy']
+
+    # Cada janela de `janela` observações gera janela − p − 1 linhas de regressão
+    linhas_janela = janela - defasagens - 1
+    rotulo = f'{linhas_janela}d'
+    resultado = regressao_movel(desenho, 'dy', regressores, janelas=(linhas_janela,),
+                                min_periodos=linhas_janela)[rotulo]
+    estatistica = resultado['estatistica_t']['y_1']
+
+    valor_p = estatistica.map(lambda s: mackinnonp(s, regression='c', N=1), na_action='ignore')
+    critico = mackinnoncrit(N=1, regression='c', nobs=linhas_janela)[1]
+    return pd.DataFrame({'Estatística ADF': estatistica, 'Valor-p': valor_p, 'Valor Crítico 5%': critico})
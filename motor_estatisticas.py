@@ -0,0 +1,206 @@
+"""
+Motor de Estatísticas
+Estatísticas descritivas vetorizadas sobre a matriz (observações x colunas) inteira
+"""
+
+import numpy as np
+import pandas as pd
+
+# Colunas da tabela de estatísticas descritivas (mesmo formato de estatisticas_descritivas.csv)
+COLUNAS_DESCRITIVAS = ['Média', 'Mediana', 'Desvio Padrão', 'Mínimo', 'Máximo',
+                       'Q1 (25%)', 'Q3 (75%)', 'IQR', 'Assimetria', 'Curtose']
+
+PROBABILIDADES_DESCRITIVAS = (0.25, 0.5, 0.75)
+
+
+def momentos_vazios(k):
+    """Estado neutro dos momentos de `k` colunas"""
+    return {
+        'n': np.zeros(k),
+        'media': np.zeros(k),
+        'm2': np.zeros(k),
+        'm3': np.zeros(k),
+        'm4': np.zeros(k),
+        'minimo': np.full(k, np.inf),
+        'maximo': np.full(k, -np.inf)
+    }
+
+
+def _dividir(a, b):
+    return np.divide(a, b, out=np.zeros(np.broadcast(a, b).shape), where=b > 0)
+
+
+def momentos_bloco(x):
+    """
+    Contagem, média, somas centrais de ordem 2 a 4, mínimo e máximo de cada coluna de `x`
+
+    Valores ausentes (NaN) são ignorados coluna a coluna.
+    """
+    if not np.isnan(x).any():
+        media = x.mean(axis=0)
+        centrado = x - media
+        quadrado = centrado * centrado
+        return {
+            'n': np.full(x.shape[1], float(len(x))),
+            'media': media,
+            'm2': quadrado.sum(axis=0),
+            'm3': (quadrado * centrado).sum(axis=0),
+            'm4': (quadrado * quadrado).sum(axis=0),
+            'minimo': x.min(axis=0),
+            'maximo': x.max(axis=0)
+        }
+
+    valido = ~np.isnan(x)
+    n = valido.sum(axis=0).astype(float)
+    zerado = np.where(valido, x, 0.0)
+    media = _dividir(zerado.sum(axis=0), n)
+
+    centrado = np.where(valido, x - media, 0.0)
+    quadrado = centrado * centrado
+    return {
+        'n': n,
+        'media': media,
+        'm2': quadrado.sum(axis=0),
+        'm3': (quadrado * centrado).sum(axis=0),
+        'm4': (quadrado * quadrado).sum(axis=0),
+        'minimo': np.where(valido, x, np.inf).min(axis=0),
+        'maximo': np.where(valido, x, -np.inf).max(axis=0)
+    }
+
+
+def combinar_momentos(a, b):
+    """
+    Combina os momentos de duas partições disjuntas (fórmulas de Chan/Pébay)
+
+    O resultado é idêntico, a menos de arredondamento, ao de calcular os momentos
+    sobre a união das linhas.
+    """
+    n_a, n_b = a['n'], b['n']
+    n = n_a + n_b
+    delta = b['media'] - a['media']
+    delta2 = delta * delta
+    produto = n_a * n_b
+
+    media = a['media'] + delta * _dividir(n_b, n)
+    m2 = a['m2'] + b['m2'] + delta2 * _dividir(produto, n)
+    m3 = (a['m3'] + b['m3']
+          + delta * delta2 * _dividir(produto * (n_a - n_b), n ** 2)
+          + 3 * delta * _dividir(n_a * b['m2'] - n_b * a['m2'], n))
+    m4 = (a['m4'] + b['m4']
+          + delta2 * delta2 * _dividir(produto * (n_a ** 2 - produto + n_b ** 2), n ** 3)
+          + 6 * delta2 * _dividir(n_a ** 2 * b['m2'] + n_b ** 2 * a['m2'], n ** 2)
+          + 4 * delta * _dividir(n_a * b['m3'] - n_b * a['m3'], n))
+
+    return {
+        'n': n,
+        'media': media,
+        'm2': m2,
+        'm3': m3,
+        'm4': m4,
+        'minimo': np.minimum(a['minimo'], b['minimo']),
+        'maximo': np.maximum(a['maximo'], b['maximo'])
+    }
+
+
+def calcular_momentos(valores, max_elementos=2 ** 17):
+    """
+    Momentos de todas as colunas em uma única passada pelos dados
+
+    As linhas são lidas em blocos de até `max_elementos` valores, pequenos o bastante
+    para caber em cache; cada bloco é resumido e combinado ao acumulado, sem uma
+    segunda varredura da matriz para centrar os dados.
+    """
+    valores = np.asarray(valores, dtype=float)
+    acumulado = momentos_vazios(valores.shape[1])
+    linhas_por_bloco = max(1, max_elementos // max(valores.shape[1], 1))
+    for inicio in range(0, len(valores), linhas_por_bloco):
+        acumulado = combinar_momentos(acumulado, momentos_bloco(valores[inicio:inicio + linhas_por_bloco]))
+    return acumulado
+
+
+def estatisticas_momentos(momentos):
+    """
+    Desvio padrão, assimetria e curtose a partir dos momentos acumulados
+
+    Seguem as convenções do pandas: desvio padrão amostral (ddof=1), assimetria
+    ajustada de Fisher-Pearson e excesso de curtose com correção de viés.
+    """
+    n, m2, m3, m4 = momentos['n'], momentos['m2'], momentos['m3'], momentos['m4']
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        desvio = np.where(n > 1, np.sqrt(m2 / (n - 1)), np.nan)
+
+        assimetria = (n * np.sqrt(n - 1) / (n - 2)) * m3 / m2 ** 1.5
+        assimetria = np.where(m2 == 0, 0.0, assimetria)
+        assimetria = np.where(n < 3, np.nan, assimetria)
+
+        curtose = (n * (n + 1) * (n - 1) * m4 / ((n - 2) * (n - 3) * m2 ** 2)
+                   - 3 * (n - 1) ** 2 / ((n - 2) * (n - 3)))
+        curtose = np.where(m2 == 0, 0.0, curtose)
+        curtose = np.where(n < 4, np.nan, curtose)
+
+    media = np.where(n > 0, momentos['media'], np.nan)
+    minimo = np.where(n > 0, momentos['minimo'], np.nan)
+    maximo = np.where(n > 0, momentos['maximo'], np.nan)
+    return {'media': media, 'desvio': desvio, 'assimetria': assimetria, 'curtose': curtose,
+            'minimo': minimo, 'maximo': maximo}
+
+
+def calcular_quantis(valores, probabilidades=PROBABILIDADES_DESCRITIVAS, max_elementos=2 ** 24):
+    """
+    Quantis (interpolação linear, como o pandas) de todas as colunas
+
+    Todos os quantis saem de uma única ordenação por bloco de colunas: cada bloco é
+    copiado com as colunas contíguas em memória e ordenado uma vez (NaN ao final);
+    as estatísticas de ordem são então escolhidas conforme a contagem válida de cada
+    coluna. Blocos de colunas limitam a cópia temporária a `max_elementos` valores.
+    Retorna um array (len(probabilidades), colunas).
+    """
+    valores = np.asarray(valores, dtype=float)
+    n_linhas, k = valores.shape
+    probabilidades = np.asarray(probabilidades, dtype=float)
+    resultado = np.full((len(probabilidades), k), np.nan)
+    if n_linhas == 0:
+        return resultado
+
+    colunas_por_bloco = max(1, max_elementos // n_linhas)
+    for inicio in range(0, k, colunas_por_bloco):
+        ordenado = np.array(valores[:, inicio:inicio + colunas_por_bloco].T, order='C')
+        ordenado.sort(axis=1)
+        contagem = (~np.isnan(ordenado)).sum(axis=1)
+
+        posicoes = np.maximum(contagem - 1, 0)[:, None] * probabilidades[None, :]
+        inferior = np.floor(posicoes).astype(int)
+        superior = np.ceil(posicoes).astype(int)
+        baixo = np.take_along_axis(ordenado, inferior, axis=1)
+        alto = np.take_along_axis(ordenado, superior, axis=1)
+        quantis = baixo + (alto - baixo) * (posicoes - inferior)
+
+        resultado[:, inicio:inicio + ordenado.shape[0]] = np.where(contagem[:, None] > 0, quantis, np.nan).T
+
+    return resultado
+
+
+def tabela_descritiva(df):
+    """
+    Tabela de estatísticas descritivas (uma linha por coluna de `df`, colunas COLUNAS_DESCRITIVAS)
+
+    Momentos em uma passada e quantis em uma ordenação sobre a matriz inteira,
+    em vez de uma dúzia de varreduras e ordenações por coluna.
+    """
+    valores = df.to_numpy(dtype=float)
+    estatisticas = estatisticas_momentos(calcular_momentos(valores))
+    q1, mediana, q3 = calcular_quantis(valores, PROBABILIDADES_DESCRITIVAS)
+
+    return pd.DataFrame({
+        'Média': estatisticas['media'],
+        'Mediana': mediana,
+        'Desvio Padrão': estatisticas['desvio'],
+        'Mínimo': estatisticas['minimo'],
+        'Máximo': estatisticas['maximo'],
+        'Q1 (25%)': q1,
+        'Q3 (75%)': q3,
+        'IQR': q3 - q1,
+        'Assimetria': estatisticas['assimetria'],
+        'Curtose': estatisticas['curtose']
+    }, index=df.columns)
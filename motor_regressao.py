@@ -0,0 +1,669 @@
+"""
+Motor de Regressão
+Modelos lineares declarados como dados e ajustados em lote por mínimos quadrados
+"""
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+from scipy.linalg import solve_triangular
+from scipy.stats import norm, t as dist_t, f as dist_f, chi2
+
+TIPOS_COVARIANCIA = ('nonrobust', 'HC0', 'HC1', 'HC2', 'HC3', 'HAC')
+
+# Colunas da tabela uniforme de resultados (uma linha por modelo e termo)
+COLUNAS_RESULTADOS = ['Modelo', 'Nome', 'Alvo', 'Termo', 'Coeficiente', 'Erro Padrão', 'Estatística t',
+                      'Valor-p', 'N', 'R²', 'R² Ajustado', 'F-statistic', 'Prob(F)', 'Covariância',
+                      'Erro Padrão (robusto)', 'Estatística t (robusta)', 'Valor-p (robusto)',
+                      'F-statistic (robusta)', 'Prob(F) (robusta)', 'Covariância robusta']
+
+INTERCEPTO = 'Intercepto'
+
+# Colunas da tabela de diagnóstico dos resíduos (uma linha por modelo e teste)
+COLUNAS_DIAGNOSTICOS = ['Modelo', 'Nome', 'Teste', 'Defasagens', 'Termo', 'Estatística', 'GL', 'Valor-p']
+
+
+class ModeloRegressao:
+    """
+    Especificação de um modelo linear: alvo ~ regressores (com intercepto)
+
+    • chave: identificador do modelo (ex.: 'modelo1')
+    • nome / rotulo: descrição completa e curta, usadas em relatórios e tabelas
+    • cov_tipo: 'nonrobust', HC0–HC3 ou 'HAC' (Newey-West)
+    • cov_robusta: covariância adicional reportada ao lado da principal (ex.: 'HAC'), sem
+      alterar os erros padrão publicados
+    • defasagens: defasagens do HAC; None escolhe a largura de banda automaticamente
+    • filtro: expressão booleana (DataFrame.eval) que restringe a amostra (ex.: "vix > 20")
+    """
+
+    def __init__(self, chave, nome, alvo, regressores, rotulo=None, cov_tipo='nonrobust', filtro=None,
+                 defasagens=None, cov_robusta=None):
+        for tipo in (cov_tipo, cov_robusta or cov_tipo):
+            if tipo not in TIPOS_COVARIANCIA:
+                raise ValueError(f"Covariância desconhecida: {tipo} (use {', '.join(TIPOS_COVARIANCIA)})")
+        self.chave = chave
+        self.nome = nome
+        self.alvo = alvo
+        self.regressores = tuple(regressores)
+        self.rotulo = rotulo or nome
+        self.cov_tipo = cov_tipo
+        self.cov_robusta = cov_robusta
+        self.filtro = filtro
+        self.defasagens = defasagens
+
+    @property
+    def formula(self):
+        return f"{self.alvo} ~ {' + '.join(self.regressores)}"
+
+    @property
+    def termos(self):
+        return (INTERCEPTO,) + self.regressores
+
+    def __repr__(self):
+        filtro = f" [{self.filtro}]" if self.filtro else ''
+        robusta = f" + {self.cov_robusta}" if self.cov_robusta else ''
+        return f"ModeloRegressao({self.chave}: {self.formula}{filtro}, {self.cov_tipo}{robusta})"
+
+
+# Registro dos modelos do relatório: um novo modelo é uma nova linha. Os erros padrão
+# publicados são os clássicos; os HAC (Newey-West) são reportados em colunas à parte
+MODELOS_REGRESSAO = [
+    ModeloRegressao('modelo1', 'Retorno S&P 500', 'retorno_sp500', ('retorno_bigtech', 'taxa_juros_10y'),
+                    rotulo='S&P 500', cov_robusta='HAC'),
+    ModeloRegressao('modelo2', 'Volatilidade (VIX)', 'vix', ('retorno_bigtech', 'taxa_juros_10y'),
+                    rotulo='VIX', cov_robusta='HAC'),
+]
+
+
+def _linhas_modelo(df, modelo):
+    """Máscara das linhas usadas pelo modelo: filtro e valores completos no alvo e regressores"""
+    linhas = df[list(modelo.termos[1:]) + [modelo.alvo]].notna().all(axis=1).to_numpy()
+    if modelo.filtro:
+        linhas = linhas & df.eval(modelo.filtro).to_numpy(dtype=bool)
+    return linhas
+
+
+def _agrupar_modelos(df, modelos):
+    """Agrupa os modelos que compartilham a matriz de planejamento (mesmos regressores e linhas)"""
+    grupos = {}
+    for modelo in modelos:
+        linhas = _linhas_modelo(df, modelo)
+        chave = (modelo.regressores, hashlib.sha1(np.packbits(linhas).tobytes()).hexdigest())
+        grupos.setdefault(chave, (linhas, []))[1].append(modelo)
+    return list(grupos.values())
+
+
+def fatorar(X):
+    """Fatoração QR de X reaproveitável entre ajustes: (Q, R, (X'X)⁻¹, alavancagem de cada linha)"""
+    Q, R = np.linalg.qr(X)
+    r_inv = solve_triangular(R, np.eye(R.shape[0]))
+    return Q, R, r_inv @ r_inv.T, (Q * Q).sum(axis=1)
+
+
+def defasagens_padrao(n):
+    """Regra de Newey-West para o número de defasagens do HAC: ⌊4·(n/100)^(2/9)⌋"""
+    return int(np.floor(4 * (n / 100) ** (2 / 9)))
+
+
+def _colunas_constantes(X):
+    return (np.ptp(X, axis=0) == 0) & (X[0] != 0)
+
+
+def defasagens_automaticas(X, residuos):
+    """
+    Largura de banda de Newey-West (1994) para o núcleo de Bartlett, por alvo
+
+    Resume os escores X·e de cada alvo em h_t = e_t·Σ x_ti (sem a constante), estima
+    as autocovariâncias de h até a defasagem piloto defasagens_padrao(n) e usa
+    m = ⌊1,1447·((s¹/s⁰)²·n)^(1/3)⌋, com s⁰ = σ₀ + 2Σσ_j e s¹ = 2Σ j·σ_j.
+    Retorna um array de inteiros (alvos).
+    """
+    n = len(X)
+    livres = ~_colunas_constantes(X)
+    h = residuos * X[:, livres].sum(axis=1)[:, None] if livres.any() else residuos
+    piloto = defasagens_padrao(n)
+    # Autocovariâncias σ_0..σ_piloto de todos os alvos (defasagens x alvos)
+    sigma = np.stack([(h[j:] * h[:n - j]).sum(axis=0) for j in range(piloto + 1)]) / n
+    j = np.arange(1, piloto + 1)[:, None]
+    s0 = sigma[0] + 2 * sigma[1:].sum(axis=0)
+    s1 = 2 * (j * sigma[1:]).sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gama = 1.1447 * ((s1 / s0) ** 2) ** (1 / 3)
+    return np.clip(np.nan_to_num(np.floor(gama * n ** (1 / 3))), 0, n - 1).astype(int)
+
+
+def _carne_hac(X, residuos, defasagens):
+    """
+    X' Ω X de Newey-West para todos os alvos: Γ₀ + Σ_l w_l·(Γ_l + Γ_l'), pesos de Bartlett
+
+    Em vez de um produto p x p por defasagem, os escores defasados são acumulados
+    com seus pesos (v_t = Σ_l w_l·u_{t−l}, somas vetorizadas sobre tempo e alvos) e
+    Σ_l w_l·Γ_l = Σ_t u_t v_t' sai de um único einsum; cada alvo tem sua própria largura.
+    """
+    u = X[:, :, None] * residuos[:, None, :]
+    defasagens = np.broadcast_to(np.asarray(defasagens, dtype=int), (residuos.shape[1],))
+    defasadas = np.zeros_like(u)
+    for l in range(1, int(defasagens.max(initial=0)) + 1):
+        defasadas[l:] += np.clip(1 - l / (defasagens + 1), 0, None) * u[:-l]
+    cruzado = np.einsum('tim,tkm->mik', u, defasadas)
+    return np.einsum('tim,tkm->mik', u, u) + cruzado + cruzado.transpose(0, 2, 1)
+
+
+def _covariancias(X, residuos, xtx_inv, alavancagem, cov_tipo, defasagens=None, correcao=False):
+    """Covariância dos coeficientes de cada alvo (alvos x p x p)"""
+    n, p = X.shape
+    if cov_tipo == 'nonrobust':
+        sigma2 = (residuos ** 2).sum(axis=0) / (n - p)
+        return sigma2[:, None, None] * xtx_inv
+
+    if cov_tipo == 'HAC':
+        carne = _carne_hac(X, residuos, defasagens)
+        if correcao:
+            carne *= n / (n - p)
+        return xtx_inv @ carne @ xtx_inv
+
+    pesos = residuos ** 2
+    if cov_tipo == 'HC1':
+        pesos = pesos * n / (n - p)
+    elif cov_tipo == 'HC2':
+        pesos = pesos / (1 - alavancagem)[:, None]
+    elif cov_tipo == 'HC3':
+        pesos = pesos / ((1 - alavancagem) ** 2)[:, None]
+    # "Carne" do sanduíche de todos os alvos de uma vez: X' diag(e²) X
+    carne = np.einsum('tm,ti,tk->mik', pesos, X, X)
+    return xtx_inv @ carne @ xtx_inv
+
+
+def mqo_lote(X, Y, cov_tipo='nonrobust', defasagens=None, correcao=False, fatoracao=None):
+    """
+    Núcleo de mínimos quadrados ordinários para vários alvos com a mesma X
+
+    X (n x p) e Y (n x alvos) são arrays NumPy, sem valores ausentes; `fatoracao`
+    (de fatorar(X)) evita refatorar X entre chamadas. As saídas seguem as do
+    statsmodels OLS(...).fit(cov_type=...): t de Student na covariância clássica e
+    normal nas robustas; R² centrado e F das inclinações quando X tem coluna constante.
+    HAC (Newey-West) usa pesos de Bartlett com `defasagens` fixas ou, com None,
+    escolhidas por alvo (defasagens_automaticas); `correcao` aplica o fator n/(n − p).
+
+    Retorna um dicionário de arrays: params, bse, tvalues, pvalues (alvos x p),
+    cov_params (alvos x p x p), resid (n x alvos), rsquared, rsquared_adj, fvalue,
+    f_pvalue e defasagens (alvos; só no HAC), além de nobs, df_model, df_resid e use_t.
+    """
+    X = np.asarray(X, dtype=float)
+    Y = np.asarray(Y, dtype=float)
+    if Y.ndim == 1:
+        Y = Y[:, None]
+    if cov_tipo not in TIPOS_COVARIANCIA:
+        raise ValueError(f"Covariância desconhecida: {cov_tipo} (use {', '.join(TIPOS_COVARIANCIA)})")
+    n, p = X.shape
+
+    Q, R, xtx_inv, alavancagem = fatoracao if fatoracao is not None else fatorar(X)
+    params = solve_triangular(R, Q.T @ Y)
+    resid = Y - X @ params
+    if cov_tipo == 'HAC':
+        defasagens = (defasagens_automaticas(X, resid) if defasagens is None
+                      else np.full(Y.shape[1], int(defasagens)))
+    cov = _covariancias(X, resid, xtx_inv, alavancagem, cov_tipo, defasagens, correcao)
+
+    constantes = _colunas_constantes(X)
+    k_constante = int(constantes.any())
+    df_resid = n - p
+    df_model = p - k_constante
+
+    soma_residuos = (resid ** 2).sum(axis=0)
+    soma_total = ((Y - Y.mean(axis=0)) ** 2).sum(axis=0) if k_constante else (Y ** 2).sum(axis=0)
+    rsquared = 1 - soma_residuos / soma_total
+    rsquared_adj = 1 - (1 - rsquared) * (n - k_constante) / df_resid
+
+    params = params.T
+    bse = np.sqrt(np.diagonal(cov, axis1=1, axis2=2))
+    tvalues = params / bse
+    use_t = cov_tipo == 'nonrobust'
+    pvalues = 2 * (dist_t.sf(np.abs(tvalues), df_resid) if use_t else norm.sf(np.abs(tvalues)))
+
+    # Teste F (Wald) de que os coeficientes, exceto a constante, são nulos
+    livres = ~constantes if k_constante else np.ones(p, dtype=bool)
+    inclinacoes = params[:, livres]
+    fvalue = np.einsum('mi,mi->m', inclinacoes,
+                       np.linalg.solve(cov[:, livres][:, :, livres], inclinacoes[:, :, None])[:, :, 0]) / df_model
+    f_pvalue = dist_f.sf(fvalue, df_model, df_resid)
+
+    return {
+        'params': params, 'bse': bse, 'tvalues': tvalues, 'pvalues': pvalues, 'cov_params': cov,
+        'resid': resid, 'rsquared': rsquared, 'rsquared_adj': rsquared_adj,
+        'fvalue': fvalue, 'f_pvalue': f_pvalue, 'defasagens': defasagens if cov_tipo == 'HAC' else None,
+        'nobs': float(n), 'df_model': float(df_model), 'df_resid': float(df_resid), 'use_t': use_t
+    }
+
+
+class ResultadoMQO:
+    """
+    Resultado de mqo com os nomes de atributos do statsmodels (params, bse, tvalues,
+    pvalues, rsquared, rsquared_adj, fvalue, f_pvalue, resid, cov_params())
+
+    Com X em DataFrame, params/bse/tvalues/pvalues são Series indexadas pelas colunas.
+    """
+
+    def __init__(self, saida, nomes=None, indice=None, cov_tipo='nonrobust'):
+        serie = (lambda v: pd.Series(v, index=nomes)) if nomes is not None else (lambda v: v)
+        self.params = serie(saida['params'][0])
+        self.bse = serie(saida['bse'][0])
+        self.tvalues = serie(saida['tvalues'][0])
+        self.pvalues = serie(saida['pvalues'][0])
+        self.resid = pd.Series(saida['resid'][:, 0], index=indice) if indice is not None else saida['resid'][:, 0]
+        self.rsquared = float(saida['rsquared'][0])
+        self.rsquared_adj = float(saida['rsquared_adj'][0])
+        self.fvalue = float(saida['fvalue'][0])
+        self.f_pvalue = float(saida['f_pvalue'][0])
+        self.nobs = saida['nobs']
+        self.df_model = saida['df_model']
+        self.df_resid = saida['df_resid']
+        self.use_t = saida['use_t']
+        self.cov_type = cov_tipo
+        self.defasagens = None if saida['defasagens'] is None else int(saida['defasagens'][0])
+        self._cov = saida['cov_params'][0]
+        self._nomes = nomes
+
+    def cov_params(self):
+        if self._nomes is None:
+            return self._cov
+        return pd.DataFrame(self._cov, index=self._nomes, columns=self._nomes)
+
+    def __repr__(self):
+        return f"ResultadoMQO(nobs={self.nobs:.0f}, R²={self.rsquared:.4f}, cov={self.cov_type})"
+
+
+def mqo(X, y, cov_tipo='nonrobust', defasagens=None, correcao=False):
+    """
+    Ajuste MQO de um alvo, equivalente a sm.OLS(y, X).fit(cov_type=...) sem a sobrecarga do patsy
+
+    X deve incluir a coluna constante, se desejada. Retorna um ResultadoMQO.
+    """
+    nomes = list(X.columns) if isinstance(X, pd.DataFrame) else None
+    indice = y.index if isinstance(y, pd.Series) else None
+    saida = mqo_lote(np.asarray(X, dtype=float), np.asarray(y, dtype=float), cov_tipo, defasagens, correcao)
+    return ResultadoMQO(saida, nomes, indice, cov_tipo)
+
+
+def ajustar_modelos(df, modelos=None):
+    """
+    Ajusta todos os modelos registrados por mínimos quadrados ordinários
+
+    Modelos com os mesmos regressores e a mesma amostra compartilham a matriz de
+    planejamento: uma fatoração QR resolve todos os alvos do grupo de uma vez, e
+    (X'X)⁻¹ e a alavancagem são reaproveitados nas covariâncias. Com várias
+    covariâncias no mesmo grupo, só a "carne" do sanduíche é recalculada.
+
+    Retorna {chave: resultado} com coeficientes, erros padrão, estatísticas t,
+    valores-p (Series indexadas pelos termos), R², R² ajustado, F e Prob(F). Com
+    `cov_robusta`, resultado['robusta'] traz os mesmos campos de inferência sob essa
+    covariância (senão None).
+    """
+    modelos = MODELOS_REGRESSAO if modelos is None else modelos
+    resultados = {}
+    robustas = {}
+
+    for linhas, grupo in _agrupar_modelos(df, modelos):
+        termos = list(grupo[0].termos)
+        dados = df.loc[linhas]
+        X = np.column_stack([np.ones(len(dados)), dados[list(grupo[0].regressores)].to_numpy(dtype=float)])
+        fatoracao = fatorar(X)
+
+        # Uma chamada ao núcleo por tipo de covariância, com todos os alvos que o usam
+        por_covariancia = {}
+        for modelo in grupo:
+            por_covariancia.setdefault((modelo.cov_tipo, modelo.defasagens), []).append((modelo, False))
+            if modelo.cov_robusta:
+                por_covariancia.setdefault((modelo.cov_robusta, modelo.defasagens), []).append((modelo, True))
+
+        for (cov_tipo, defasagens), modelos_cov in por_covariancia.items():
+            alvos = list(dict.fromkeys(m.alvo for m, _ in modelos_cov))
+            saida = mqo_lote(X, dados[alvos].to_numpy(dtype=float), cov_tipo, defasagens, fatoracao=fatoracao)
+
+            for modelo, robusta in modelos_cov:
+                j = alvos.index(modelo.alvo)
+                descricao = cov_tipo if cov_tipo != 'HAC' else f"HAC ({saida['defasagens'][j]} defasagens)"
+                if robusta:
+                    robustas[modelo.chave] = {
+                        'covariancia': descricao,
+                        'erro_padrao': pd.Series(saida['bse'][j], index=termos),
+                        'estatistica_t': pd.Series(saida['tvalues'][j], index=termos),
+                        'pvalores': pd.Series(saida['pvalues'][j], index=termos),
+                        'f_statistic': saida['fvalue'][j],
+                        'f_pvalue': saida['f_pvalue'][j]
+                    }
+                    continue
+                resultados[modelo.chave] = {
+                    'modelo': modelo,
+                    'nome': modelo.nome,
+                    'formula': modelo.formula,
+                    'n': len(X),
+                    'covariancia': descricao,
+                    'coeficientes': pd.Series(saida['params'][j], index=termos),
+                    'erro_padrao': pd.Series(saida['bse'][j], index=termos),
+                    'estatistica_t': pd.Series(saida['tvalues'][j], index=termos),
+                    'pvalores': pd.Series(saida['pvalues'][j], index=termos),
+                    'residuos': pd.Series(saida['resid'][:, j], index=dados.index),
+                    'r2': saida['rsquared'][j],
+                    'r2_adj': saida['rsquared_adj'][j],
+                    'f_statistic': saida['fvalue'][j],
+                    'f_pvalue': saida['f_pvalue'][j]
+                }
+
+    # Mesma ordem do registro
+    for chave, resultado in resultados.items():
+        resultado['robusta'] = robustas.get(chave)
+    return {modelo.chave: resultados[modelo.chave] for modelo in modelos}
+
+
+def tabela_resultados(resultados):
+    """Tabela uniforme (uma linha por modelo e termo, colunas COLUNAS_RESULTADOS)"""
+    linhas = []
+    for chave, resultado in resultados.items():
+        modelo = resultado['modelo']
+        robusta = resultado.get('robusta')
+        for termo in resultado['coeficientes'].index:
+            inferencia_robusta = ([robusta['erro_padrao'][termo], robusta['estatistica_t'][termo],
+                                   robusta['pvalores'][termo], robusta['f_statistic'], robusta['f_pvalue'],
+                                   robusta['covariancia']] if robusta else [np.nan] * 5 + [''])
+            linhas.append([chave, modelo.nome, modelo.alvo, termo,
+                           resultado['coeficientes'][termo], resultado['erro_padrao'][termo],
+                           resultado['estatistica_t'][termo], resultado['pvalores'][termo],
+                           resultado['n'], resultado['r2'], resultado['r2_adj'],
+                           resultado['f_statistic'], resultado['f_pvalue'], resultado['covariancia']]
+                          + inferencia_robusta)
+    return pd.DataFrame(linhas, columns=COLUNAS_RESULTADOS)
+
+
+def indice_beta(i):
+    """Rótulo do i-ésimo coeficiente (β₀, β₁, ...)"""
+    return 'β' + ''.join('₀₁₂₃₄₅₆₇₈₉'[int(d)] for d in str(i))
+
+
+def tabela_resumo(resultados):
+    """
+    Coeficientes e qualidade do ajuste lado a lado, no formato de regressao_multipla.csv
+
+    F e Prob(F) sob a covariância robusta (quando declarada) vêm em linhas próprias
+    ao final, rotuladas com o tipo (ex.: 'F-statistic (HAC)').
+    """
+    colunas = {}
+    extras = []
+    for i, resultado in enumerate(resultados.values(), start=1):
+        modelo = resultado['modelo']
+        valores = {f'{indice_beta(k)} ({termo})': coef
+                   for k, (termo, coef) in enumerate(resultado['coeficientes'].items())}
+        valores.update({'R²': resultado['r2'], 'R² Ajustado': resultado['r2_adj'],
+                        'F-statistic': resultado['f_statistic'], 'Prob(F)': resultado['f_pvalue']})
+        if resultado.get('robusta'):
+            rotulos = [f'F-statistic ({modelo.cov_robusta})', f'Prob(F) ({modelo.cov_robusta})']
+            valores.update(zip(rotulos, [resultado['robusta']['f_statistic'], resultado['robusta']['f_pvalue']]))
+            extras += [r for r in rotulos if r not in extras]
+        colunas[f'Modelo {i} ({modelo.rotulo})'] = valores
+
+    tabela = pd.DataFrame(colunas)
+    metricas = ['R²', 'R² Ajustado', 'F-statistic', 'Prob(F)']
+    return tabela.loc[[r for r in tabela.index if r not in metricas + extras] + metricas + extras]
+
+
+def _autocovariancias(residuos, defasagens):
+    """Somas Σ e_t·e_{t−k} dos resíduos centrados, k = 0..defasagens (defasagens+1 x modelos)"""
+    centrados = residuos - residuos.mean(axis=0)
+    n = len(centrados)
+    return np.stack([(centrados[k:] * centrados[:n - k]).sum(axis=0) for k in range(defasagens + 1)])
+
+
+def _teste_lm(X, Y, fatoracao=None):
+    """Regressão auxiliar de Y em X (com constante) para todos os modelos: LM = n·R², GL = p − 1"""
+    saida = mqo_lote(X, Y, fatoracao=fatoracao)
+    lm = saida['nobs'] * saida['rsquared']
+    return lm, saida['df_model'], chi2.sf(lm, saida['df_model'])
+
+
+def diagnosticos_residuos(df, resultados, defasagens_ljung_box=(5, 10, 20), defasagens_arch=5):
+    """
+    Bateria de diagnósticos dos resíduos de todos os modelos ajustados (ajustar_modelos)
+
+    • Jarque-Bera: normalidade (assimetria e curtose)
+    • Ljung-Box em cada defasagem de `defasagens_ljung_box` e Durbin-Watson: autocorrelação
+    • Breusch-Pagan (versão de Koenker, n·R² de e² em X) e White (e² em X, quadrados e
+      produtos cruzados): heterocedasticidade
+    • ARCH-LM com `defasagens_arch` defasagens de e²: heterocedasticidade condicional
+    • VIF de cada regressor: multicolinearidade
+
+    Nada é reajustado: os resíduos vêm de `resultados`. Por grupo de modelos com a mesma
+    matriz de planejamento, X e sua fatoração (e (X'X)⁻¹) são obtidos uma vez e servem
+    ao Breusch-Pagan de todos os alvos e ao VIF; as autocovariâncias dos resíduos são
+    calculadas uma vez, até a maior defasagem, e servem ao Ljung-Box e ao Durbin-Watson.
+    Retorna um DataFrame com as colunas COLUNAS_DIAGNOSTICOS.
+    """
+    modelos = [resultado['modelo'] for resultado in resultados.values()]
+    defasagens_ljung_box = tuple(defasagens_ljung_box)
+    linhas = []
+
+    for linhas_grupo, grupo in _agrupar_modelos(df, modelos):
+        dados = df.loc[linhas_grupo]
+        regressores = list(grupo[0].regressores)
+        X = np.column_stack([np.ones(len(dados)), dados[regressores].to_numpy(dtype=float)])
+        fatoracao = fatorar(X)
+        n, p = X.shape
+
+        E = np.column_stack([resultados[modelo.chave]['residuos'].to_numpy(dtype=float) for modelo in grupo])
+        E2 = E ** 2
+        testes = {modelo.chave: [] for modelo in grupo}
+
+        def registrar(teste, valores, defasagens=np.nan, termo='', gl=np.nan, pvalores=None):
+            for j, modelo in enumerate(grupo):
+                pvalor = np.nan if pvalores is None else np.broadcast_to(pvalores, (len(grupo),))[j]
+                gl_j = np.broadcast_to(gl, (len(grupo),))[j]
+                testes[modelo.chave].append([teste, defasagens, termo, valores[j], gl_j, pvalor])
+
+        # Jarque-Bera (momentos sem correção de viés)
+        centrados = E - E.mean(axis=0)
+        variancia = (centrados ** 2).mean(axis=0)
+        assimetria = (centrados ** 3).mean(axis=0) / variancia ** 1.5
+        curtose = (centrados ** 4).mean(axis=0) / variancia ** 2
+        jb = n / 6 * (assimetria ** 2 + (curtose - 3) ** 2 / 4)
+        registrar('Jarque-Bera', jb, gl=2, pvalores=chi2.sf(jb, 2))
+        registrar('Assimetria', assimetria)
+        registrar('Curtose', curtose)
+
+        # Ljung-Box e Durbin-Watson a partir das mesmas autocovariâncias
+        maxima = max(defasagens_ljung_box + (1,))
+        gama = _autocovariancias(E, maxima)
+        r = gama[1:] / gama[0]
+        k = np.arange(1, maxima + 1)[:, None]
+        acumulado = n * (n + 2) * np.cumsum(r ** 2 / (n - k), axis=0)
+        for h in defasagens_ljung_box:
+            registrar('Ljung-Box', acumulado[h - 1], defasagens=h, gl=h, pvalores=chi2.sf(acumulado[h - 1], h))
+        # Σ(e_t − e_{t−1})² = 2Σe² − e₁² − e_n² − 2Σe_t·e_{t−1} (resíduos de média zero)
+        dw = (2 * gama[0] - centrados[0] ** 2 - centrados[-1] ** 2 - 2 * gama[1]) / gama[0]
+        registrar('Durbin-Watson', dw)
+
+        # Breusch-Pagan: e² na própria X, reaproveitando a fatoração do grupo
+        lm, gl, pvalores = _teste_lm(X, E2, fatoracao)
+        registrar('Breusch-Pagan', lm, gl=gl, pvalores=pvalores)
+
+        # White: X, quadrados e produtos cruzados (as colunas com a constante repetem X)
+        i0, i1 = np.triu_indices(p)
+        lm, gl, pvalores = _teste_lm(X[:, i0] * X[:, i1], E2)
+        registrar('White', lm, gl=gl, pvalores=pvalores)
+
+        # ARCH-LM: e²_t em e²_{t−1}..e²_{t−L}; a matriz muda com o modelo
+        L = defasagens_arch
+        for j, modelo in enumerate(grupo):
+            defasados = np.column_stack([np.ones(n - L)] + [E2[L - i:n - i, j] for i in range(1, L + 1)])
+            lm, gl, pvalor = _teste_lm(defasados, E2[L:, j])
+            testes[modelo.chave].append(['ARCH-LM', L, '', lm[0], gl, pvalor[0]])
+
+        # VIF_j = [(X'X)⁻¹]_jj · Σ(x_j − x̄_j)², igual a 1/(1 − R²_j) da regressão de x_j nos demais
+        xtx_inv = fatoracao[2]
+        soma_quadrados = ((X[:, 1:] - X[:, 1:].mean(axis=0)) ** 2).sum(axis=0)
+        vif = np.diag(xtx_inv)[1:] * soma_quadrados
+        for termo, valor in zip(regressores, vif):
+            registrar('VIF', np.full(len(grupo), valor), termo=termo)
+
+        for modelo in grupo:
+            linhas.extend([modelo.chave, modelo.nome] + teste for teste in testes[modelo.chave])
+
+    tabela = pd.DataFrame(linhas, columns=COLUNAS_DIAGNOSTICOS)
+    ordem = {modelo.chave: i for i, modelo in enumerate(modelos)}
+    return tabela.sort_values('Modelo', key=lambda chaves: chaves.map(ordem), kind='stable').reset_index(drop=True)
+
+
+def regressao_movel(df, alvo, regressores, janelas=(60,), expansiva=False, min_periodos=None):
+    """
+    Coeficientes, erros padrão e R² de alvo ~ regressores em janelas móveis (e/ou expansiva)
+
+    Somas acumuladas de X'X, X'y e y'y são calculadas uma única vez; as somas de
+    cada janela são diferenças entre duas posições dessas acumuladas (custo O(1)
+    por data, para qualquer número de janelas), e todos os sistemas p x p são
+    resolvidos num único np.linalg.solve empilhado. Os dados são centrados antes de
+    acumular, o que preserva a precisão das diferenças. Linhas com valores ausentes
+    ficam fora da janela, que é estimada com as observações restantes desde que
+    sejam pelo menos `min_periodos` (padrão: metade da janela, e nunca menos que
+    termos + 1). `alvo` pode ser uma lista: os alvos compartilham X'X.
+
+    Retorna {rótulo: resultado}, com rótulos '<janela>d' e 'expansiva'. Cada resultado
+    traz DataFrames (datas x termos; com vários alvos, colunas (alvo, termo))
+    'coeficientes', 'erro_padrao' e 'estatistica_t', além de 'r2' e 'n'.
+    """
+    alvos = [alvo] if isinstance(alvo, str) else list(alvo)
+    regressores = list(regressores)
+    termos = [INTERCEPTO] + regressores
+
+    valores_x = df[regressores].to_numpy(dtype=float)
+    valores_y = df[alvos].to_numpy(dtype=float)
+    validas = ~(np.isnan(valores_x).any(axis=1) | np.isnan(valores_y).any(axis=1))
+
+    centro_x = valores_x[validas].mean(axis=0) if validas.any() else np.zeros(len(regressores))
+    centro_y = valores_y[validas].mean(axis=0) if validas.any() else np.zeros(len(alvos))
+    X = np.where(validas[:, None], np.column_stack([np.ones(len(df)), valores_x - centro_x]), 0.0)
+    Y = np.where(validas[:, None], valores_y - centro_y, 0.0)
+
+    # Acumuladas com uma linha de zeros no início: soma de (a, b] = C[b] − C[a]
+    def acumular(termos_linha):
+        return np.concatenate([np.zeros((1,) + termos_linha.shape[1:]), np.cumsum(termos_linha, axis=0)])
+
+    xtx = acumular(np.einsum('ti,tj->tij', X, X))
+    xty = acumular(np.einsum('ti,tm->tim', X, Y))
+    yty = acumular(Y * Y)
+
+    fim = np.arange(1, len(df) + 1)
+    especificacoes = [(f'{j}d', j, np.maximum(fim - j, 0)) for j in janelas]
+    if expansiva:
+        especificacoes.append(('expansiva', None, np.zeros_like(fim)))
+
+    n_termos = len(termos)
+    resultados = {}
+    for rotulo, janela, inicio in especificacoes:
+        a = xtx[fim] - xtx[inicio]
+        b = xty[fim] - xty[inicio]
+        c = yty[fim] - yty[inicio]
+        n = a[:, 0, 0].copy()
+        minimo = janela // 2 if min_periodos is None and janela else (min_periodos or n_termos + 1)
+        suficiente = (n >= max(minimo, n_termos + 1))
+
+        # Janelas sem observações suficientes recebem a identidade para não interromper o solve
+        a[~suficiente] = np.eye(n_termos)
+        a_inv = np.linalg.inv(a)
+        beta = a_inv @ b                                      # (datas, p, alvos)
+        soma_residuos = c - np.einsum('tpm,tpm->tm', beta, b)
+        # Intercepto de volta à escala original (os dados foram centrados):
+        # β₀ = β₀ᶜ + ȳ − β·x̄ e Var(β₀) = v₀₀ − 2·x̄'v₀ₖ + x̄'Vₖₖx̄
+        beta[:, 0, :] += centro_y - np.einsum('tkm,k->tm', beta[:, 1:, :], centro_x)
+        diagonal = np.diagonal(a_inv, axis1=1, axis2=2).copy()
+        diagonal[:, 0] += (np.einsum('k,tkl,l->t', centro_x, a_inv[:, 1:, 1:], centro_x)
+                           - 2 * a_inv[:, 0, 1:] @ centro_x)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            soma_total = c - b[:, 0, :] ** 2 / n[:, None]
+            sigma2 = soma_residuos / (n - n_termos)[:, None]
+            erro_padrao = np.sqrt(diagonal[:, :, None] * sigma2[:, None, :])
+            r2 = 1 - soma_residuos / soma_total
+
+        beta[~suficiente] = np.nan
+        erro_padrao[~suficiente] = np.nan
+        r2[~suficiente] = np.nan
+
+        if len(alvos) == 1:
+            colunas = termos
+        else:
+            colunas = pd.MultiIndex.from_product([alvos, termos], names=['alvo', 'termo'])
+        achatar = lambda matriz: pd.DataFrame(matriz.transpose(0, 2, 1).reshape(len(df), -1),
+                                              index=df.index, columns=colunas)
+        resultados[rotulo] = {
+            'coeficientes': achatar(beta),
+            'erro_padrao': achatar(erro_padrao),
+            'estatistica_t': achatar(beta / erro_padrao),
+            'r2': pd.DataFrame(r2, index=df.index, columns=alvos) if len(alvos) > 1
+            else pd.Series(r2[:, 0], index=df.index, name='R²'),
+            'n': pd.Series(n, index=df.index, name='N')
+        }
+    return resultados
+
+
+def betas_transversais(df, ativos, fatores):
+    """
+    Regressão de cada ativo contra os mesmos fatores (com intercepto), todos numa única resolução
+
+    Os N ativos são N lados direitos da mesma matriz de planejamento. Sem valores
+    ausentes, uma fatoração QR resolve todos de uma vez; com ausências (ex.: ativos
+    listados depois do início), as equações normais de cada ativo são montadas com a
+    sua máscara de linhas válidas (X'MX empilhado) e resolvidas num solve em lote.
+    Linhas com fator ausente são descartadas.
+
+    Retorna DataFrames (ativos x termos) 'coeficientes', 'erro_padrao', 'estatistica_t'
+    e 'pvalores', e Series 'r2' e 'n'.
+    """
+    fatores = [fatores] if isinstance(fatores, str) else list(fatores)
+    ativos = list(ativos)
+    termos = [INTERCEPTO] + fatores
+
+    dados = df.loc[df[fatores].notna().all(axis=1)]
+    X = np.column_stack([np.ones(len(dados)), dados[fatores].to_numpy(dtype=float)])
+    Y = dados[ativos].to_numpy(dtype=float)
+    validos = ~np.isnan(Y)
+    p = X.shape[1]
+
+    if validos.all():
+        Q, R, xtx_inv, _ = fatorar(X)
+        coeficientes = solve_triangular(R, Q.T @ Y).T
+        residuos = Y - X @ coeficientes.T
+        diagonal = np.broadcast_to(np.diag(xtx_inv), (len(ativos), p))
+        n = np.full(len(ativos), float(len(dados)))
+        media = Y.mean(axis=0)
+    else:
+        m = validos.astype(float)
+        Y0 = np.where(validos, Y, 0.0)
+        xtx = np.einsum('tn,ti,tk->nik', m, X, X)
+        n = m.sum(axis=0)
+        # Ativos sem observações suficientes recebem a identidade para não interromper o solve
+        insuficiente = n < p + 1
+        xtx[insuficiente] = np.eye(p)
+        xtx_inv = np.linalg.inv(xtx)
+        coeficientes = np.einsum('nik,kn->ni', xtx_inv, X.T @ Y0)
+        residuos = np.where(validos, Y0 - X @ coeficientes.T, 0.0)
+        diagonal = np.diagonal(xtx_inv, axis1=1, axis2=2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            media = Y0.sum(axis=0) / n
+        coeficientes[insuficiente] = np.nan
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        soma_residuos = (residuos ** 2).sum(axis=0)
+        soma_total = (np.where(validos, Y - media, 0.0) ** 2).sum(axis=0)
+        erro_padrao = np.sqrt(diagonal * (soma_residuos / (n - p))[:, None])
+        estatistica_t = coeficientes / erro_padrao
+        r2 = 1 - soma_residuos / soma_total
+    pvalores = 2 * dist_t.sf(np.abs(estatistica_t), (n - p)[:, None])
+
+    tabela = lambda matriz: pd.DataFrame(matriz, index=ativos, columns=termos)
+    return {
+        'coeficientes': tabela(coeficientes),
+        'erro_padrao': tabela(erro_padrao),
+        'estatistica_t': tabela(estatistica_t),
+        'pvalores': tabela(pvalores),
+        'r2': pd.Series(r2, index=ativos, name='R²'),
+        'n': pd.Series(n, index=ativos, name='N')
+    }
@@ -0,0 +1,417 @@
+"""
+Motor de Volatilidade
+Modelos GARCH(1,1), GJR-GARCH e EGARCH por máxima verossimilhança, com trajetórias
+de volatilidade condicional e previsões de vários passos
+"""
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize
+from scipy.signal import lfilter
+from scipy.special import log_ndtr
+
+MODELOS_VOLATILIDADE = ('GARCH', 'GJR', 'EGARCH')
+
+CAMINHO_VOLATILIDADE = 'volatilidade_garch.npz'
+
+# Retornos multiplicados por 100 (em %) antes do ajuste, como no pacote arch: os
+# parâmetros ficam em escalas parecidas e o otimizador converge melhor
+ESCALA = 100.0
+
+# Parâmetros de cada modelo, na ordem do vetor θ (a média μ vem primeiro em todos)
+PARAMETROS = {
+    'GARCH': ('μ', 'ω', 'α', 'β'),
+    'GJR': ('μ', 'ω', 'α', 'γ', 'β'),
+    'EGARCH': ('μ', 'ω', 'α', 'γ', 'β'),
+}
+
+_LOG_2PI = math.log(2 * math.pi)
+_MEDIA_ABS_NORMAL = math.sqrt(2 / math.pi)
+
+
+def _backcast(residuos, tau=75):
+    """Variância inicial: média dos primeiros e² com pesos 0,94^i (mesma convenção do arch)"""
+    pesos = 0.94 ** np.arange(min(tau, len(residuos)))
+    return float(pesos @ residuos[:len(pesos)] ** 2 / pesos.sum())
+
+
+def variancia_condicional(modelo, parametros, residuos, backcast=None, anterior=None):
+    """
+    Trajetória σ²_t de um modelo dado θ sem a média (ω, α, [γ], β)
+
+    • GARCH/GJR: σ²_t = ω + (α + γ·1[e_{t−1} < 0])·e²_{t−1} + β·σ²_{t−1}. A recursão é um
+      filtro linear de primeira ordem sobre os choques, resolvido por lfilter (em C)
+      sem laço Python sobre as datas.
+    • EGARCH: log σ²_t = ω + α·(|z_{t−1}| − √(2/π)) + γ·z_{t−1} + β·log σ²_{t−1}, com
+      z = e/σ; não linear em σ, exige a recursão explícita.
+    Antes da amostra, e² e σ² valem `backcast`; com `anterior` = (e, σ²) da última
+    data já filtrada, a trajetória continua a partir dela (extensão com datas novas).
+    """
+    if modelo in ('GARCH', 'GJR'):
+        if modelo == 'GARCH':
+            omega, alfa, beta = parametros
+            gama = 0.0
+        else:
+            omega, alfa, gama, beta = parametros
+        quadrados = residuos ** 2
+        choques = np.empty_like(residuos)
+        if anterior is None:
+            choques[0] = (alfa + gama / 2) * backcast
+            variancia_inicial = backcast
+        else:
+            residuo_inicial, variancia_inicial = anterior
+            choques[0] = (alfa + gama * (residuo_inicial < 0)) * residuo_inicial ** 2
+        choques[1:] = (alfa + gama * (residuos[:-1] < 0)) * quadrados[:-1]
+        return lfilter([1.0], [1.0, -beta], omega + choques, zi=[beta * variancia_inicial])[0]
+
+    if modelo == 'EGARCH':
+        omega, alfa, gama, beta = parametros
+        log_variancias = [0.0] * len(residuos)
+        if anterior is None:
+            anterior = omega + beta * math.log(backcast)
+        else:
+            residuo_inicial, variancia_inicial = anterior
+            z = residuo_inicial / math.sqrt(variancia_inicial)
+            anterior = (omega + alfa * (abs(z) - _MEDIA_ABS_NORMAL) + gama * z
+                        + beta * math.log(variancia_inicial))
+        log_variancias[0] = anterior
+        for t, e in enumerate(residuos[:-1].tolist(), start=1):
+            z = e * math.exp(-0.5 * anterior)
+            anterior = omega + alfa * (abs(z) - _MEDIA_ABS_NORMAL) + gama * z + beta * anterior
+            # Limite para não estourar a exponencial em parâmetros extremos do otimizador
+            anterior = min(max(anterior, -50.0), 50.0)
+            log_variancias[t] = anterior
+        return np.exp(log_variancias)
+
+    raise ValueError(f"Modelo desconhecido: {modelo} (use {', '.join(MODELOS_VOLATILIDADE)})")
+
+
+def log_verossimilhanca(modelo, theta, retornos, backcast):
+    """Log-verossimilhança normal: −½·Σ(log 2π + log σ²_t + e²_t/σ²_t), com e = r − μ"""
+    residuos = retornos - theta[0]
+    variancias = variancia_condicional(modelo, theta[1:], residuos, backcast)
+    if not np.all(np.isfinite(variancias)) or np.any(variancias <= 0):
+        return -np.inf
+    return -0.5 * (len(retornos) * _LOG_2PI + np.log(variancias).sum() + (residuos ** 2 / variancias).sum())
+
+
+def _persistencia(modelo, parametros):
+    if modelo == 'GARCH':
+        return parametros['α'] + parametros['β']
+    if modelo == 'GJR':
+        return parametros['α'] + parametros['γ'] / 2 + parametros['β']
+    return parametros['β']
+
+
+def _restricoes(modelo, variancia):
+    """Limites, restrições e valores iniciais (grade pequena) de θ"""
+    if modelo == 'EGARCH':
+        log_variancia = math.log(variancia)
+        limites = [(None, None), (-10 - abs(log_variancia), 10 + abs(log_variancia)), (0.0, 2.0), (-1.0, 1.0),
+                   (0.0, 0.9999)]
+        iniciais = [[0.0, log_variancia * (1 - b), a, g, b]
+                    for a in (0.1, 0.2) for g in (0.0, -0.1) for b in (0.9, 0.98)]
+        return limites, [], iniciais
+
+    limites = [(None, None), (1e-6 * variancia, 10 * variancia), (0.0, 1.0)]
+    if modelo == 'GJR':
+        limites.append((-1.0, 2.0))
+        # α + γ ≥ 0 (σ² positiva após choques negativos) e α + γ/2 + β < 1
+        restricoes = [{'type': 'ineq', 'fun': lambda x: x[2] + x[3]},
+                      {'type': 'ineq', 'fun': lambda x: 0.9999 - x[2] - x[3] / 2 - x[4]}]
+        iniciais = [[0.0, variancia * (1 - a - g / 2 - b), a, g, b]
+                    for a in (0.03, 0.08) for g in (0.05, 0.15) for b in (0.8, 0.9)]
+    else:
+        restricoes = [{'type': 'ineq', 'fun': lambda x: 0.9999 - x[2] - x[3]}]
+        iniciais = [[0.0, variancia * (1 - a - b), a, b] for a in (0.05, 0.1) for b in (0.8, 0.9)]
+    limites.append((0.0, 0.9999))
+    return limites, restricoes, iniciais
+
+
+def _erros_padrao(funcao, theta):
+    """Erros padrão pela inversa da hessiana numérica (diferenças centrais) de −log L"""
+    k = len(theta)
+    passos = 1e-4 * np.maximum(np.abs(theta), 1e-2)
+    hessiana = np.empty((k, k))
+    for i in range(k):
+        for j in range(i, k):
+            valores = []
+            for si, sj in ((1, 1), (1, -1), (-1, 1), (-1, -1)):
+                ponto = theta.copy()
+                ponto[i] += si * passos[i]
+                ponto[j] += sj * passos[j]
+                valores.append(funcao(ponto))
+            hessiana[i, j] = hessiana[j, i] = (valores[0] - valores[1] - valores[2] + valores[3]) / \
+                                              (4 * passos[i] * passos[j])
+    try:
+        variancias = np.diag(np.linalg.inv(hessiana))
+    except np.linalg.LinAlgError:
+        return np.full(k, np.nan)
+    return np.sqrt(np.where(variancias > 0, variancias, np.nan))
+
+
+def _log_fgm_choque(a, b):
+    """log E[exp(a·(|z| − √(2/π)) + b·z)] para z ~ N(0, 1), em forma fechada"""
+    return float(np.logaddexp((a + b) ** 2 / 2 + log_ndtr(a + b), (a - b) ** 2 / 2 + log_ndtr(a - b))
+                 - a * _MEDIA_ABS_NORMAL)
+
+
+def _prever(modelo, parametros, residuo, variancia, horizonte):
+    """
+    σ² prevista para 1..horizonte dias à frente a partir do último choque e da última σ²
+
+    O GARCH/GJR itera E[σ²_{T+h}] = ω + persistência·E[σ²_{T+h−1}]. No EGARCH, log σ²_{T+h}
+    é a média iterada de log σ² mais os choques futuros g(z) = α(|z| − √(2/π)) + γz com
+    pesos β^j; como os z são normais independentes, E[σ²_{T+h}] é exp(média) vezes o
+    produto das funções geradoras de momentos de β^j·g(z), e não só exp(média).
+    """
+    previsao = np.empty(horizonte)
+    if modelo == 'EGARCH':
+        omega, alfa, gama, beta = parametros
+        z = residuo / math.sqrt(variancia)
+        log_proxima = omega + alfa * (abs(z) - _MEDIA_ABS_NORMAL) + gama * z + beta * math.log(variancia)
+        log_correcao, peso = 0.0, 1.0
+        for h in range(horizonte):
+            previsao[h] = math.exp(log_proxima + log_correcao)
+            log_proxima = omega + beta * log_proxima
+            log_correcao += _log_fgm_choque(alfa * peso, gama * peso)
+            peso *= beta
+    else:
+        omega, alfa, beta = parametros[0], parametros[1], parametros[-1]
+        gama = parametros[2] if modelo == 'GJR' else 0.0
+        persistencia = alfa + gama / 2 + beta
+        proxima = omega + (alfa + gama * (residuo < 0)) * residuo ** 2 + beta * variancia
+        for h in range(horizonte):
+            previsao[h] = proxima
+            proxima = omega + persistencia * proxima
+    return previsao
+
+
+def ajustar_modelo(retornos, modelo='GARCH', horizonte=22):
+    """
+    Ajusta um modelo de volatilidade a uma série de retornos (sem valores ausentes)
+
+    Os retornos são reescalados por ESCALA; μ e ω ficam nessa escala (retornos em %).
+    Retorna um dicionário com 'parametros' e 'erro_padrao' (Series), 'log_verossimilhanca',
+    'aic', 'bic', 'persistencia', 'convergiu', 'volatilidade' (σ_t diária, na escala
+    original), 'previsao' (σ prevista para 1..horizonte dias à frente, ver _prever) e
+    'estado' (último resíduo e última σ², na escala reescalada, para estender a trajetória).
+    """
+    r = np.asarray(retornos, dtype=float) * ESCALA
+    backcast = _backcast(r - r.mean())
+    limites, restricoes, iniciais = _restricoes(modelo, r.var())
+    for inicial in iniciais:
+        inicial[0] = r.mean()
+
+    objetivo = lambda theta: -log_verossimilhanca(modelo, theta, r, backcast)
+    # Começa do melhor ponto da grade; penalidade finita para pontos inválidos
+    avaliar = lambda theta: min(objetivo(theta), 1e12)
+    inicial = min(iniciais, key=avaliar)
+    otimo = minimize(avaliar, inicial, method='SLSQP', bounds=limites, constraints=restricoes,
+                     options={'maxiter': 500, 'ftol': 1e-10})
+
+    theta = otimo.x
+    nomes = PARAMETROS[modelo]
+    parametros = pd.Series(theta, index=nomes)
+    erro_padrao = pd.Series(_erros_padrao(avaliar, theta), index=nomes)
+    log_l = -otimo.fun
+    n, k = len(r), len(theta)
+
+    residuos = r - theta[0]
+    variancias = variancia_condicional(modelo, theta[1:], residuos, backcast)
+
+    # Previsão: o primeiro passo usa o último choque observado
+    previsao = _prever(modelo, theta[1:], residuos[-1], variancias[-1], horizonte)
+
+    return {
+        'modelo': modelo,
+        'parametros': parametros,
+        'erro_padrao': erro_padrao,
+        'log_verossimilhanca': log_l,
+        'aic': 2 * k - 2 * log_l,
+        'bic': k * math.log(n) - 2 * log_l,
+        'persistencia': _persistencia(modelo, parametros),
+        'n': n,
+        'convergiu': bool(otimo.success),
+        'volatilidade': np.sqrt(variancias) / ESCALA,
+        'previsao': np.sqrt(previsao) / ESCALA,
+        'estado': (float(residuos[-1]), float(variancias[-1]))
+    }
+
+
+def _ajustar_serie(valores, modelos, horizonte):
+    # Executado nos processos: todos os modelos de uma série
+    validos = ~np.isnan(valores)
+    return validos, [ajustar_modelo(valores[validos], modelo, horizonte) for modelo in modelos]
+
+
+def ajustar_volatilidades(df, colunas=None, modelos=MODELOS_VOLATILIDADE, horizonte=22, processos=None):
+    """
+    Ajusta cada modelo de `modelos` a cada coluna de retornos de `df`
+
+    Cada série (com seus valores ausentes descartados, ex.: antes de um IPO) é uma
+    tarefa; as séries são distribuídas num pool de `processos` processos (padrão:
+    uma por série, até o número de CPUs).
+
+    Retorna um dicionário com 'datas', 'colunas', 'modelos', 'horizonte',
+    'volatilidade' (modelos x datas x colunas, σ diária condicional; NaN fora da
+    amostra de cada série), 'previsao' (modelos x horizonte x colunas), 'estado'
+    (modelos x 2 x colunas: último resíduo e última σ² de cada série, usados por
+    estender_volatilidades) e 'tabela' (DataFrame com uma linha por série e modelo:
+    parâmetros, erros padrão e ajuste).
+    """
+    colunas = list(df.columns) if colunas is None else list(colunas)
+    modelos = tuple(modelos)
+    valores = [df[col].to_numpy(dtype=float) for col in colunas]
+
+    k = len(colunas)
+    processos = processos or min(os.cpu_count() or 1, k)
+    if processos > 1 and k > 1:
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            ajustes = list(executor.map(_ajustar_serie, valores, [modelos] * k, [horizonte] * k))
+    else:
+        ajustes = [_ajustar_serie(v, modelos, horizonte) for v in valores]
+
+    volatilidade = np.full((len(modelos), len(df), k), np.nan, dtype=np.float32)
+    previsao = np.empty((len(modelos), horizonte, k), dtype=np.float32)
+    estado = np.empty((len(modelos), 2, k))
+    linhas = []
+    for j, (col, (validos, resultados)) in enumerate(zip(colunas, ajustes)):
+        for i, resultado in enumerate(resultados):
+            volatilidade[i, validos, j] = resultado['volatilidade']
+            previsao[i, :, j] = resultado['previsao']
+            estado[i, :, j] = resultado['estado']
+
+            linha = {'Série': col, 'Modelo': resultado['modelo'], 'N': resultado['n']}
+            for nome, valor in resultado['parametros'].items():
+                linha[nome] = valor
+                linha[f'EP({nome})'] = resultado['erro_padrao'][nome]
+            linha.update({
+                'Log-verossimilhança': resultado['log_verossimilhanca'],
+                'AIC': resultado['aic'],
+                'BIC': resultado['bic'],
+                'Persistência': resultado['persistencia'],
+                'Volatilidade Atual (% a.a.)': resultado['volatilidade'][-1] * np.sqrt(252) * 100,
+                'Convergiu': resultado['convergiu']
+            })
+            linhas.append(linha)
+
+    tabela = pd.DataFrame(linhas)
+    ordem = ['Série', 'Modelo', 'N'] + [c for p in ('μ', 'ω', 'α', 'γ', 'β') for c in (p, f'EP({p})')]
+    tabela = tabela[[c for c in ordem if c in tabela.columns] + [c for c in tabela.columns if c not in ordem]]
+
+    return {
+        'datas': pd.DatetimeIndex(df.index),
+        'colunas': colunas,
+        'modelos': list(modelos),
+        'horizonte': horizonte,
+        'volatilidade': volatilidade,
+        'previsao': previsao,
+        'estado': estado,
+        'tabela': tabela
+    }
+
+
+def estender_volatilidades(resultado, df_novos):
+    """
+    Estende as trajetórias com as datas de `df_novos` posteriores às já filtradas
+
+    Os parâmetros estimados são mantidos: cada série continua a recursão a partir do
+    último resíduo e da última σ² guardados em 'estado' (custo proporcional às linhas
+    novas). As previsões partem da nova última data e a volatilidade atual da tabela é
+    atualizada; reestimar os parâmetros fica para o ajuste completo.
+    """
+    df_novos = df_novos.loc[df_novos.index > resultado['datas'][-1]].reindex(columns=resultado['colunas'])
+    modelos, colunas = resultado['modelos'], resultado['colunas']
+    volatilidade = np.full((len(modelos), len(df_novos), len(colunas)), np.nan, dtype=np.float32)
+    previsao = resultado['previsao'].copy()
+    estado = resultado['estado'].copy()
+    tabela = resultado['tabela'].copy()
+
+    for j, coluna in enumerate(colunas):
+        retornos = df_novos[coluna].to_numpy(dtype=float) * ESCALA
+        validos = ~np.isnan(retornos)
+        if not validos.any():
+            continue
+        for i, modelo in enumerate(modelos):
+            linha = (tabela['Série'] == coluna) & (tabela['Modelo'] == modelo)
+            theta = tabela.loc[linha, list(PARAMETROS[modelo])].to_numpy(dtype=float)[0]
+            residuos = retornos[validos] - theta[0]
+            variancias = variancia_condicional(modelo, theta[1:], residuos, anterior=tuple(estado[i, :, j]))
+
+            volatilidade[i, validos, j] = np.sqrt(variancias) / ESCALA
+            previsao[i, :, j] = np.sqrt(_prever(modelo, theta[1:], residuos[-1], variancias[-1],
+                                                resultado['horizonte'])) / ESCALA
+            estado[i, :, j] = residuos[-1], variancias[-1]
+            tabela.loc[linha, 'Volatilidade Atual (% a.a.)'] = np.sqrt(variancias[-1] * 252) / ESCALA * 100
+
+    return dict(resultado,
+                datas=resultado['datas'].append(pd.DatetimeIndex(df_novos.index)),
+                volatilidade=np.concatenate([resultado['volatilidade'], volatilidade], axis=1),
+                previsao=previsao, estado=estado, tabela=tabela)
+
+
+def salvar_volatilidades(resultado, caminho=CAMINHO_VOLATILIDADE):
+    """Grava trajetórias, previsões e a tabela de parâmetros num arquivo .npz compactado"""
+    tabela = resultado['tabela']
+    numericas = [c for c in tabela.columns if c not in ('Série', 'Modelo')]
+    np.savez_compressed(
+        caminho,
+        datas=resultado['datas'].as_unit('ns').asi8,
+        colunas=np.array([str(c) for c in resultado['colunas']]),
+        modelos=np.array(resultado['modelos']),
+        horizonte=np.array(resultado['horizonte']),
+        volatilidade=resultado['volatilidade'],
+        previsao=resultado['previsao'],
+        estado=resultado['estado'],
+        tabela_series=tabela['Série'].to_numpy(dtype=str),
+        tabela_modelos=tabela['Modelo'].to_numpy(dtype=str),
+        tabela_colunas=np.array(numericas),
+        tabela_valores=tabela[numericas].to_numpy(dtype=float)
+    )
+    return caminho
+
+
+def carregar_volatilidades(caminho=CAMINHO_VOLATILIDADE):
+    """Lê o resultado gravado por salvar_volatilidades, ou None"""
+    if not os.path.exists(caminho):
+        return None
+    with np.load(caminho) as arquivo:
+        tabela = pd.DataFrame(arquivo['tabela_valores'], columns=[str(c) for c in arquivo['tabela_colunas']])
+        tabela.insert(0, 'Modelo', [str(m) for m in arquivo['tabela_modelos']])
+        tabela.insert(0, 'Série', [str(s) for s in arquivo['tabela_series']])
+        for coluna in ('N', 'Convergiu'):
+            if coluna in tabela:
+                tabela[coluna] = tabela[coluna].astype(int if coluna == 'N' else bool)
+        return {
+            'datas': pd.DatetimeIndex(pd.to_datetime(arquivo['datas'])),
+            'colunas': [str(c) for c in arquivo['colunas']],
+            'modelos': [str(m) for m in arquivo['modelos']],
+            'horizonte': int(arquivo['horizonte']),
+            'volatilidade': arquivo['volatilidade'],
+            'previsao': arquivo['previsao'],
+            'estado': arquivo['estado'] if 'estado' in arquivo else None,
+            'tabela': tabela
+        }
+
+
+def trajetoria_volatilidade(resultado, modelo, colunas=None, anualizar=True):
+    """
+    Volatilidade condicional (datas x colunas) e previsão (datas futuras em dias úteis x colunas)
+
+    Com `anualizar`, em % ao ano (σ·√252·100).
+    """
+    i = resultado['modelos'].index(modelo)
+    colunas = resultado['colunas'] if colunas is None else list(colunas)
+    indices = [resultado['colunas'].index(c) for c in colunas]
+    fator = np.sqrt(252) * 100 if anualizar else 1.0
+
+    historico = pd.DataFrame(resultado['volatilidade'][i][:, indices] * fator,
+                             index=resultado['datas'], columns=colunas)
+    futuras = pd.bdate_range(resultado['datas'][-1] + pd.offsets.BDay(1), periods=resultado['horizonte'])
+    previsao = pd.DataFrame(resultado['previsao'][i][:, indices] * fator, index=futuras, columns=colunas)
+    return historico, previsao
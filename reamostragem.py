@@ -0,0 +1,175 @@
+"""
+Reamostragem (Bootstrap)
+Réplicas bootstrap vetorizadas (i.i.d., blocos móveis e estacionário) com intervalos percentil e BCa
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+METODOS_BOOTSTRAP = ('iid', 'bloco', 'estacionario')
+
+
+def tamanho_bloco_padrao(n):
+    """Regra usual n^(1/3) para o tamanho (médio) dos blocos"""
+    return max(1, int(round(n ** (1 / 3))))
+
+
+def indices_bootstrap(n, n_replicas=2000, metodo='estacionario', tamanho_bloco=None, semente=42):
+    """
+    Matriz de índices (réplicas x n) com todas as reamostragens de uma vez
+
+    • iid: observações sorteadas com reposição
+    • bloco: blocos móveis de tamanho fixo, com início sorteado em [0, n − tamanho]
+    • estacionario: blocos de tamanho geométrico (média `tamanho_bloco`) sobre a série
+      circular (Politis e Romano), preservando a dependência serial
+    As mesmas linhas são usadas em todas as colunas, mantendo a dependência entre elas.
+    """
+    rng = np.random.default_rng(semente)
+    if metodo == 'iid':
+        return rng.integers(0, n, (n_replicas, n))
+
+    tamanho = tamanho_bloco or tamanho_bloco_padrao(n)
+    if metodo == 'bloco':
+        tamanho = min(tamanho, n)
+        n_blocos = -(-n // tamanho)
+        inicios = rng.integers(0, n - tamanho + 1, (n_replicas, n_blocos))
+        indices = inicios[:, :, None] + np.arange(tamanho)
+        return indices.reshape(n_replicas, -1)[:, :n]
+
+    if metodo == 'estacionario':
+        posicoes = np.arange(n)
+        novo_bloco = rng.random((n_replicas, n)) < 1 / tamanho
+        novo_bloco[:, 0] = True
+        # Posição em que começou o bloco corrente de cada elemento
+        inicio_bloco = np.maximum.accumulate(np.where(novo_bloco, posicoes, 0), axis=1)
+        origem = np.take_along_axis(rng.integers(0, n, (n_replicas, n)), inicio_bloco, axis=1)
+        return (origem + posicoes - inicio_bloco) % n
+
+    raise ValueError(f"Método de bootstrap desconhecido: {metodo} (use {', '.join(METODOS_BOOTSTRAP)})")
+
+
+def replicas_media(valores, indices):
+    """
+    Média de cada coluna em cada réplica, sem materializar as amostras
+
+    As réplicas viram uma matriz de contagens (réplicas x n) e as médias saem de
+    um único produto matricial; valores ausentes são ignorados coluna a coluna.
+    """
+    n_replicas, n = indices.shape
+    planos = (np.arange(n_replicas)[:, None] * n + indices).ravel()
+    contagens = np.bincount(planos, minlength=n_replicas * n).reshape(n_replicas, n).astype(float)
+
+    validos = ~np.isnan(valores)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (contagens @ np.where(validos, valores, 0.0)) / (contagens @ validos)
+
+
+def replicas_estatistica(valores, indices, estatistica, max_elementos=2 ** 24):
+    """Réplicas de uma estatística genérica `estatistica(amostras, axis=1)`, em lotes de réplicas"""
+    n_replicas, n = indices.shape
+    por_lote = max(1, max_elementos // (n * valores.shape[1]))
+    return np.concatenate([estatistica(valores[indices[i:i + por_lote]], axis=1)
+                           for i in range(0, n_replicas, por_lote)])
+
+
+def jackknife(valores, estatistica=None):
+    """Estatística sem cada observação (n x colunas), usada na aceleração do BCa"""
+    if estatistica is None:
+        validos = ~np.isnan(valores)
+        soma = np.nansum(valores, axis=0)
+        contagem = validos.sum(axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (soma - np.where(validos, valores, 0.0)) / (contagem - validos)
+
+    # Linha i: todos os índices exceto i
+    n = len(valores)
+    posicoes = np.arange(n - 1)[None, :]
+    sem_cada = posicoes + (posicoes >= np.arange(n)[:, None])
+    return replicas_estatistica(valores, sem_cada, estatistica)
+
+
+def _intervalos(estimativa, replicas, valores_jackknife, niveis):
+    """Intervalos percentil e BCa de cada coluna para cada nível de confiança"""
+    resultado = {'Erro Padrão Bootstrap': np.std(replicas, axis=0, ddof=1)}
+
+    # Correção de viés: proporção de réplicas abaixo da estimativa (empates contam metade)
+    proporcao = ((replicas < estimativa).sum(axis=0) + 0.5 * (replicas == estimativa).sum(axis=0)) / len(replicas)
+    z0 = norm.ppf(np.clip(proporcao, 1e-10, 1 - 1e-10))
+
+    # Aceleração pelo jackknife
+    desvios = np.nanmean(valores_jackknife, axis=0) - valores_jackknife
+    with np.errstate(divide='ignore', invalid='ignore'):
+        aceleracao = np.nansum(desvios ** 3, axis=0) / (6 * np.nansum(desvios ** 2, axis=0) ** 1.5)
+    aceleracao = np.nan_to_num(aceleracao)
+
+    for nivel in niveis:
+        rotulo = f'IC {nivel * 100:g}%'
+        alfa = (1 - nivel) / 2
+        inferior, superior = np.nanquantile(replicas, [alfa, 1 - alfa], axis=0)
+        resultado[f'{rotulo} Percentil Inferior'] = inferior
+        resultado[f'{rotulo} Percentil Superior'] = superior
+
+        probabilidades = []
+        for z in norm.ppf([alfa, 1 - alfa]):
+            ajustado = z0 + (z0 + z) / (1 - aceleracao * (z0 + z))
+            probabilidades.append(norm.cdf(ajustado))
+        resultado[f'{rotulo} BCa Inferior'] = _quantil_por_coluna(replicas, probabilidades[0])
+        resultado[f'{rotulo} BCa Superior'] = _quantil_por_coluna(replicas, probabilidades[1])
+
+    return resultado
+
+
+def _quantil_por_coluna(replicas, probabilidades):
+    """Quantil (interpolação linear) de cada coluna com uma probabilidade própria por coluna"""
+    ordenadas = np.sort(replicas, axis=0)
+    contagem = (~np.isnan(ordenadas)).sum(axis=0)
+    posicoes = np.clip(probabilidades, 0, 1) * np.maximum(contagem - 1, 0)
+    inferior = np.floor(posicoes).astype(int)[None, :]
+    superior = np.ceil(posicoes).astype(int)[None, :]
+    baixo = np.take_along_axis(ordenadas, inferior, axis=0)[0]
+    alto = np.take_along_axis(ordenadas, superior, axis=0)[0]
+    return baixo + (alto - baixo) * (posicoes - inferior[0])
+
+
+def _bootstrap_colunas(valores, niveis, n_replicas, metodo, tamanho_bloco, semente, estatistica):
+    # Os índices são regenerados a partir da semente em cada processo: todas as
+    # partes usam exatamente as mesmas réplicas, sem trafegar a matriz de índices
+    indices = indices_bootstrap(len(valores), n_replicas, metodo, tamanho_bloco, semente)
+    if estatistica is None:
+        estimativa = np.nanmean(valores, axis=0)
+        replicas = replicas_media(valores, indices)
+    else:
+        estimativa = estatistica(valores, axis=0)
+        replicas = replicas_estatistica(valores, indices, estatistica)
+    return _intervalos(estimativa, replicas, jackknife(valores, estatistica), niveis)
+
+
+def intervalos_bootstrap(df, niveis=(0.95,), n_replicas=2000, metodo='estacionario', tamanho_bloco=None,
+                         semente=42, estatistica=None, processos=None, colunas_por_processo=64):
+    """
+    Erro padrão e intervalos percentil/BCa por bootstrap para todas as colunas de `df`
+
+    `estatistica` é a média por padrão (calculada por produto matricial); outras
+    funções no formato `f(amostras, axis)` (ex.: np.median) também são aceitas.
+    Com `processos` > 1 e mais de `colunas_por_processo` colunas, os blocos de
+    colunas são distribuídos num pool de processos; o resultado é o mesmo da
+    execução sequencial, pois todos usam os mesmos índices.
+    Retorna um DataFrame (colunas de `df` x estatísticas).
+    """
+    valores = df.to_numpy(dtype=float)
+    argumentos = (tuple(niveis), n_replicas, metodo, tamanho_bloco, semente, estatistica)
+
+    k = valores.shape[1]
+    if processos and processos > 1 and k > colunas_por_processo:
+        fatias = [slice(i, i + colunas_por_processo) for i in range(0, k, colunas_por_processo)]
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            partes = list(executor.map(_bootstrap_colunas, [valores[:, f] for f in fatias],
+                                       *[[a] * len(fatias) for a in argumentos]))
+        resultado = {chave: np.concatenate([p[chave] for p in partes]) for chave in partes[0]}
+    else:
+        resultado = _bootstrap_colunas(valores, *argumentos)
+
+    return pd.DataFrame(resultado, index=df.columns)
@@ -0,0 +1,104 @@
+"""Modo --update: coleta completa seguida de atualizações equivale à coleta completa do período"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('yfinance')
+
+import coletar_dados
+from armazenamento import carregar_dados
+from estatisticas_incrementais import CAMINHO_ESTADO_PADRAO, AcumuladorMomentos
+from fontes_dados import FonteReplay
+from motor_correlacao import carregar_matrizes_moveis
+from motor_volatilidade import carregar_volatilidades
+from universo import carregar_universo
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TABELAS = ('precos', 'retornos', 'pesos_bigtech', 'final')
+
+
+@pytest.fixture(scope='module')
+def universo():
+    return carregar_universo()
+
+
+@pytest.fixture(scope='module')
+def precos():
+    return pd.read_csv(os.path.join(RAIZ, 'dados_precos.csv'), index_col=0, parse_dates=True)
+
+
+def _coleta_completa(diretorio, precos, universo):
+    os.makedirs(diretorio, exist_ok=True)
+    os.chdir(diretorio)
+    precos.to_csv('fonte.csv')
+    coletar_dados.main(FonteReplay('fonte.csv', mapa_colunas=universo.mapa_colunas()), universo)
+
+
+@pytest.fixture(scope='module')
+def referencia(tmp_path_factory, precos, universo):
+    diretorio = str(tmp_path_factory.mktemp('completa'))
+    anterior = os.getcwd()
+    try:
+        _coleta_completa(diretorio, precos, universo)
+        return {
+            'tabelas': {nome: carregar_dados(nome) for nome in TABELAS},
+            'correlacao': {nome: np.array(r['correlacao']) for nome, r in carregar_matrizes_moveis().items()}
+        }
+    finally:
+        os.chdir(anterior)
+
+
+def test_atualizacao_equivale_coleta_completa(tmp_path, monkeypatch, precos, universo, referencia):
+    datas = precos.index
+    primeiro_corte, segundo_corte = datas[400], datas[600]
+    monkeypatch.chdir(tmp_path)
+    _coleta_completa(str(tmp_path), precos.loc[:primeiro_corte], universo)
+    precos.to_csv('fonte.csv')
+    fonte = FonteReplay('fonte.csv', mapa_colunas=universo.mapa_colunas())
+
+    # Falha simulada entre anexar as tabelas e gravar o estado: o estado antigo é restaurado
+    with open(CAMINHO_ESTADO_PADRAO, encoding='utf-8') as f:
+        estado_antigo = f.read()
+    coletar_dados.atualizar_pipeline(fonte, universo, data_fim=str(segundo_corte.date()))
+    with open(CAMINHO_ESTADO_PADRAO, 'w', encoding='utf-8') as f:
+        f.write(estado_antigo)
+
+    data_fim = str((datas[-1] + pd.Timedelta(days=1)).date())
+    coletar_dados.atualizar_pipeline(fonte, universo, data_fim=data_fim)
+
+    for nome in TABELAS:
+        pd.testing.assert_frame_equal(carregar_dados(nome), referencia['tabelas'][nome], check_freq=False)
+
+    retornos = referencia['tabelas']['retornos']
+    acumulador = AcumuladorMomentos.carregar(CAMINHO_ESTADO_PADRAO)
+    assert acumulador.ultima_data == datas[-1]
+    np.testing.assert_array_equal(acumulador.momentos['n'], retornos[acumulador.colunas].count())
+    np.testing.assert_allclose(acumulador.momentos['media'], retornos[acumulador.colunas].mean(), rtol=1e-9)
+
+    for nome, resultado in carregar_matrizes_moveis().items():
+        np.testing.assert_allclose(resultado['correlacao'], referencia['correlacao'][nome], rtol=1e-4, atol=1e-5)
+
+    volatilidade = carregar_volatilidades()
+    assert volatilidade['datas'].equals(retornos.index)
+    assert np.isfinite(volatilidade['volatilidade'][:, -1, :]).all()
+
+
+def test_coleta_completa_apos_atualizacao_mantem_o_periodo(tmp_path, monkeypatch, precos, universo, referencia):
+    datas = precos.index
+    universo_curto = universo.com_periodo(universo.data_inicio, str(datas[400].date()))
+    monkeypatch.chdir(tmp_path)
+    precos.to_csv('fonte.csv')
+    fonte = FonteReplay('fonte.csv', mapa_colunas=universo.mapa_colunas())
+    coletar_dados.main(fonte, universo_curto)
+
+    data_fim = str((datas[-1] + pd.Timedelta(days=1)).date())
+    coletar_dados.atualizar_pipeline(fonte, universo_curto, data_fim=data_fim)
+    # Nova coleta completa com o mesmo universo: vai até o último pregão gravado
+    coletar_dados.main(fonte, universo_curto)
+
+    for nome in TABELAS:
+        assert len(carregar_dados(nome)) == len(referencia['tabelas'][nome])
+    assert AcumuladorMomentos.carregar(CAMINHO_ESTADO_PADRAO).ultima_data == datas[-1]
@@ -0,0 +1,29 @@
+"""Chave das etapas: alterar o motor usado pela etapa invalida o cache"""
+
+import importlib
+import sys
+
+from cache_etapas import Etapa
+
+
+def _carregar(diretorio, codigo_motor):
+    (diretorio / 'motor_teste.py').write_text(codigo_motor)
+    (diretorio / 'etapas_teste.py').write_text(
+        'from motor_teste import calcular\n\n\ndef etapa(x):\n    return calcular(x)\n'
+    )
+    for nome in ('etapas_teste', 'motor_teste'):
+        sys.modules.pop(nome, None)
+    importlib.invalidate_caches()
+    return importlib.import_module('etapas_teste')
+
+
+def test_chave_muda_com_o_codigo_do_motor(tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(tmp_path))
+    etapas = _carregar(tmp_path, 'def calcular(x):\n    return x + 1\n')
+    chave = Etapa('etapa', etapas.etapa, parametros={'x': 1}).chave({})
+    assert Etapa('etapa', etapas.etapa, parametros={'x': 1}).chave({}) == chave
+
+    etapas = _carregar(tmp_path, 'def calcular(x):\n    return x + 2\n')
+    assert Etapa('etapa', etapas.etapa, parametros={'x': 1}).chave({}) != chave
+    for nome in ('etapas_teste', 'motor_teste'):
+        sys.modules.pop(nome, None)
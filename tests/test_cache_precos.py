@@ -0,0 +1,44 @@
+"""Cache de preços por ticker: coleta completa, --update e nova coleta completa"""
+
+import os
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('yfinance')
+
+import coletar_dados
+from fontes_dados import FonteReplay
+from universo import carregar_universo
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class FonteRemotaContada(FonteReplay):
+    """Replay tratado como fonte remota (alimenta o cache), contando os tickers pedidos"""
+
+    remota = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pedidos = []
+
+    def baixar(self, tickers, data_inicio, data_fim):
+        self.pedidos.append((tuple(tickers), data_inicio, data_fim))
+        return super().baixar(tickers, data_inicio, data_fim)
+
+
+def test_coleta_completa_apos_update_usa_so_o_cache(tmp_path, monkeypatch):
+    universo = carregar_universo()
+    monkeypatch.chdir(tmp_path)
+    fonte = FonteRemotaContada(os.path.join(RAIZ, 'dados_precos.csv'), mapa_colunas=universo.mapa_colunas())
+
+    coletar_dados.main(fonte, universo.com_periodo(universo.data_inicio, '2024-06-29'))
+    coletar_dados.atualizar_pipeline(fonte, universo, data_fim=universo.data_fim)
+    assert fonte.pedidos
+
+    fonte.pedidos.clear()
+    df_precos = coletar_dados.coletar_dados(fonte, universo)
+    assert fonte.pedidos == []
+    pd.testing.assert_index_equal(df_precos.index, pd.read_csv(fonte.caminho, index_col=0, parse_dates=True).index,
+                                  check_names=False, exact=False)
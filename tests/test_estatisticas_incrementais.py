@@ -0,0 +1,31 @@
+"""Acumulador de momentos e quantis: atualização em lotes, combinação e estado em disco"""
+
+import numpy as np
+import pandas as pd
+
+from estatisticas_incrementais import AcumuladorMomentos
+
+
+def _retornos():
+    gerador = np.random.default_rng(17)
+    df = pd.DataFrame(gerador.multivariate_normal([0, 0], [[1, 0.6], [0.6, 2]], size=500),
+                      index=pd.bdate_range('2023-01-02', periods=500), columns=['a', 'b'])
+    df.iloc[gerador.choice(500, 20, replace=False), 1] = np.nan
+    return df
+
+
+def test_acumulador_em_lotes_equivale_pandas(tmp_path):
+    df = _retornos()
+    caminho = str(tmp_path / 'estado.json')
+
+    AcumuladorMomentos(['a', 'b']).atualizar(df.iloc[:200]).salvar(caminho)
+    acumulador = AcumuladorMomentos.carregar(caminho).atualizar(df.iloc[200:350])
+    acumulador.combinar(AcumuladorMomentos(['a', 'b']).atualizar(df.iloc[350:]))
+
+    assert acumulador.ultima_data == df.index[-1]
+    resumo, referencia = acumulador.resumo(), df.describe()
+    for linha in ('count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max'):
+        np.testing.assert_allclose(resumo.loc[linha], referencia.loc[linha], rtol=1e-10)
+
+    completas = df.dropna()
+    np.testing.assert_allclose(acumulador.correlacao(), completas.corr(), rtol=1e-10)
@@ -0,0 +1,35 @@
+"""Retentativas da fonte Yahoo Finance: espera apenas entre tentativas que falharam"""
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('yfinance')
+
+import fontes_dados
+from fontes_dados import FonteYFinance
+
+
+class FonteFalha(FonteYFinance):
+    """Lote vazio; cada ticker falha `falhas` vezes antes de responder"""
+
+    def __init__(self, falhas, **kwargs):
+        super().__init__(**kwargs)
+        self.falhas = falhas
+        self.chamadas = {}
+
+    def _download(self, tickers, data_inicio, data_fim):
+        if len(tickers) > 1:
+            return pd.DataFrame()
+        self.chamadas[tickers[0]] = self.chamadas.get(tickers[0], 0) + 1
+        if self.chamadas[tickers[0]] <= self.falhas:
+            raise ConnectionError('falha simulada')
+        return pd.DataFrame({'Close': [1.0, 2.0]}, index=pd.date_range('2024-01-01', periods=2))
+
+
+@pytest.mark.parametrize('falhas, esperas', [(0, []), (1, [1.0]), (2, [1.0, 2.0])])
+def test_retentativa_individual_espera_so_apos_falha(monkeypatch, falhas, esperas):
+    registradas = []
+    monkeypatch.setattr(fontes_dados.time, 'sleep', registradas.append)
+    resultado = FonteFalha(falhas, tentativas=3).baixar(['A', 'B'], '2024-01-01', '2024-01-03')
+    assert set(resultado) == {'A', 'B'}
+    assert registradas == esperas + esperas
@@ -0,0 +1,30 @@
+"""Retornos e Big Tech Index: horizontes inválidos e datas de retorno sem preço são rejeitados"""
+
+import os
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('yfinance')
+
+import coletar_dados
+from universo import carregar_universo
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_data_de_retorno_sem_preco_levanta_erro():
+    universo = carregar_universo()
+    precos = pd.read_csv(os.path.join(RAIZ, 'dados_precos.csv'), index_col=0, parse_dates=True).iloc[:60]
+    retornos = coletar_dados.calcular_retornos_logaritmicos(precos, universo)
+    coletar_dados.construir_big_tech_index(precos, retornos, universo)
+
+    with pytest.raises(ValueError, match='sem preço'):
+        coletar_dados.construir_big_tech_index(precos.drop(retornos.index[-1]), retornos, universo)
+
+
+@pytest.mark.parametrize('horizonte', [0, -1])
+def test_horizonte_invalido_levanta_erro(horizonte):
+    precos = pd.read_csv(os.path.join(RAIZ, 'dados_precos.csv'), index_col=0, parse_dates=True).iloc[:10]
+    with pytest.raises(ValueError, match='Horizontes'):
+        coletar_dados.calcular_retornos_logaritmicos(precos, carregar_universo(), horizontes=(1, horizonte))
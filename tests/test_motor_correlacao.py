@@ -0,0 +1,57 @@
+"""Matrizes móveis (janela e EWMA) contra o pandas e persistência incremental"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from motor_correlacao import (anexar_matrizes_moveis, carregar_matrizes_moveis, matrizes_ewma, matrizes_moveis,
+                              matrizes_novas, salvar_matrizes_moveis)
+
+
+@pytest.fixture
+def retornos():
+    gerador = np.random.default_rng(11)
+    df = pd.DataFrame(gerador.multivariate_normal([0, 0, 0], [[1, .5, .2], [.5, 1, .3], [.2, .3, 1]], size=400),
+                      index=pd.bdate_range('2022-01-03', periods=400), columns=['a', 'b', 'c'])
+    df.iloc[:30, 2] = np.nan
+    df.iloc[gerador.choice(400, 15, replace=False), 0] = np.nan
+    return df
+
+
+def _pilha_pandas(tabela, datas, colunas):
+    return tabela.to_numpy().reshape(len(datas), len(colunas), len(colunas))
+
+
+def test_matrizes_moveis_equivalem_rolling(retornos):
+    resultado = matrizes_moveis(retornos, janela=40, min_periodos=20, dtype=np.float64)
+    janela = retornos.rolling(40, min_periods=20)
+    np.testing.assert_allclose(resultado['covariancia'], _pilha_pandas(janela.cov(), retornos.index, retornos.columns),
+                               rtol=1e-9, atol=1e-12)
+    np.testing.assert_allclose(resultado['correlacao'], _pilha_pandas(janela.corr(), retornos.index, retornos.columns),
+                               rtol=1e-9, atol=1e-12)
+
+
+def test_matrizes_ewma_equivalem_ewm(retornos):
+    resultado = matrizes_ewma(retornos, span=30, min_periodos=5, dtype=np.float64)
+    ewm = retornos.ewm(span=30, min_periods=5)
+    np.testing.assert_allclose(resultado['covariancia'], _pilha_pandas(ewm.cov(), retornos.index, retornos.columns),
+                               rtol=1e-8, atol=1e-12)
+    np.testing.assert_allclose(resultado['correlacao'], _pilha_pandas(ewm.corr(), retornos.index, retornos.columns),
+                               rtol=1e-8, atol=1e-12)
+
+
+def test_anexar_matrizes_equivale_calculo_completo(retornos, tmp_path):
+    caminho = str(tmp_path / 'correlacao_movel')
+    corte = 300
+    salvar_matrizes_moveis({'janela': matrizes_moveis(retornos.iloc[:corte], 40),
+                            'ewma': matrizes_ewma(retornos.iloc[:corte], span=30)}, caminho)
+
+    gravados = carregar_matrizes_moveis(caminho)
+    extensoes = {nome: matrizes_novas(r, retornos.iloc[corte - 5:]) for nome, r in gravados.items()}
+    anexar_matrizes_moveis(gravados, extensoes, caminho)
+
+    completos = {'janela': matrizes_moveis(retornos, 40), 'ewma': matrizes_ewma(retornos, span=30)}
+    for nome, resultado in carregar_matrizes_moveis(caminho).items():
+        assert resultado['datas'].equals(retornos.index)
+        assert isinstance(resultado['correlacao'], np.memmap)
+        np.testing.assert_allclose(resultado['correlacao'], completos[nome]['correlacao'], rtol=1e-5, atol=1e-6)
@@ -0,0 +1,44 @@
+"""ADF em janelas móveis e Phillips-Perron contra as referências do statsmodels"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+from statsmodels.tsa.stattools import adfuller
+
+import motor_estacionariedade
+from motor_estacionariedade import adf_movel, phillips_perron
+
+
+@pytest.fixture
+def serie():
+    gerador = np.random.default_rng(23)
+    return pd.Series(np.cumsum(gerador.normal(size=320)) * 0.3 + gerador.normal(size=320),
+                     index=pd.bdate_range('2021-01-04', periods=320))
+
+
+def test_adf_movel_equivale_adfuller_por_janela(serie):
+    janela, defasagens = 100, 2
+    resultado = adf_movel(serie, janela=janela, defasagens=defasagens)
+
+    assert resultado['Estatística ADF'].iloc[:janela - 1].isna().all()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', FutureWarning)
+        for fim in range(janela, len(serie) + 1, 7):
+            estatistica, valor_p = adfuller(serie.iloc[fim - janela:fim], maxlag=defasagens, autolag=None,
+                                            regression='c')[:2]
+            assert resultado['Estatística ADF'].iloc[fim - 1] == pytest.approx(estatistica, rel=1e-8)
+            assert resultado['Valor-p'].iloc[fim - 1] == pytest.approx(valor_p, rel=1e-6)
+
+
+def test_testes_da_serie_equivalem_adfuller(serie):
+    linhas = {linha[0]: linha for linha in motor_estacionariedade.testar_serie(serie, testes=('ADF', 'PP'))}
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', FutureWarning)
+        estatistica, valor_p, defasagens = adfuller(serie.to_numpy(), autolag='AIC')[:3]
+        adf_sem_defasagens = adfuller(serie.to_numpy(), maxlag=0, autolag=None)[:2]
+    assert linhas['ADF'][1:4] == pytest.approx([estatistica, valor_p, defasagens])
+
+    # Sem correção de longo prazo (0 defasagens), o Z_τ de Phillips-Perron é o t do ADF(0)
+    assert phillips_perron(serie, defasagens=0)[:2] == pytest.approx(adf_sem_defasagens, rel=1e-8)
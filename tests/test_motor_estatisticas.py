@@ -0,0 +1,58 @@
+"""Momentos em uma passada e combinação de partições contra o pandas"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from motor_estatisticas import (calcular_momentos, combinar_momentos, estatisticas_momentos, momentos_bloco,
+                                momentos_vazios, tabela_descritiva)
+
+
+@pytest.fixture
+def valores():
+    gerador = np.random.default_rng(13)
+    x = np.column_stack([gerador.standard_t(4, 900), gerador.lognormal(size=900), 1e6 + gerador.normal(size=900)])
+    x[gerador.choice(900, 60, replace=False), 1] = np.nan
+    return x
+
+
+def _comparar(momentos, x):
+    df = pd.DataFrame(x)
+    # Momentos centrais de referência sobre os dados deslocados pela mediana (subtração
+    # exata perto de 1e6), onde o pandas não perde precisão
+    deslocado = df - df.median()
+    estatisticas = estatisticas_momentos(momentos)
+    np.testing.assert_array_equal(momentos['n'], df.count())
+    np.testing.assert_allclose(estatisticas['media'], df.mean(), rtol=1e-12)
+    np.testing.assert_allclose(estatisticas['desvio'], deslocado.std(), rtol=1e-9)
+    np.testing.assert_allclose(estatisticas['assimetria'], deslocado.skew(), rtol=1e-8, atol=1e-9)
+    np.testing.assert_allclose(estatisticas['curtose'], deslocado.kurt(), rtol=1e-8, atol=1e-9)
+    np.testing.assert_array_equal(estatisticas['minimo'], df.min())
+    np.testing.assert_array_equal(estatisticas['maximo'], df.max())
+
+
+def test_combinar_momentos_equivale_uniao(valores):
+    partes = np.array_split(valores, [1, 250, 600])
+    combinado = momentos_vazios(valores.shape[1])
+    for parte in partes:
+        combinado = combinar_momentos(combinado, momentos_bloco(parte))
+    _comparar(combinado, valores)
+
+    # A ordem das partições não altera o resultado
+    invertido = momentos_vazios(valores.shape[1])
+    for parte in reversed(partes):
+        invertido = combinar_momentos(invertido, momentos_bloco(parte))
+    for chave in ('n', 'media', 'm2', 'm3', 'm4'):
+        np.testing.assert_allclose(invertido[chave], combinado[chave], rtol=1e-9)
+
+
+def test_calcular_momentos_em_blocos(valores):
+    _comparar(calcular_momentos(valores, max_elementos=64), valores)
+
+
+def test_tabela_descritiva_equivale_pandas(valores):
+    df = pd.DataFrame(valores, columns=['a', 'b', 'c'])
+    tabela = tabela_descritiva(df)
+    np.testing.assert_allclose(tabela['Mediana'], df.median(), rtol=1e-12)
+    np.testing.assert_allclose(tabela['Q1 (25%)'], df.quantile(0.25), rtol=1e-12)
+    np.testing.assert_allclose(tabela['Q3 (75%)'], df.quantile(0.75), rtol=1e-12)
@@ -0,0 +1,103 @@
+"""Equivalência do motor de regressão com o ajuste direto por MQO"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import statsmodels.api as sm
+
+from motor_regressao import INTERCEPTO, ModeloRegressao, ajustar_modelos, mqo, regressao_movel, tabela_resumo
+
+
+@pytest.fixture
+def dados_heterocedasticos():
+    gerador = np.random.default_rng(5)
+    n = 250
+    X = sm.add_constant(gerador.normal(size=(n, 3)))
+    choques = np.convolve(gerador.normal(size=n + 2), [1.0, 0.6, 0.3], mode='valid')
+    y = X @ [0.1, 1.0, -0.5, 0.25] + choques * (0.5 + np.abs(X[:, 1]))
+    return X, y
+
+
+@pytest.mark.parametrize('cov_tipo', ['nonrobust', 'HC0', 'HC1', 'HC2', 'HC3'])
+def test_mqo_equivale_statsmodels(dados_heterocedasticos, cov_tipo):
+    X, y = dados_heterocedasticos
+    nosso = mqo(X, y, cov_tipo)
+    referencia = sm.OLS(y, X).fit(cov_type=cov_tipo)
+    for atributo in ('params', 'bse', 'tvalues', 'pvalues', 'resid'):
+        np.testing.assert_allclose(getattr(nosso, atributo), getattr(referencia, atributo), rtol=1e-9, atol=1e-12)
+    for atributo in ('rsquared', 'rsquared_adj', 'fvalue', 'f_pvalue'):
+        assert getattr(nosso, atributo) == pytest.approx(getattr(referencia, atributo), rel=1e-9)
+    np.testing.assert_allclose(nosso.cov_params(), referencia.cov_params(), rtol=1e-9, atol=1e-14)
+
+
+@pytest.mark.parametrize('correcao', [False, True])
+def test_mqo_hac_equivale_statsmodels(dados_heterocedasticos, correcao):
+    X, y = dados_heterocedasticos
+    nosso = mqo(X, y, 'HAC', defasagens=6, correcao=correcao)
+    referencia = sm.OLS(y, X).fit(cov_type='HAC', cov_kwds={'maxlags': 6, 'use_correction': correcao})
+    np.testing.assert_allclose(nosso.bse, referencia.bse, rtol=1e-9)
+    np.testing.assert_allclose(nosso.pvalues, referencia.pvalues, rtol=1e-8, atol=1e-14)
+    assert nosso.fvalue == pytest.approx(referencia.fvalue, rel=1e-9)
+
+
+def test_covariancia_robusta_reportada_a_parte(dados_heterocedasticos):
+    X, y = dados_heterocedasticos
+    df = pd.DataFrame(X[:, 1:], columns=['x1', 'x2', 'x3']).assign(y=y)
+    modelo = ModeloRegressao('m', 'Modelo', 'y', ('x1', 'x2', 'x3'), cov_robusta='HAC', defasagens=6)
+    resultado = ajustar_modelos(df, [modelo])['m']
+
+    classico = sm.OLS(y, X).fit()
+    hac = sm.OLS(y, X).fit(cov_type='HAC', cov_kwds={'maxlags': 6})
+    np.testing.assert_allclose(resultado['erro_padrao'], classico.bse, rtol=1e-9)
+    assert resultado['f_statistic'] == pytest.approx(classico.fvalue, rel=1e-9)
+    np.testing.assert_allclose(resultado['robusta']['erro_padrao'], hac.bse, rtol=1e-9)
+    assert resultado['robusta']['f_statistic'] == pytest.approx(hac.fvalue, rel=1e-9)
+
+    tabela = tabela_resumo({'m': resultado})
+    assert list(tabela.index[-4:]) == ['F-statistic', 'Prob(F)', 'F-statistic (HAC)', 'Prob(F) (HAC)']
+    with pytest.raises(ValueError):
+        ModeloRegressao('m', 'Modelo', 'y', ('x1',), cov_robusta='HC9')
+
+
+@pytest.fixture
+def dados_com_ausentes():
+    gerador = np.random.default_rng(7)
+    n = 300
+    df = pd.DataFrame({'x1': gerador.normal(size=n), 'x2': gerador.normal(size=n)},
+                      index=pd.bdate_range('2020-01-01', periods=n))
+    df['y'] = 0.5 + 1.5 * df['x1'] - 0.7 * df['x2'] + gerador.normal(scale=0.5, size=n)
+    df.iloc[gerador.choice(n, 25, replace=False), 0] = np.nan
+    df.iloc[gerador.choice(n, 10, replace=False), 2] = np.nan
+    return df
+
+
+def test_regressao_movel_equivale_mqo_por_janela(dados_com_ausentes):
+    df = dados_com_ausentes
+    janela = 40
+    resultado = regressao_movel(df, 'y', ['x1', 'x2'], janelas=(janela,), expansiva=True)
+
+    for rotulo, inicio in ((f'{janela}d', lambda t: max(t - janela + 1, 0)), ('expansiva', lambda t: 0)):
+        movel = resultado[rotulo]
+        estimadas = 0
+        for t in range(len(df)):
+            amostra = df.iloc[inicio(t):t + 1].dropna()
+            assert movel['n'].iloc[t] == len(amostra)
+            if movel['coeficientes'].iloc[t].isna().all():
+                continue
+            X = np.column_stack([np.ones(len(amostra)), amostra[['x1', 'x2']].to_numpy()])
+            ajuste = mqo(X, amostra['y'].to_numpy())
+            np.testing.assert_allclose(movel['coeficientes'].iloc[t], ajuste.params, rtol=1e-8, atol=1e-10)
+            np.testing.assert_allclose(movel['erro_padrao'].iloc[t], ajuste.bse, rtol=1e-8, atol=1e-10)
+            np.testing.assert_allclose(movel['r2'].iloc[t], ajuste.rsquared, rtol=1e-8, atol=1e-10)
+            estimadas += 1
+        assert estimadas > len(df) // 2
+
+
+def test_regressao_movel_estima_janelas_com_ausentes(dados_com_ausentes):
+    movel = regressao_movel(dados_com_ausentes, 'y', ['x1', 'x2'], janelas=(40,))['40d']
+    n = movel['n']
+    com_ausentes = (n < 40) & (np.arange(len(n)) >= 39)
+    assert com_ausentes.any()
+    assert movel['coeficientes'].loc[com_ausentes, INTERCEPTO].notna().all()
+    # Aquecimento: menos da metade da janela disponível
+    assert movel['coeficientes'][n < 20].isna().all().all()
@@ -0,0 +1,45 @@
+"""Previsões e extensão incremental das trajetórias de volatilidade condicional"""
+
+import numpy as np
+import pandas as pd
+
+from motor_volatilidade import (_MEDIA_ABS_NORMAL, ESCALA, MODELOS_VOLATILIDADE, PARAMETROS, _backcast, _prever,
+                                ajustar_volatilidades, estender_volatilidades, variancia_condicional)
+
+
+def test_estender_volatilidades_continua_a_recursao():
+    gerador = np.random.default_rng(3)
+    datas = pd.bdate_range('2021-01-01', periods=600)
+    df = pd.DataFrame(gerador.standard_t(5, size=(600, 2)) * 0.01, index=datas, columns=['a', 'b'])
+    df.iloc[:40, 1] = np.nan
+
+    ajuste = ajustar_volatilidades(df.iloc[:550], processos=1, horizonte=5)
+    estendido = estender_volatilidades(ajuste, df.iloc[500:])
+    assert estendido['datas'].equals(datas)
+
+    for i, modelo in enumerate(MODELOS_VOLATILIDADE):
+        for j, coluna in enumerate(df.columns):
+            linha = ajuste['tabela'].query('Série == @coluna and Modelo == @modelo')
+            theta = linha[list(PARAMETROS[modelo])].to_numpy(dtype=float)[0]
+            r = df[coluna].dropna().to_numpy() * ESCALA
+            backcast = _backcast(r[:len(r) - 50] - r[:len(r) - 50].mean())
+            esperada = np.sqrt(variancia_condicional(modelo, theta[1:], r - theta[0], backcast)) / ESCALA
+            obtida = estendido['volatilidade'][i, :, j]
+            np.testing.assert_allclose(obtida[~np.isnan(obtida)], esperada, rtol=1e-5)
+
+
+def test_previsao_egarch_equivale_simulacao():
+    omega, alfa, gama, beta = 0.02, 0.25, -0.12, 0.95
+    residuo, variancia = -1.5, 1.3
+    previsao = _prever('EGARCH', (omega, alfa, gama, beta), residuo, variancia, 10)
+
+    gerador = np.random.default_rng(0)
+    z = residuo / np.sqrt(variancia)
+    log_variancia = np.full(1_000_000, omega + alfa * (abs(z) - _MEDIA_ABS_NORMAL) + gama * z
+                            + beta * np.log(variancia))
+    simulada = []
+    for _ in range(10):
+        simulada.append(np.exp(log_variancia).mean())
+        z = gerador.standard_normal(len(log_variancia))
+        log_variancia = omega + alfa * (np.abs(z) - _MEDIA_ABS_NORMAL) + gama * z + beta * log_variancia
+    np.testing.assert_allclose(previsao, simulada, rtol=3e-3)
@@ -0,0 +1,122 @@
+"""
+Universo de Ativos
+Define, em um único lugar, os tickers usados por todas as etapas do pipeline
+"""
+
+import json
+import os
+
+import pandas as pd
+
+CAMINHO_UNIVERSO_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'universo.json')
+
+
+class Universo:
+    """
+    Conjunto de ativos analisados.
+
+    • mercado: índice de referência (ex.: {'SP500': '^GSPC'}), tratado como ação
+    • constituintes: empresas que compõem o Big Tech Index
+    • niveis: séries mantidas em nível, sem cálculo de retorno (VIX, Taxa de Juros)
+
+    Todos os dicionários mapeiam nome da coluna -> ticker.
+    """
+
+    def __init__(self, mercado, constituintes, niveis, data_inicio, data_fim, nome='Universo'):
+        self.nome = nome
+        self.mercado = dict(mercado)
+        self.constituintes = dict(constituintes)
+        self.niveis = dict(niveis)
+        self.data_inicio = data_inicio
+        self.data_fim = data_fim
+
+    @property
+    def nome_mercado(self):
+        """Nome da coluna do índice de referência (ex.: 'SP500')"""
+        return next(iter(self.mercado))
+
+    @property
+    def acoes(self):
+        """Mercado + constituintes, séries que viram retornos logarítmicos"""
+        return {**self.mercado, **self.constituintes}
+
+    @property
+    def todos(self):
+        """Todos os ativos do universo, na ordem das colunas de df_precos"""
+        return {**self.acoes, **self.niveis}
+
+    @property
+    def colunas_constituintes(self):
+        return list(self.constituintes)
+
+    @property
+    def colunas_retorno_constituintes(self):
+        return [f'Retorno_{nome}' for nome in self.constituintes]
+
+    def mapa_colunas(self):
+        """Dicionário ticker -> nome da coluna"""
+        return {ticker: nome for nome, ticker in self.todos.items()}
+
+    def com_constituintes(self, constituintes):
+        """Cópia do universo com outra lista de constituintes"""
+        return Universo(self.mercado, constituintes, self.niveis,
+                        self.data_inicio, self.data_fim, nome=self.nome)
+
+    def com_periodo(self, data_inicio, data_fim):
+        """Cópia do universo com outro período de coleta"""
+        return Universo(self.mercado, self.constituintes, self.niveis,
+                        data_inicio, data_fim, nome=self.nome)
+
+    def __len__(self):
+        return len(self.todos)
+
+    def __repr__(self):
+        return (f"Universo({self.nome!r}, {len(self.constituintes)} constituintes, "
+                f"{self.data_inicio} a {self.data_fim})")
+
+
+def _ler_constituintes(valor, diretorio_base):
+    """
+    Aceita os constituintes em três formatos:
+      • dicionário {nome: ticker}
+      • lista de tickers (o próprio ticker vira o nome da coluna)
+      • caminho de um CSV com coluna 'Ticker' (ou 'Symbol') e, opcionalmente, 'Nome'
+    """
+    if isinstance(valor, dict):
+        return valor
+    if isinstance(valor, list):
+        return {ticker: ticker for ticker in valor}
+
+    caminho = valor if os.path.isabs(valor) else os.path.join(diretorio_base, valor)
+    df = pd.read_csv(caminho)
+    coluna_ticker = 'Ticker' if 'Ticker' in df.columns else 'Symbol' if 'Symbol' in df.columns else df.columns[0]
+    tickers = df[coluna_ticker].astype(str).str.strip().str.replace('.', '-', regex=False)
+    nomes = df['Nome'].astype(str) if 'Nome' in df.columns else tickers
+    return dict(zip(nomes, tickers))
+
+
+def carregar_universo(caminho=None, tickers=None):
+    """
+    Carrega o universo de um arquivo JSON (padrão: universo.json ao lado deste módulo).
+
+    `tickers` (lista ou string separada por vírgulas) substitui os constituintes
+    do arquivo, permitindo definir o universo direto pela linha de comando.
+    """
+    caminho = caminho or CAMINHO_UNIVERSO_PADRAO
+    with open(caminho, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    constituintes = _ler_constituintes(config['constituintes'], os.path.dirname(os.path.abspath(caminho)))
+    if tickers:
+        if isinstance(tickers, str):
+            tickers = [t.strip() for t in tickers.split(',') if t.strip()]
+        constituintes = {ticker: ticker for ticker in tickers}
+
+    return Universo(
+        mercado=config['mercado'],
+        constituintes=constituintes,
+        niveis=config.get('niveis', {}),
+        data_inicio=config['data_inicio'],
+        data_fim=config['data_fim'],
+        nome=config.get('nome', 'Universo')
+    )